@@ -7,27 +7,48 @@ This Flask application provides REST API endpoints for user authentication
 and health assessment management, connecting to PostgreSQL database.
 """
 
+import time
+_import_started = time.perf_counter()
+
 import os
 import datetime
+import hashlib
+import threading
 from functools import wraps
 from urllib.parse import quote_plus
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, make_response, url_for
 from flask_cors import CORS
 import jwt
 from dotenv import load_dotenv
 
-# Import our database models and utilities
-from models import db, User, Assessment, init_db, create_tables, get_db_stats
-
-# Import ML prediction function
-from ml_model.prediction import make_prediction
+from ml_model.startup import startup_report
+startup_report.record_phase('import flask stack', time.perf_counter() - _import_started)
 
-# Load environment variables
+# Load environment variables (before the ML module reads ML_BACKEND at import)
 load_dotenv()
 
+# Import our database models and utilities
+with startup_report.phase('import models'):
+    from models import db, User, Assessment, UserRiskRollup, AssessmentJob, init_db, create_tables, get_db_stats
+    import json_provider
+    from auth_cache import TokenCache, UserCache, watch_user_changes
+    from password_hashing import PasswordHasher, PasswordHashingBusy
+    from sql_profiler import SQLProfiler, timed
+    from metrics import MetricsRegistry, instrument_app, instrument_engine, CONTENT_TYPE as METRICS_CONTENT_TYPE
+    from assessment_jobs import AssessmentJobQueue
+
+# Import ML prediction function (model artifacts are loaded in the background)
+with startup_report.phase('import ml_model.prediction'):
+    from ml_model import prediction as ml_prediction
+    from ml_model.prediction import make_prediction, make_predictions, vectorizer
+    from ml_model.memory import memory_usage
+
 # Initialize Flask application
 app = Flask(__name__)
 
+# Encode JSON responses with orjson (datetimes, NumPy values, raw JSONB text)
+json_provider.install(app)
+
 # ================================================
 # CONFIGURATION
 # ================================================
@@ -56,15 +77,126 @@ if not DATABASE_URL:
 
 app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+if DATABASE_URL.startswith('sqlite'):
+    # Local stand-in (load tests): wait for the write lock instead of failing
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 30}}
 
 # JWT Configuration
 JWT_SECRET = os.getenv('JWT_SECRET', 'your-super-secret-jwt-key-change-this-in-production')
 JWT_EXPIRATION_HOURS = int(os.getenv('JWT_EXPIRATION_HOURS', '24'))
 
+# Caches of verified tokens and user records (per worker; size 0 disables)
+JWT_CACHE_SIZE = int(os.getenv('JWT_CACHE_SIZE', '10000'))
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '1000'))
+token_cache = TokenCache(JWT_CACHE_SIZE) if JWT_CACHE_SIZE > 0 else None
+user_cache = (UserCache(USER_CACHE_SIZE, float(os.getenv('USER_CACHE_TTL_SECONDS', '60')))
+              if USER_CACHE_SIZE > 0 else None)
+if user_cache is not None:
+    watch_user_changes(User, user_cache, token_cache)
+
+# Batch assessment configuration
+MAX_BATCH_ASSESSMENTS = int(os.getenv('MAX_BATCH_ASSESSMENTS', '500'))
+
+# Largest page GET /api/assessments returns for a single ?limit= request
+MAX_ASSESSMENT_PAGE_SIZE = int(os.getenv('MAX_ASSESSMENT_PAGE_SIZE', '500'))
+
+# Micro-batching of concurrent single predictions (opt-in)
+ML_MICRO_BATCHING = os.getenv('ML_MICRO_BATCHING', 'false').lower() == 'true'
+if ML_MICRO_BATCHING:
+    ml_prediction.enable_micro_batching(
+        max_batch_size=int(os.getenv('ML_MICRO_BATCH_SIZE', '32')),
+        max_wait_ms=float(os.getenv('ML_MICRO_BATCH_WAIT_MS', '2'))
+    )
+
+# Prediction result cache, opt-in: it keeps patient risk results in memory (and,
+# with a shared path, in a SQLite file readable by every worker on the host)
+ML_PREDICTION_CACHE = os.getenv('ML_PREDICTION_CACHE', 'false').lower() == 'true'
+if ML_PREDICTION_CACHE:
+    ml_prediction.enable_prediction_cache(
+        max_entries=int(os.getenv('ML_PREDICTION_CACHE_SIZE', '4096')),
+        ttl_seconds=float(os.getenv('ML_PREDICTION_CACHE_TTL_SECONDS', '3600')),
+        shared_path=os.getenv('ML_PREDICTION_CACHE_SHARED_PATH') or None
+    )
+
+# Load and warm up the model off the request path; /ready reports progress.
+# With ML_PRELOAD_MODEL (set by gunicorn.conf.py) the gunicorn master loads it
+# before forking instead, so all workers share one copy of the weights.
+ML_PRELOAD_MODEL = os.getenv('ML_PRELOAD_MODEL', 'false').lower() == 'true'
+if ML_PRELOAD_MODEL:
+    ml_prediction.preload_models()
+else:
+    ml_prediction.start_background_load()
+
+# Hot reload: pick up newly activated registry versions without a restart.
+# A preloading gunicorn master starts no watcher; post_fork starts one per worker.
+ML_REGISTRY_POLL_SECONDS = float(os.getenv('ML_REGISTRY_POLL_SECONDS', '10'))
+if ML_REGISTRY_POLL_SECONDS > 0 and not ML_PRELOAD_MODEL:
+    ml_prediction.start_registry_watcher(ML_REGISTRY_POLL_SECONDS)
+
 # Initialize database with app
 init_db(app)
 
-# Initialize bcrypt for password hashing
+# Prometheus metrics at /metrics. Under gunicorn, METRICS_DIR (set by
+# gunicorn.conf.py) holds per-worker snapshots that /metrics adds up.
+metrics_registry = MetricsRegistry(
+    directory=os.getenv('METRICS_DIR') or None,
+    flush_seconds=float(os.getenv('METRICS_FLUSH_SECONDS', '5'))
+)
+instrument_app(metrics_registry, app)
+with app.app_context():
+    instrument_engine(metrics_registry, db.engine)
+prediction_seconds = metrics_registry.histogram(
+    'prediction_duration_seconds', 'make_prediction / make_predictions latency', ('kind',))
+password_hash_seconds = metrics_registry.histogram(
+    'password_hash_duration_seconds', 'bcrypt time per call, including queueing', ('operation',),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+
+def observe_password_hash(operation, seconds):
+    password_hash_seconds.labels(operation).observe(seconds)
+
+def collect_app_metrics():
+    """Counters kept by the prediction module and the password hasher"""
+    samples = [
+        ('prediction_fallbacks_total', 'counter', 'Fallback predictions returned instead of a model score',
+         {'reason': reason}, count)
+        for reason, count in dict(ml_prediction.fallback_counts).items()
+    ]
+    hashing = password_hasher.stats()
+    samples.append(('password_hash_rejected_total', 'counter',
+                    'Password hashing calls shed with 503 (queue full)', {}, hashing['rejected']))
+    samples.append(('password_hash_in_flight', 'gauge',
+                    'Password hashing calls running or queued', {}, hashing['in_flight']))
+    return samples
+
+metrics_registry.add_collector(collect_app_metrics)
+
+# Per-request SQL profiling: Server-Timing headers, query budget and N+1 warnings.
+# Switch at runtime with `python -m sql_profiler on|off` when SQL_PROFILER_FLAG is set.
+sql_profiler = SQLProfiler(
+    enabled=os.getenv('SQL_PROFILER', 'false').lower() == 'true',
+    query_budget=int(os.getenv('SQL_PROFILER_QUERY_BUDGET', '10')),
+    repeat_threshold=int(os.getenv('SQL_PROFILER_REPEAT_THRESHOLD', '3')),
+    flag_path=os.getenv('SQL_PROFILER_FLAG')
+)
+with app.app_context():
+    sql_profiler.init_app(app, db.engine)
+
+# Password hashing: bcrypt cost, and a process pool with a bounded queue, both
+# per server process (PASSWORD_HASH_WORKERS=0 hashes on the request thread;
+# by default gunicorn.conf.py splits the cores between the workers)
+BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', '12'))
+app.config['BCRYPT_LOG_ROUNDS'] = BCRYPT_LOG_ROUNDS
+_hash_workers = os.getenv('PASSWORD_HASH_WORKERS')
+_hash_queue = os.getenv('PASSWORD_HASH_QUEUE')
+password_hasher = PasswordHasher(
+    rounds=BCRYPT_LOG_ROUNDS,
+    workers=int(_hash_workers) if _hash_workers else None,
+    queue_size=int(_hash_queue) if _hash_queue else None,
+    retry_after=int(os.getenv('PASSWORD_HASH_RETRY_AFTER', '1')),
+    observer=observe_password_hash
+)
+
+# Initialize bcrypt for password hashing (scripts such as create_test_users.py)
 from flask_bcrypt import Bcrypt
 bcrypt = Bcrypt(app)
 
@@ -108,7 +240,10 @@ def auth_required(f):
                 'message': 'Please provide a valid authentication token'
             }), 401
         
-        payload = verify_jwt_token(token)
+        if token_cache is not None:
+            payload = token_cache.verify(token, verify_jwt_token)
+        else:
+            payload = verify_jwt_token(token)
         if not payload:
             return jsonify({
                 'error': 'Invalid token',
@@ -121,6 +256,157 @@ def auth_required(f):
     
     return decorated
 
+def hashing_busy_response(error):
+    """503 for a full password hashing queue; the client should retry shortly"""
+    response = jsonify({
+        'error': 'Server busy',
+        'message': 'Too many sign-in requests right now, please retry shortly'
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+# ================================================
+# ASYNC ASSESSMENT JOBS
+# ================================================
+
+def run_assessment_job(job):
+    """Score a queued assessment and store it in the job's transaction (the queue commits)"""
+    with prediction_seconds.labels('single').time():
+        real_prediction = make_prediction(job.assessment_data)
+    assessment = Assessment(
+        user_id=job.user_id,
+        assessment_data=job.assessment_data,
+        prediction_result=real_prediction
+    )
+    db.session.add(assessment)
+    UserRiskRollup.record(assessment)  # flushes, so the new id is known
+    job.assessment_id = assessment.assessment_id
+
+assessment_job_seconds = metrics_registry.histogram(
+    'assessment_job_latency_seconds', 'Time from accepting an async assessment to the end of an attempt',
+    ('outcome',), buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0))
+
+def observe_assessment_job(outcome, seconds):
+    assessment_job_seconds.labels(outcome).observe(seconds)
+
+# Worker threads per API process; the assessment_jobs table is the queue
+# (ASSESSMENT_JOB_WORKERS=0 only accepts jobs, other processes run them)
+assessment_job_queue = AssessmentJobQueue(
+    app,
+    run_assessment_job,
+    workers=int(os.getenv('ASSESSMENT_JOB_WORKERS', '2')),
+    poll_seconds=float(os.getenv('ASSESSMENT_JOB_POLL_SECONDS', '1')),
+    max_attempts=int(os.getenv('ASSESSMENT_JOB_MAX_ATTEMPTS', '3')),
+    retry_seconds=float(os.getenv('ASSESSMENT_JOB_RETRY_SECONDS', '2')),
+    timeout_seconds=float(os.getenv('ASSESSMENT_JOB_TIMEOUT_SECONDS', '300')),
+    observer=observe_assessment_job
+)
+ASSESSMENT_JOB_MAX_WAIT_SECONDS = float(os.getenv('ASSESSMENT_JOB_MAX_WAIT_SECONDS', '30'))
+
+@app.before_request
+def start_assessment_job_workers():
+    # Started on the first request, i.e. after gunicorn has forked this worker
+    assessment_job_queue.ensure_started()
+
+def collect_assessment_job_counters():
+    stats = assessment_job_queue.counters()
+    return [('assessment_job_retries_total', 'counter', 'Failed job attempts that were queued again',
+             {}, stats['retries']),
+            ('assessment_job_stale_releases_total', 'counter', 'Jobs released after their worker died',
+             {}, stats['released_stale'])]
+
+def collect_assessment_queue():
+    """Queue depth from the assessment_jobs table (the same for every worker)"""
+    with app.app_context():
+        stats = AssessmentJob.queue_stats()
+    samples = [('assessment_jobs', 'gauge', 'Assessment jobs by status', {'status': status}, stats[status])
+               for status in (AssessmentJob.QUEUED, AssessmentJob.RUNNING)]
+    samples.append(('assessment_job_oldest_queued_seconds', 'gauge', 'Age of the oldest queued job',
+                    {}, stats['oldest_queued_seconds']))
+    return samples
+
+metrics_registry.add_collector(collect_assessment_job_counters)
+metrics_registry.add_collector(collect_assessment_queue, scrape_only=True)
+
+def wants_async():
+    """?async=true or an RFC 7240 "Prefer: respond-async" header"""
+    return (request.args.get('async', '').lower() == 'true'
+            or 'respond-async' in request.headers.get('Prefer', ''))
+
+# ================================================
+# CONDITIONAL GET (ETAGS)
+# ================================================
+
+class ConditionalGetStats:
+    """Per-endpoint counters for ETag revalidation (per worker)"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+    
+    def record(self, endpoint, outcome):
+        """outcome: 'not_modified', 'modified' or 'untracked' (no change token)"""
+        with self._lock:
+            counters = self._endpoints.setdefault(
+                endpoint, {'not_modified': 0, 'modified': 0, 'untracked': 0})
+            counters[outcome] += 1
+    
+    def stats(self):
+        with self._lock:
+            stats = {}
+            for endpoint, counters in self._endpoints.items():
+                requests = sum(counters.values())
+                stats[endpoint] = {
+                    'requests': requests,
+                    **counters,
+                    'hit_rate': counters['not_modified'] / requests if requests else 0.0
+                }
+            return stats
+
+conditional_get_stats = ConditionalGetStats()
+
+def conditional_get(f=None, include_user=False):
+    """
+    Decorator (after auth_required) adding strong ETags to per-user GET routes.
+    
+    The ETag hashes the user's change token (one primary-key read of their
+    rollup row) with the request path and query string. A matching
+    If-None-Match gets 304 before the route's queries and JSON encoding run.
+    The token is read before the route, so data written meanwhile can only
+    make the next revalidation miss, never serve stale content. Routes whose
+    response embeds the user use @conditional_get(include_user=True), so a
+    profile change also changes the ETag.
+    """
+    if f is None:
+        return lambda f: conditional_get(f, include_user=include_user)
+    
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        user_id = request.current_user['userId']
+        token = UserRiskRollup.change_token(user_id, include_user=include_user)
+        if token is None:
+            conditional_get_stats.record(request.endpoint, 'untracked')
+            return f(*args, **kwargs)
+        
+        etag = hashlib.blake2b(f'{user_id}|{token}|{request.full_path}'.encode('utf-8'),
+                               digest_size=16).hexdigest()
+        if etag in request.if_none_match:
+            conditional_get_stats.record(request.endpoint, 'not_modified')
+            response = make_response('', 304)
+        else:
+            conditional_get_stats.record(request.endpoint, 'modified')
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        
+        response.set_etag(etag)
+        # Personal data: browsers may keep it but must revalidate, shared caches must not
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    
+    return decorated
+
 # ================================================
 # ERROR HANDLERS
 # ================================================
@@ -179,11 +465,12 @@ def register():
             }), 409
         
         # Create new user
-        password_hash = bcrypt.generate_password_hash(data['password']).decode('utf-8')
+        password_hash = password_hasher.hash(data['password'])
         user = User(
             full_name=data['fullName'],
             email=data['email'],
-            password_hash=password_hash
+            password_hash=password_hash,
+            risk_rollup=UserRiskRollup.empty()
         )
         
         db.session.add(user)
@@ -198,6 +485,8 @@ def register():
             'user': user.to_dict()
         }), 201
         
+    except PasswordHashingBusy as e:
+        return hashing_busy_response(e)
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -228,12 +517,20 @@ def login():
             }), 401
         
         # Verify password
-        if not bcrypt.check_password_hash(user.password_hash, data['password']):
+        if not password_hasher.check(user.password_hash, data['password']):
             return jsonify({
                 'error': 'Invalid credentials',
                 'message': 'Email or password is incorrect'
             }), 401
         
+        # Upgrade hashes made with a different BCRYPT_LOG_ROUNDS while we know the password
+        if password_hasher.needs_rehash(user.password_hash):
+            try:
+                user.password_hash = password_hasher.hash(data['password'])
+                db.session.commit()
+            except PasswordHashingBusy:
+                pass  # keep the old hash; the next login retries
+        
         # Generate JWT token
         token = generate_jwt_token(user.id)
         
@@ -243,7 +540,10 @@ def login():
             'user': user.to_dict()
         }), 200
         
+    except PasswordHashingBusy as e:
+        return hashing_busy_response(e)
     except Exception as e:
+        db.session.rollback()
         return jsonify({
             'error': 'Login failed',
             'message': str(e)
@@ -255,7 +555,13 @@ def login():
 def get_profile():
     """Get current user profile"""
     try:
-        user = User.find_by_id(request.current_user['userId'])
+        user_id = request.current_user['userId']
+        
+        def load_user():
+            user = User.find_by_id(user_id)
+            return user.to_dict() if user else None
+        
+        user = user_cache.get_or_load(user_id, load_user) if user_cache is not None else load_user()
         if not user:
             return jsonify({
                 'error': 'User not found',
@@ -263,7 +569,7 @@ def get_profile():
             }), 404
         
         return jsonify({
-            'user': user.to_dict()
+            'user': user
         }), 200
         
     except Exception as e:
@@ -289,8 +595,12 @@ def create_assessment():
         # Get assessment data
         assessment_data = data['assessment_data']
         
+        if wants_async():
+            return enqueue_assessment(assessment_data)
+        
         # Make real prediction using our ML model
-        real_prediction = make_prediction(assessment_data)
+        with timed('model'), prediction_seconds.labels('single').time():
+            real_prediction = make_prediction(assessment_data)
         
         # Check if prediction was successful
         if real_prediction is None:
@@ -315,6 +625,7 @@ def create_assessment():
             }), 400
         
         db.session.add(assessment)
+        UserRiskRollup.record(assessment)  # same transaction as the insert
         db.session.commit()
         
         return jsonify({
@@ -331,17 +642,198 @@ def create_assessment():
             'message': str(e)
         }), 500
 
+def enqueue_assessment(assessment_data):
+    """Validate and queue an assessment; 202 with the job's status URL"""
+    user_id = request.current_user['userId']
+    is_valid, missing_fields = Assessment(user_id=user_id, assessment_data=assessment_data) \
+        .validate_assessment_data()
+    if not is_valid:
+        return jsonify({
+            'error': 'Invalid assessment data',
+            'message': f'Missing required fields: {", ".join(missing_fields)}'
+        }), 400
+    
+    job = AssessmentJob(user_id=user_id, assessment_data=assessment_data)
+    db.session.add(job)
+    db.session.commit()
+    assessment_job_queue.notify()
+    
+    status_url = url_for('get_assessment_job', job_id=job.id)
+    response = jsonify({
+        'message': 'Assessment accepted for scoring',
+        'jobId': job.id,
+        'statusUrl': status_url,
+        'job': job.to_dict()
+    })
+    response.status_code = 202
+    response.headers['Location'] = status_url
+    response.headers['Retry-After'] = '1'
+    return response
+
+@app.route('/api/assessments/jobs/<int:job_id>', methods=['GET', 'OPTIONS'])
+@auth_required
+def get_assessment_job(job_id):
+    """Status of an async assessment; ?wait=<seconds> long-polls until it has finished"""
+    try:
+        user_id = request.current_user['userId']
+        try:
+            wait = min(float(request.args.get('wait', '0')), ASSESSMENT_JOB_MAX_WAIT_SECONDS)
+        except ValueError:
+            return jsonify({
+                'error': 'Invalid wait',
+                'message': 'wait must be a number of seconds'
+            }), 400
+        
+        job = assessment_job_queue.wait_for(
+            lambda: AssessmentJob.find_by_id_and_user(job_id, user_id), wait)
+        if not job:
+            return jsonify({
+                'error': 'Job not found',
+                'message': 'Assessment job not found or access denied'
+            }), 404
+        
+        body = {'job': job.to_dict()}
+        if job.status == AssessmentJob.SUCCEEDED and job.assessment_id is not None:
+            assessment = Assessment.find_by_id_and_user(job.assessment_id, user_id)
+            if assessment:
+                body['assessmentId'] = assessment.assessment_id
+                body['assessment'] = assessment.to_dict()
+                body['prediction'] = assessment.prediction_result
+        response = jsonify(body)
+        if job.status not in AssessmentJob.FINISHED:
+            response.headers['Retry-After'] = '1'
+        return response
+        
+    except Exception as e:
+        return jsonify({
+            'error': 'Failed to fetch assessment job',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/assessments/batch', methods=['POST', 'OPTIONS'])
+@auth_required
+def create_assessments_batch():
+    """Create many health assessments in one request"""
+    try:
+        data = request.get_json()
+        
+        # Validate batch payload
+        if not data or not isinstance(data.get('assessments'), list) or not data['assessments']:
+            return jsonify({
+                'error': 'Missing assessments',
+                'message': 'Please provide a non-empty "assessments" list'
+            }), 400
+        
+        items = data['assessments']
+        if len(items) > MAX_BATCH_ASSESSMENTS:
+            return jsonify({
+                'error': 'Batch too large',
+                'message': f'A batch may contain at most {MAX_BATCH_ASSESSMENTS} assessments'
+            }), 413
+        
+        user_id = request.current_user['userId']
+        results = [None] * len(items)
+        pending = []  # (index, assessment) pairs that passed validation
+        
+        for index, item in enumerate(items):
+            assessment_data = item.get('assessment_data') if isinstance(item, dict) else None
+            if not isinstance(assessment_data, dict):
+                results[index] = {
+                    'index': index,
+                    'status': 'invalid',
+                    'error': 'Missing assessment data',
+                    'message': 'Please provide complete assessment information'
+                }
+                continue
+            
+            assessment = Assessment(user_id=user_id, assessment_data=assessment_data)
+            is_valid, missing_fields = assessment.validate_assessment_data()
+            if not is_valid:
+                results[index] = {
+                    'index': index,
+                    'status': 'invalid',
+                    'error': 'Invalid assessment data',
+                    'message': f'Missing required fields: {", ".join(missing_fields)}'
+                }
+                continue
+            
+            feature_errors = vectorizer.find_errors(assessment_data)
+            if feature_errors:
+                results[index] = {
+                    'index': index,
+                    'status': 'invalid',
+                    'error': 'Invalid assessment data',
+                    'message': '; '.join(feature_errors)
+                }
+                continue
+            
+            pending.append((index, assessment))
+        
+        if pending:
+            # Score every valid row with one model call
+            with timed('model'), prediction_seconds.labels('batch').time():
+                predictions = make_predictions([a.assessment_data for _, a in pending])
+            for (_, assessment), prediction in zip(pending, predictions):
+                assessment.prediction_result = prediction
+            
+            # Single flush + commit for the whole batch
+            db.session.add_all([a for _, a in pending])
+            UserRiskRollup.record(*[a for _, a in pending])
+            
+            # Read ids before commit expires the objects (avoids one reload per row)
+            for index, assessment in pending:
+                results[index] = {
+                    'index': index,
+                    'status': 'created',
+                    'assessmentId': assessment.assessment_id,
+                    'prediction': assessment.prediction_result
+                }
+            db.session.commit()
+        
+        created = len(pending)
+        return jsonify({
+            'message': f'{created} of {len(items)} assessments created',
+            'created': created,
+            'failed': len(items) - created,
+            'results': results
+        }), 201 if created else 400
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'error': 'Failed to create assessments',
+            'message': str(e)
+        }), 500
+
 @app.route('/api/assessments', methods=['GET', 'OPTIONS'])
 @auth_required
+@conditional_get
 def get_assessments():
-    """Get user's assessment history"""
+    """Get user's assessment history (newest first, optionally paginated and projected)"""
     try:
-        limit = request.args.get('limit', type=int)
-        assessments = Assessment.find_by_user(request.current_user['userId'], limit=limit)
+        limit = request.args.get('limit')
+        cursor = request.args.get('cursor') or None
+        fields = request.args.get('fields')
+        if fields is not None:
+            fields = [field.strip() for field in fields.split(',') if field.strip()]
+        
+        try:
+            if limit is not None:
+                if not limit.isdigit() or int(limit) < 1:
+                    raise ValueError('limit must be a positive integer')
+                limit = min(int(limit), MAX_ASSESSMENT_PAGE_SIZE)
+            assessments, next_cursor = Assessment.page_for_user(
+                request.current_user['userId'], limit=limit, cursor=cursor, fields=fields)
+        except ValueError as e:
+            return jsonify({
+                'error': 'Invalid query parameters',
+                'message': str(e)
+            }), 400
         
         return jsonify({
-            'assessments': [assessment.to_dict() for assessment in assessments],
-            'count': len(assessments)
+            'assessments': assessments,
+            'count': len(assessments),
+            'next_cursor': next_cursor
         }), 200
         
     except Exception as e:
@@ -352,12 +844,14 @@ def get_assessments():
 
 @app.route('/api/assessments/<int:assessment_id>', methods=['GET', 'OPTIONS'])
 @auth_required
+@conditional_get(include_user=True)
 def get_assessment(assessment_id):
     """Get specific assessment by ID"""
     try:
         assessment = Assessment.find_by_id_and_user(
             assessment_id, 
-            request.current_user['userId']
+            request.current_user['userId'],
+            with_user=True  # loaded in the same query, not lazily by to_dict()
         )
         
         if not assessment:
@@ -378,12 +872,20 @@ def get_assessment(assessment_id):
 
 @app.route('/api/dashboard/stats', methods=['GET', 'OPTIONS'])
 @auth_required
+@conditional_get
 def get_dashboard_stats():
     """Get dashboard statistics for the user"""
     try:
-        user_assessments = Assessment.find_by_user(request.current_user['userId'])
+        user_id = request.current_user['userId']
         
-        if not user_assessments:
+        # Count, average and last 10 scores/dates are kept up to date in one row
+        rollup = db.session.get(UserRiskRollup, user_id)
+        if rollup is None:
+            # Users created before the rollup table get theirs on first read
+            rollup = UserRiskRollup.rebuild(user_id)
+            db.session.commit()
+        
+        if not rollup.assessment_count:
             return jsonify({
                 'total_assessments': 0,
                 'latest_assessment': None,
@@ -391,21 +893,21 @@ def get_dashboard_stats():
                 'message': 'No assessments found'
             }), 200
         
-        # Calculate statistics
-        latest = user_assessments[0]  # Already sorted by created_at desc
-        risk_scores = [a.get_risk_score() for a in user_assessments if a.get_risk_score() is not None]
+        # Only the latest assessment is loaded in full
+        latest = db.session.get(Assessment, rollup.latest_assessment_id)
         
         stats = {
-            'total_assessments': len(user_assessments),
+            'total_assessments': rollup.assessment_count,
             'latest_assessment': latest.to_dict(),
-            'risk_trend': risk_scores[:10],  # Last 10 scores for trend
-            'average_risk_score': sum(risk_scores) / len(risk_scores) if risk_scores else 0,
-            'assessment_dates': [a.created_at.isoformat() for a in user_assessments[:10]]
+            'risk_trend': rollup.recent_scores,  # Last 10 scores for trend
+            'average_risk_score': rollup.average_risk_score(),
+            'assessment_dates': rollup.recent_dates
         }
         
         return jsonify(stats), 200
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({
             'error': 'Failed to fetch dashboard stats',
             'message': str(e)
@@ -442,12 +944,62 @@ def health_check():
         'version': '2.0.0'
     })
 
+@app.route('/diagnostics', methods=['GET', 'OPTIONS'])
+def diagnostics():
+    """
+    Statistics of this worker for debugging; slower than /health (reads
+    /proc/self/smaps and queries the job queue), so keep it off probes.
+    """
+    diagnostics = {}
+    if ml_prediction.backend is not None:
+        diagnostics['ml_model'] = ml_prediction.backend.describe()
+    
+    # Per-worker memory: 'unique' is what one more worker costs
+    diagnostics['worker_memory'] = memory_usage()
+    
+    if ml_prediction.batcher is not None:
+        diagnostics['micro_batching'] = ml_prediction.batcher.stats()
+    if ml_prediction.prediction_cache is not None:
+        diagnostics['prediction_cache'] = ml_prediction.prediction_cache.stats()
+    diagnostics['conditional_get'] = conditional_get_stats.stats()
+    diagnostics['password_hashing'] = password_hasher.stats()
+    diagnostics['sql_profiler'] = sql_profiler.stats()
+    diagnostics['assessment_jobs'] = assessment_job_queue.stats()
+    diagnostics['auth_cache'] = {
+        'tokens': token_cache.stats() if token_cache is not None else None,
+        'users': user_cache.stats() if user_cache is not None else None
+    }
+    
+    return jsonify(diagnostics)
+
+@app.route('/metrics', methods=['GET', 'OPTIONS'])
+def metrics_endpoint():
+    """Prometheus metrics of every worker in the text exposition format"""
+    return metrics_registry.render(), 200, {'Content-Type': METRICS_CONTENT_TYPE}
+
+@app.route('/ready', methods=['GET', 'OPTIONS'])
+def readiness_check():
+    """Readiness probe: 200 once the ML model is loaded and warmed up, 503 before"""
+    status = ml_prediction.model_status()
+    status['ready'] = status['state'] == 'ready'
+    return jsonify(status), 200 if status['ready'] else 503
+
 if __name__ == '__main__':
     print("🏥 Starting Cardio Care Flask Server...")
     print(f"🔗 Database: {DATABASE_URL.replace(os.getenv('DB_PASSWORD', ''), '****') if os.getenv('DB_PASSWORD') else DATABASE_URL}")
     print(f"🔑 JWT Expiration: {JWT_EXPIRATION_HOURS} hours")
     print("🌐 CORS enabled for frontend communication")
     
+    # Pool processes (forkserver) would import this script again as their __main__,
+    # so the single-process development server hashes on the request thread
+    if not _hash_workers:
+        password_hasher = PasswordHasher(
+            rounds=BCRYPT_LOG_ROUNDS,
+            workers=0,
+            retry_after=password_hasher.retry_after,
+            observer=observe_password_hash
+        )
+    
     # Create tables if they don't exist
     with app.app_context():
         print("📋 Creating database tables...")
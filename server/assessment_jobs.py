@@ -0,0 +1,199 @@
+"""
+Asynchronous assessment scoring on a database-backed job queue.
+
+POST /api/assessments?async=true stores an AssessmentJob row and answers
+202 Accepted right away. AssessmentJobQueue runs worker threads in every
+API process; they claim due jobs from the assessment_jobs table, call the
+handler (prediction + insert, in the job's transaction) and mark the job
+succeeded. The table is the queue, so there is no broker to run, jobs
+survive restarts and any worker process may run a job another one
+accepted.
+
+A failed attempt is retried with exponential backoff up to max_attempts.
+Jobs whose worker died while running them are released again after
+timeout_seconds. Clients poll GET /api/assessments/jobs/<id>, optionally
+long-polling with ?wait=<seconds>; jobs finished by this process wake the
+waiters at once, others are seen within poll_seconds.
+
+Threads are started lazily by ensure_started(), so with gunicorn's
+preload_app each worker starts its own after the fork.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+from models import AssessmentJob, db
+
+
+class AssessmentJobQueue:
+    """Worker threads that run queued assessment jobs in this process"""
+
+    def __init__(self, app, handler, workers=2, poll_seconds=1.0, max_attempts=3,
+                 retry_seconds=2.0, timeout_seconds=300.0, observer=None):
+        self.app = app
+        # handler(job) does the work inside the job's transaction; the queue commits
+        self.handler = handler
+        self.workers = int(workers)
+        self.poll_seconds = float(poll_seconds)
+        self.max_attempts = int(max_attempts)
+        self.retry_seconds = float(retry_seconds)
+        self.timeout_seconds = float(timeout_seconds)
+        # observer(outcome, latency_seconds) after every attempt: 'succeeded', 'retried' or 'failed'
+        self.observer = observer
+
+        self._changed = threading.Condition()
+        self._stop = threading.Event()
+        self._threads = []
+        self._threads_pid = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._last_reaped = 0.0
+        self._reset_counters()
+
+    def __repr__(self):
+        return (f'<AssessmentJobQueue workers={self.workers}, '
+                f'max_attempts={self.max_attempts}>')
+
+    def _reset_counters(self):
+        self.claimed = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.retries = 0
+        self.released_stale = 0
+        self.latency_seconds = 0.0
+        self.run_seconds = 0.0
+
+    def ensure_started(self):
+        """Start the worker threads in this process if they are not running yet"""
+        if self._threads_pid == os.getpid() or self.workers <= 0:
+            return
+        with self._start_lock:
+            if self._threads_pid == os.getpid():
+                return
+            self._stop = threading.Event()
+            self._threads = [
+                threading.Thread(target=self._work, name=f'assessment-jobs-{i}', daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+            self._threads_pid = os.getpid()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self.notify()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads_pid = None
+
+    def notify(self):
+        """Wake idle workers and long-polling clients (a job was queued or finished)"""
+        with self._changed:
+            self._changed.notify_all()
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                ran = self.run_once()
+            except Exception as e:
+                print(f"❌ Assessment job worker error: {e}")
+                ran = False
+            if not ran:
+                with self._changed:
+                    self._changed.wait(self.poll_seconds)
+
+    def run_once(self):
+        """Claim and run one due job; False if the queue had nothing to do"""
+        with self.app.app_context():
+            self._maybe_release_stale()
+            job_id = AssessmentJob.claim_next()
+            if job_id is None:
+                return False
+            with self._stats_lock:
+                self.claimed += 1
+            self._run(job_id)
+            return True
+
+    def _run(self, job_id):
+        started = time.perf_counter()
+        job = db.session.get(AssessmentJob, job_id)
+        try:
+            self.handler(job)
+            job.status = AssessmentJob.SUCCEEDED
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            outcome = 'succeeded'
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️ Assessment job {job_id} attempt failed: {e}")
+            status = AssessmentJob.release(job_id, e, self.max_attempts, self.retry_seconds)
+            outcome = 'failed' if status == AssessmentJob.FAILED else 'retried'
+            job = db.session.get(AssessmentJob, job_id)
+
+        # Latency as the client sees it: from acceptance to this attempt's end
+        latency = job.age_seconds()
+        with self._stats_lock:
+            if outcome == 'succeeded':
+                self.succeeded += 1
+            elif outcome == 'failed':
+                self.failed += 1
+            else:
+                self.retries += 1
+            if outcome != 'retried':
+                self.latency_seconds += latency
+            self.run_seconds += time.perf_counter() - started
+        if self.observer is not None:
+            self.observer(outcome, latency)
+        self.notify()
+
+    def _maybe_release_stale(self):
+        now = time.monotonic()
+        if now - self._last_reaped < min(30.0, self.timeout_seconds / 2):
+            return
+        self._last_reaped = now
+        released = AssessmentJob.requeue_stale(self.timeout_seconds, self.max_attempts)
+        if released:
+            print(f"⚠️ Released {released} assessment job(s) left running by a dead worker")
+            with self._stats_lock:
+                self.released_stale += released
+
+    def wait_for(self, load, timeout):
+        """
+        Long-poll: call load() (returns the job) until the job is finished or
+        timeout seconds have passed; returns the last job loaded.
+        """
+        deadline = time.monotonic() + max(0.0, timeout)
+        while True:
+            # End the read transaction so the next load sees other workers' commits
+            db.session.rollback()
+            job = load()
+            remaining = deadline - time.monotonic()
+            if job is None or job.status in AssessmentJob.FINISHED or remaining <= 0:
+                return job
+            with self._changed:
+                self._changed.wait(min(remaining, self.poll_seconds))
+
+    def counters(self):
+        """Counters of this process (no database access)"""
+        with self._stats_lock:
+            finished = self.succeeded + self.failed
+            attempts = finished + self.retries
+            return {
+                'workers': self.workers if self._threads_pid == os.getpid() else 0,
+                'max_attempts': self.max_attempts,
+                'claimed': self.claimed,
+                'succeeded': self.succeeded,
+                'failed': self.failed,
+                'retries': self.retries,
+                'released_stale': self.released_stale,
+                'avg_latency_ms': self.latency_seconds * 1000.0 / finished if finished else 0.0,
+                'avg_run_ms': self.run_seconds * 1000.0 / attempts if attempts else 0.0,
+            }
+
+    def stats(self):
+        """Counters of this process plus the queue depth of the whole table"""
+        stats = self.counters()
+        stats['queue'] = AssessmentJob.queue_stats()
+        return stats
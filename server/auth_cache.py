@@ -0,0 +1,261 @@
+"""
+In-process caches for authentication.
+
+TokenCache remembers JWTs whose signature and claims were already verified,
+keyed by a SHA-256 digest of the token, so repeat requests with the same
+token skip the HMAC verification. Entries expire at the token's own "exp"
+claim and the cache is a bounded LRU. Revoked tokens are refused until they
+expire.
+
+UserCache keeps serialized User records for the profile endpoint. It is
+invalidated write-through whenever a User row is updated or deleted (at
+flush and again at commit, see watch_user_changes), with a short TTL as a
+bound for changes made by other workers or processes.
+
+Both caches are per worker process; revocation and invalidation do not
+propagate to other gunicorn workers.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+def token_digest(token):
+    return hashlib.sha256(token.encode('utf-8')).digest()
+
+
+class TokenCache:
+    """Bounded LRU of verified JWT payloads, each evicted at its exp claim"""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = int(max_entries)
+        self._entries = OrderedDict()  # digest -> (exp, payload)
+        self._revoked = {}             # digest -> exp
+        self._lock = threading.Lock()
+        self._reset_counters()
+
+    def __repr__(self):
+        return f'<TokenCache {len(self._entries)}/{self.max_entries} tokens>'
+
+    def _reset_counters(self):
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.revocations = 0
+        self.hit_seconds = 0.0
+        self.miss_seconds = 0.0
+
+    def verify(self, token, verifier):
+        """
+        Return the payload for token, or None if it is invalid or revoked.
+
+        verifier(token) does the full verification (signature and claims)
+        and returns the payload or None; it only runs on a cache miss.
+        """
+        started = time.perf_counter()
+        digest = token_digest(token)
+        now = time.time()
+        with self._lock:
+            revoked_until = self._revoked.get(digest)
+            if revoked_until is not None and revoked_until > now:
+                self.rejected += 1
+                return None
+            entry = self._entries.get(digest)
+            if entry is not None:
+                exp, payload = entry
+                if exp > now:
+                    self._entries.move_to_end(digest)
+                    self.hits += 1
+                    self.hit_seconds += time.perf_counter() - started
+                    return payload
+                del self._entries[digest]
+                self.expirations += 1
+
+        payload = verifier(token)
+        exp = payload.get('exp') if payload else None
+        with self._lock:
+            self.misses += 1
+            if isinstance(exp, (int, float)) and exp > now and digest not in self._revoked:
+                self._entries[digest] = (exp, payload)
+                self._entries.move_to_end(digest)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+            self.miss_seconds += time.perf_counter() - started
+        return payload
+
+    def revoke(self, token, exp=None):
+        """Refuse token from now on (until exp, default: its cached exp or 1 day)"""
+        digest = token_digest(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.pop(digest, None)
+            if exp is None:
+                exp = entry[0] if entry is not None else now + 86400
+            self._revoked[digest] = exp
+            self.revocations += 1
+            # Forget revocations of tokens that have expired anyway
+            for key in [k for k, until in self._revoked.items() if until <= now]:
+                del self._revoked[key]
+
+    def revoke_user(self, user_id):
+        """Drop every cached token of user_id (they are verified again on next use)"""
+        with self._lock:
+            for key in [k for k, (_, payload) in self._entries.items()
+                        if payload.get('userId') == user_id]:
+                del self._entries[key]
+                self.revocations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._revoked.clear()
+
+    def stats(self):
+        """Return hit/miss counters and the average cost of a cached and an uncached check"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'rejected_revoked': self.rejected,
+                'revoked': len(self._revoked),
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'revocations': self.revocations,
+                'avg_hit_ms': self.hit_seconds * 1000.0 / self.hits if self.hits else 0.0,
+                'avg_miss_ms': self.miss_seconds * 1000.0 / self.misses if self.misses else 0.0,
+            }
+
+
+class UserCache:
+    """Bounded LRU + TTL cache of serialized users with write-through invalidation"""
+
+    def __init__(self, max_entries=1000, ttl_seconds=60.0):
+        self.max_entries = int(max_entries)
+        self.ttl = float(ttl_seconds)
+        self._entries = OrderedDict()  # user_id -> (expires_at, user dict)
+        # Only users with a load in flight: user_id -> [invalidations since, loaders]
+        self._loading = {}
+        self._lock = threading.Lock()
+        self._reset_counters()
+
+    def __repr__(self):
+        return f'<UserCache {len(self._entries)}/{self.max_entries} users, ttl={self.ttl:g}s>'
+
+    def _reset_counters(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get_or_load(self, user_id, loader):
+        """
+        Return the cached dict for user_id, else loader() (None = no such user).
+
+        A value loaded while the user was invalidated is returned but not
+        stored, so a concurrent write can never be masked by a stale read.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                expires_at, user = entry
+                if expires_at > now:
+                    self._entries.move_to_end(user_id)
+                    self.hits += 1
+                    return dict(user)
+                del self._entries[user_id]
+                self.expirations += 1
+            self.misses += 1
+            loading = self._loading.setdefault(user_id, [0, 0])
+            loading[1] += 1
+            generation = loading[0]
+
+        user = None
+        try:
+            user = loader()
+        finally:
+            with self._lock:
+                loading = self._loading[user_id]
+                if user is not None and loading[0] == generation:
+                    self._entries[user_id] = (now + self.ttl, dict(user))
+                    self._entries.move_to_end(user_id)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+                loading[1] -= 1
+                if not loading[1]:
+                    del self._loading[user_id]
+        return user
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+            loading = self._loading.get(user_id)
+            if loading is not None:
+                loading[0] += 1
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
+
+
+def watch_user_changes(user_model, user_cache, token_cache=None):
+    """
+    Invalidate user_cache whenever a user_model row is updated or deleted.
+
+    Users are invalidated at flush and again when the transaction commits
+    or rolls back: a request that read the old row between the flush and
+    the commit would otherwise cache it. Deleted users also lose their
+    cached tokens.
+    """
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session, object_session
+
+    def changed(target):
+        user_cache.invalidate(target.id)
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault('user_cache_pending', set()).add(target.id)
+
+    def on_update(mapper, connection, target):
+        changed(target)
+
+    def on_delete(mapper, connection, target):
+        changed(target)
+        if token_cache is not None:
+            token_cache.revoke_user(target.id)
+
+    def on_transaction_end(session):
+        for user_id in session.info.pop('user_cache_pending', ()):
+            user_cache.invalidate(user_id)
+
+    event.listen(user_model, 'after_update', on_update)
+    event.listen(user_model, 'after_delete', on_delete)
+    event.listen(Session, 'after_commit', on_transaction_end)
+    event.listen(Session, 'after_rollback', on_transaction_end)
@@ -0,0 +1,158 @@
+"""
+Shared helpers for the benchmark scripts: timing, percentiles, JSON
+baselines and regression checks.
+
+Every benchmark produces a dictionary of metrics. Keys ending in "_ms" are
+latencies (lower is better) and keys ending in "_per_sec" are throughputs
+(higher is better); both are gated by --compare. Everything else (memory,
+counts) is recorded for information only.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import time
+from pathlib import Path
+
+BASELINE_DIR = Path(__file__).parent / 'baselines'
+DEFAULT_THRESHOLD = 0.15
+
+
+def percentiles(samples_seconds):
+    """p50/p95/p99/mean in milliseconds for a list of durations in seconds"""
+    import numpy as np
+
+    values = np.asarray(samples_seconds, dtype=np.float64) * 1000.0
+    return {
+        'p50_ms': round(float(np.percentile(values, 50)), 4),
+        'p95_ms': round(float(np.percentile(values, 95)), 4),
+        'p99_ms': round(float(np.percentile(values, 99)), 4),
+        'mean_ms': round(float(values.mean()), 4),
+    }
+
+
+def time_calls(fn, repeats, warmup=10):
+    """Call fn() repeats times (after warmup calls); returns durations in seconds"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def environment():
+    """Describe the machine so baselines from different hosts are not mixed up"""
+    import numpy as np
+
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def flatten(metrics, prefix=''):
+    flat = {}
+    for key, value in metrics.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(flatten(value, f'{name}.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Return a list of (metric, baseline, current, change) for every gated
+    metric that got worse by more than threshold (0.15 = 15%).
+    """
+    regressions = []
+    current_flat = flatten(current)
+    for name, old in flatten(baseline).items():
+        new = current_flat.get(name)
+        if new is None or not old:
+            continue
+        if name.endswith('_ms'):
+            change = (new - old) / old
+        elif name.endswith('_per_sec'):
+            change = (old - new) / old
+        else:
+            continue
+        if change > threshold:
+            regressions.append((name, old, new, change))
+    return regressions
+
+
+def baseline_path(name, path=None):
+    return Path(path) if path else BASELINE_DIR / f'{name}.json'
+
+
+def save_baseline(name, result, path=None):
+    path = baseline_path(name, path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(result, f, indent=2, sort_keys=True)
+        f.write('\n')
+    return path
+
+
+def load_baseline(name, path=None):
+    with open(baseline_path(name, path)) as f:
+        return json.load(f)
+
+
+def benchmark_parser(description):
+    """Argument parser with the options every benchmark understands"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--save', nargs='?', const='', default=None, metavar='PATH',
+                        help='store the results as the baseline (default: benchmarks/baselines/<name>.json)')
+    parser.add_argument('--compare', nargs='?', const='', default=None, metavar='PATH',
+                        help='compare against the stored baseline; exit 1 on a regression')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'allowed slowdown before --compare fails (default: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--output', default=None, help='also write the results to this JSON file')
+    return parser
+
+
+def finish(name, metrics, args, info=None):
+    """Print, save and/or compare a benchmark result; returns the exit code"""
+    result = {
+        'benchmark': name,
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'environment': {**environment(), **(info or {})},
+        'metrics': metrics,
+    }
+    print(json.dumps(metrics, indent=2, sort_keys=True))
+
+    if args.output:
+        save_baseline(name, result, args.output)
+
+    if args.compare is not None:
+        try:
+            baseline = load_baseline(name, args.compare or None)
+        except FileNotFoundError:
+            print(f"❌ No baseline at {baseline_path(name, args.compare or None)} (run with --save first)")
+            return 1
+        if baseline['environment'].get('machine') != result['environment']['machine']:
+            print("⚠️ Baseline was recorded on a different machine type")
+        regressions = compare(metrics, baseline['metrics'], args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for metric, old, new, change in regressions:
+                print(f"   {metric}: {old:g} -> {new:g} ({change:+.1%} worse)")
+            return 1
+        print(f"✅ No regressions beyond {args.threshold:.0%}")
+
+    # Only a run that passed the comparison replaces the baseline
+    if args.save is not None:
+        path = save_baseline(name, result, args.save or None)
+        print(f"✅ Baseline saved to {path}")
+    return 0
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Inference micro-benchmarks for ml_model.prediction (offline, no database).
+
+Measures:
+- single-row make_prediction latency (p50/p95/p99)
+- make_predictions throughput at batch sizes 1/8/64/512/4096
+- peak Python heap (tracemalloc) while loading artifacts and scoring a
+  4096-row batch; memory allocated inside XGBoost/ONNX Runtime's C++ code
+  is not visible to tracemalloc
+- cold load time of the artifacts in a fresh interpreter (imports included)
+
+Inputs are synthetic rows drawn uniformly from each feature's range in the
+training dataset, with a fixed seed. The prediction cache and
+micro-batching are disabled so every call reaches the model.
+
+The served artifacts are benchmarked if they load (registry CURRENT or
+ml_model/*.pkl); otherwise a fixed reference model is trained into a
+temporary directory, so the suite also runs on a fresh checkout.
+
+Usage (from the server directory):
+    python -m benchmarks.inference [--backend NAME] [--model-dir DIR]
+                                   [--save [PATH]] [--compare [PATH]] [--threshold 0.15]
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.common import benchmark_parser, finish, percentiles, time_calls
+from ml_model import prediction
+from ml_model.backends import load_backend
+from ml_model.dataset import load_arrays
+from ml_model.features import FEATURE_COLUMNS
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+BATCH_SIZES = (1, 8, 64, 512, 4096)
+SINGLE_ROW_CALLS = 2000
+MIN_ROWS_PER_BATCH_SIZE = 20000
+COLD_LOAD_RUNS = 3
+SEED = 1234
+
+# Reference model used when no served artifacts can be loaded
+REFERENCE_PARAMS = {'n_estimators': 100, 'max_depth': 4, 'learning_rate': 0.1}
+
+
+def synthetic_inputs(n_rows, seed=SEED):
+    """Assessment dictionaries drawn from each feature's range in the dataset"""
+    features, _ = load_arrays()
+    low = features.min(axis=0)
+    high = features.max(axis=0)
+    rng = np.random.default_rng(seed)
+    # Every feature in the dataset is integer-valued (flags, scores, mg/dL, ...)
+    values = rng.integers(low.astype(np.int64), high.astype(np.int64) + 1,
+                          size=(n_rows, len(FEATURE_COLUMNS)))
+    return [dict(zip(FEATURE_COLUMNS, map(int, row))) for row in values]
+
+
+def write_reference_model(model_dir):
+    """Fit the fixed reference scaler + XGBoost model and write its artifacts"""
+    from sklearn.preprocessing import StandardScaler
+    from ml_model.train import fit_model, write_artifacts
+
+    features, labels = load_arrays()
+    features = np.array(features)
+    scaler = StandardScaler().fit(features)
+    model = fit_model(REFERENCE_PARAMS, scaler.transform(features), np.array(labels))
+    write_artifacts(model_dir, model, scaler, 'pickle', {'params': REFERENCE_PARAMS})
+    return Path(model_dir)
+
+
+def resolve_model_dir(backend_name, model_dir, scratch_dir):
+    """Directory to benchmark: the given one, the served one, or a reference model"""
+    if model_dir:
+        return Path(model_dir), 'given'
+    version = prediction.registry.current_version()
+    served = prediction.registry.version_dir(version) if version else prediction.current_dir
+    try:
+        load_backend(backend_name, served)
+        return Path(served), 'served'
+    except Exception as e:
+        print(f"⚠️ Served artifacts not loadable ({e}); benchmarking the reference model")
+    return write_reference_model(scratch_dir), 'reference'
+
+
+def cold_load_ms(backend_name, model_dir, runs=COLD_LOAD_RUNS):
+    """Median time to import the backend and load its artifacts in a new interpreter"""
+    script = (
+        "import json, sys, time\n"
+        "started = time.perf_counter()\n"
+        "from ml_model.backends import load_backend\n"
+        "load_backend(sys.argv[1], sys.argv[2])\n"
+        "print(json.dumps((time.perf_counter() - started) * 1000.0))\n"
+    )
+    timings = []
+    for _ in range(runs):
+        completed = subprocess.run([sys.executable, '-c', script, backend_name, str(model_dir)],
+                                   cwd=SERVER_DIR, capture_output=True, text=True, check=True)
+        timings.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    return round(statistics.median(timings), 3)
+
+
+def peak_memory(fn):
+    """Peak bytes allocated through Python's allocators while fn() runs"""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmarks(backend_name, model_dir):
+    prediction.disable_prediction_cache()
+    prediction.disable_micro_batching()
+    prediction.install_backend(load_backend(backend_name, model_dir))
+    prediction.warm_up(prediction.backend)
+
+    inputs = synthetic_inputs(max(BATCH_SIZES))
+    metrics = {}
+
+    # Single-row latency, cycling through different rows
+    rows = iter(inputs * (SINGLE_ROW_CALLS // len(inputs) + 2))
+    samples = time_calls(lambda: prediction.make_prediction(next(rows)), SINGLE_ROW_CALLS)
+    metrics['single_row'] = percentiles(samples)
+
+    # Batch throughput
+    metrics['batch'] = {}
+    for batch_size in BATCH_SIZES:
+        batch = inputs[:batch_size]
+        repeats = max(5, MIN_ROWS_PER_BATCH_SIZE // batch_size)
+        samples = time_calls(lambda: prediction.make_predictions(batch), repeats, warmup=2)
+        per_batch = statistics.median(samples)
+        metrics['batch'][str(batch_size)] = {
+            'batch_p50_ms': round(per_batch * 1000.0, 4),
+            'rows_per_sec': round(batch_size / per_batch, 1),
+        }
+
+    metrics['peak_memory_bytes'] = {
+        'load': peak_memory(lambda: load_backend(backend_name, model_dir)),
+        'batch_4096': peak_memory(lambda: prediction.make_predictions(inputs[:4096])),
+    }
+    metrics['cold_load_ms'] = cold_load_ms(backend_name, model_dir)
+    return metrics
+
+
+def main(argv=None):
+    parser = benchmark_parser('Benchmark ML inference latency, throughput and memory')
+    parser.add_argument('--backend', default=prediction.ML_BACKEND,
+                        help=f'backend to benchmark (default: {prediction.ML_BACKEND})')
+    parser.add_argument('--model-dir', default=None,
+                        help='artifact directory (default: the served model, else a reference model)')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        started = time.perf_counter()
+        model_dir, source = resolve_model_dir(args.backend, args.model_dir, scratch_dir)
+        metrics = run_benchmarks(args.backend, model_dir)
+        print(f"⏱️ Benchmarks finished in {time.perf_counter() - started:.1f}s")
+
+        info = {'backend': args.backend, 'model': source,
+                'model_version': prediction.backend.version}
+        return finish(f'inference-{args.backend}', metrics, args, info)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
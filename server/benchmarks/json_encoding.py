@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+JSON encoding benchmark for assessment history responses (no database).
+
+Compares, for 1, 100 and 10,000-row GET /api/assessments payloads:
+
+- default: the previous path, ORM objects -> Assessment.to_dict() (an
+  isoformat() call per timestamp) -> Flask's json.dumps provider
+- orjson:  the current path, column rows with the JSON columns as text ->
+  raw_json() passthrough -> json_provider.OrjsonProvider
+
+Each path is timed from rows to response bytes (p50) and its peak Python
+heap is measured with tracemalloc. Inputs mimic what the database driver
+returns for each path: parsed JSONB dictionaries for the ORM objects, JSON
+text for the column rows.
+
+Usage (from the server directory):
+    python -m benchmarks.json_encoding [--save [PATH]] [--compare [PATH]]
+"""
+
+import datetime
+import json
+import statistics
+import sys
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import json_provider
+from benchmarks.common import benchmark_parser, finish, time_calls
+from benchmarks.inference import peak_memory, synthetic_inputs
+from models import Assessment
+
+ROW_COUNTS = (1, 100, 10000)
+MIN_ROWS_PER_SIZE = 100000
+
+
+def make_rows(n_rows):
+    """ORM objects and the equivalent (created_at, id, ...) column rows"""
+    inputs = synthetic_inputs(n_rows)
+    start = datetime.datetime(2025, 1, 1, 8, 0, 0, 123456)
+    objects, column_rows = [], []
+    for i, data in enumerate(inputs):
+        result = {'risk_score': round((i % 97) / 97, 4), 'risk_level': 'Low',
+                  'recommendations': ['Keep up regular exercise'], 'model_version': 'v1'}
+        created_at = start + datetime.timedelta(minutes=i)
+        objects.append(Assessment(assessment_id=i + 1, user_id=1, assessment_data=data,
+                                  prediction_result=result, created_at=created_at,
+                                  updated_at=created_at))
+        column_rows.append((created_at, i + 1, i + 1, 1, json.dumps(data), json.dumps(result),
+                            created_at, created_at))
+    return objects, column_rows
+
+
+def encode_default(provider, objects):
+    assessments = [assessment.to_dict() for assessment in objects]
+    return provider.dumps({'assessments': assessments, 'count': len(assessments),
+                           'next_cursor': None}).encode('utf-8')
+
+
+def encode_orjson(provider, column_rows):
+    # Mirrors Assessment.page_for_user + the route's response
+    fields = Assessment.DEFAULT_FIELDS
+    raw_positions = [i for i, field in enumerate(fields) if field in Assessment.RAW_JSON_FIELDS]
+    assessments = []
+    for row in column_rows:
+        values = list(row[2:])
+        for i in raw_positions:
+            values[i] = json_provider.raw_json(values[i])
+        assessments.append(dict(zip(fields, values)))
+    return provider.dumps_bytes({'assessments': assessments, 'count': len(assessments),
+                                 'next_cursor': None})
+
+
+def run_benchmarks():
+    if json_provider.orjson is None:
+        raise RuntimeError('orjson is not installed')
+
+    app = Flask('json-benchmark')
+    default_provider = DefaultJSONProvider(app)
+    orjson_provider = json_provider.OrjsonProvider(app)
+    orjson_provider.sort_keys = False
+
+    metrics = {}
+    for n_rows in ROW_COUNTS:
+        objects, column_rows = make_rows(n_rows)
+        default_bytes = encode_default(default_provider, objects)
+        orjson_bytes = encode_orjson(orjson_provider, column_rows)
+        assert json.loads(default_bytes) == json.loads(orjson_bytes), 'payloads differ'
+
+        repeats = max(5, MIN_ROWS_PER_SIZE // n_rows)
+        default_ms = statistics.median(time_calls(
+            lambda: encode_default(default_provider, objects), repeats, warmup=2)) * 1000.0
+        orjson_ms = statistics.median(time_calls(
+            lambda: encode_orjson(orjson_provider, column_rows), repeats, warmup=2)) * 1000.0
+
+        metrics[f'rows_{n_rows}'] = {
+            'default_p50_ms': round(default_ms, 4),
+            'orjson_p50_ms': round(orjson_ms, 4),
+            'speedup': round(default_ms / orjson_ms, 2),
+            'default_peak_bytes': peak_memory(lambda: encode_default(default_provider, objects)),
+            'orjson_peak_bytes': peak_memory(lambda: encode_orjson(orjson_provider, column_rows)),
+            'response_bytes': len(orjson_bytes),
+        }
+        print(f"⏱️ {n_rows} rows: default {default_ms:.3f} ms, orjson {orjson_ms:.3f} ms "
+              f"({default_ms / orjson_ms:.1f}x)")
+    return metrics
+
+
+def main(argv=None):
+    parser = benchmark_parser('Benchmark JSON encoding of assessment history responses')
+    args = parser.parse_args(argv)
+    return finish('json_encoding', run_benchmarks(), args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+In-process load test for the Flask API.
+
+Virtual users run on threads and call the real app through its WSGI
+interface (Flask's test client, no sockets), each repeating the flow
+
+    register -> login -> create assessment(s) -> history -> dashboard
+
+against a throwaway SQLite database (or any DATABASE_URL given with
+--database-url, e.g. a local Postgres). All users share one process and
+one GIL, so the numbers approximate a single threaded gunicorn worker;
+multiply by the worker count for a first capacity estimate.
+
+Reports per endpoint: request count, error rate, latency percentiles,
+throughput and a latency histogram. Results use the benchmark baseline
+format, so --save/--compare work as in benchmarks.inference.
+
+Usage (from the server directory):
+    python -m benchmarks.load_test [--users 20] [--iterations 5]
+                                   [--assessments 3] [--database-url URL]
+                                   [--save [PATH]] [--compare [PATH]]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from benchmarks.common import benchmark_parser, finish, percentiles
+
+# Latency histogram bucket upper bounds in milliseconds
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class EndpointStats:
+    """Latencies and errors recorded per endpoint, shared by all virtual users"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.status_codes = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint, seconds, status, ok):
+        with self._lock:
+            self.samples[endpoint].append(seconds)
+            self.status_codes[endpoint][str(status)] += 1
+            if not ok:
+                self.errors[endpoint] += 1
+
+    def report(self, elapsed):
+        report = {}
+        for endpoint, samples in sorted(self.samples.items()):
+            histogram = {}
+            for bound in HISTOGRAM_BUCKETS_MS:
+                histogram[f'le_{bound}'] = sum(1 for s in samples if s * 1000.0 <= bound)
+            histogram['le_inf'] = len(samples)
+            report[endpoint] = {
+                'requests': len(samples),
+                'errors': self.errors[endpoint],
+                'error_rate': round(self.errors[endpoint] / len(samples), 4),
+                'requests_per_sec': round(len(samples) / elapsed, 2),
+                'latency': percentiles(samples),
+                'histogram': histogram,
+                'status_codes': dict(self.status_codes[endpoint]),
+            }
+        return report
+
+
+class VirtualUser(threading.Thread):
+    """One simulated user running the register -> dashboard flow"""
+
+    def __init__(self, app, stats, inputs, iterations, assessments, barrier):
+        super().__init__(daemon=True)
+        self.client = app.test_client()
+        self.stats = stats
+        self.inputs = inputs
+        self.iterations = iterations
+        self.assessments = assessments
+        self.barrier = barrier
+        self.failure = None
+
+    def call(self, endpoint, method, path, expected, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.client.open(path, method=method, **kwargs)
+        except Exception as e:
+            self.stats.record(endpoint, time.perf_counter() - started, 'exception', False)
+            raise RuntimeError(f'{endpoint} raised {e}')
+        elapsed = time.perf_counter() - started
+        ok = response.status_code == expected
+        self.stats.record(endpoint, elapsed, response.status_code, ok)
+        if not ok:
+            raise RuntimeError(f'{endpoint} returned {response.status_code}')
+        return response.get_json()
+
+    def flow(self, iteration):
+        email = f'load-{uuid.uuid4().hex}@example.com'
+        password = 'load-test-password'
+        self.call('POST /api/auth/register', 'POST', '/api/auth/register', 201,
+                  json={'fullName': 'Load Test', 'email': email, 'password': password})
+        token = self.call('POST /api/auth/login', 'POST', '/api/auth/login', 200,
+                          json={'email': email, 'password': password})['token']
+        headers = {'Authorization': f'Bearer {token}'}
+
+        for i in range(self.assessments):
+            data = self.inputs[(iteration * self.assessments + i) % len(self.inputs)]
+            self.call('POST /api/assessments', 'POST', '/api/assessments', 201,
+                      json={'assessment_data': data}, headers=headers)
+        self.call('GET /api/assessments', 'GET', '/api/assessments', 200, headers=headers)
+        self.call('GET /api/dashboard/stats', 'GET', '/api/dashboard/stats', 200, headers=headers)
+
+    def run(self):
+        self.barrier.wait()
+        for iteration in range(self.iterations):
+            try:
+                self.flow(iteration)
+            except RuntimeError as e:
+                # Later steps of a broken flow are skipped, the next iteration starts over
+                self.failure = str(e)
+
+
+def prepare_app(database_url):
+    """Import the app against database_url and make sure a model is serving"""
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('ML_PRELOAD_MODEL', 'true')
+    os.environ.setdefault('ML_REGISTRY_POLL_SECONDS', '0')
+
+    import app as app_module
+    from ml_model import prediction
+    from ml_model.backends import load_backend
+    from models import create_tables, db
+
+    create_tables(app_module.app)
+    if database_url.startswith('sqlite'):
+        with app_module.app.app_context():
+            db.session.execute(db.text('PRAGMA journal_mode=WAL'))
+            db.session.commit()
+
+    if prediction.backend is None:
+        from benchmarks.inference import resolve_model_dir
+        scratch_dir = tempfile.mkdtemp(prefix='load-test-model-')
+        model_dir, _ = resolve_model_dir('pickle', None, scratch_dir)
+        prediction.install_backend(load_backend('pickle', model_dir))
+    return app_module.app
+
+
+def run_load_test(app, users, iterations, assessments):
+    from benchmarks.inference import synthetic_inputs
+
+    stats = EndpointStats()
+    inputs = synthetic_inputs(1000)
+    barrier = threading.Barrier(users + 1)
+    threads = [VirtualUser(app, stats, inputs, iterations, assessments, barrier)
+               for _ in range(users)]
+    for thread in threads:
+        thread.start()
+
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    endpoints = stats.report(elapsed)
+    total = sum(e['requests'] for e in endpoints.values())
+    errors = sum(e['errors'] for e in endpoints.values())
+    return {
+        'users': users,
+        'duration_s': round(elapsed, 3),
+        'requests': total,
+        'errors': errors,
+        'error_rate': round(errors / total, 4) if total else 0.0,
+        'requests_per_sec': round(total / elapsed, 2),
+        'flows_per_sec': round(users * iterations / elapsed, 2),
+        'endpoints': endpoints,
+    }
+
+
+def print_summary(metrics):
+    print(f"{'ENDPOINT':<28} {'REQS':>6} {'ERR%':>6} {'REQ/S':>8} "
+          f"{'P50 MS':>8} {'P95 MS':>8} {'P99 MS':>8}")
+    for endpoint, stats in metrics['endpoints'].items():
+        latency = stats['latency']
+        print(f"{endpoint:<28} {stats['requests']:>6} {stats['error_rate'] * 100:>6.1f} "
+              f"{stats['requests_per_sec']:>8.1f} {latency['p50_ms']:>8.1f} "
+              f"{latency['p95_ms']:>8.1f} {latency['p99_ms']:>8.1f}")
+    print(f"⏱️ {metrics['requests']} requests in {metrics['duration_s']}s "
+          f"({metrics['requests_per_sec']} req/s, {metrics['error_rate'] * 100:.1f}% errors)")
+
+
+def main(argv=None):
+    parser = benchmark_parser('Load test the API in-process with virtual users')
+    parser.add_argument('--users', type=int, default=20, help='concurrent virtual users (default: 20)')
+    parser.add_argument('--iterations', type=int, default=5,
+                        help='flows per virtual user (default: 5)')
+    parser.add_argument('--assessments', type=int, default=3,
+                        help='assessments created per flow (default: 3)')
+    parser.add_argument('--database-url', default=None,
+                        help='database to use (default: a temporary SQLite file)')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite:///{os.path.join(tmp, 'load_test.db')}"
+        app = prepare_app(database_url)
+        metrics = run_load_test(app, args.users, args.iterations, args.assessments)
+
+        print_summary(metrics)
+        info = {'database': database_url.split(':', 1)[0], 'users': args.users,
+                'iterations': args.iterations, 'assessments': args.assessments}
+        return finish('load_test', metrics, args, info)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Cost of the in-process metrics (no database).
+
+- record: inc(), observe() and time() on a labels() child per call (mean
+  over many calls, in microseconds), and observe() with keyword labels
+- request: extra latency instrument_app adds to a request on a bare Flask
+  app (Flask test client, p50 with hooks minus p50 without)
+- scrape: render() of /metrics with the snapshots of --workers simulated
+  workers in the metrics directory
+
+Usage (from the server directory):
+    python -m benchmarks.metrics_overhead [--workers 4] [--save [PATH]] [--compare [PATH]]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from flask import Flask
+
+from benchmarks.common import benchmark_parser, finish, time_calls
+from metrics import MetricsRegistry, instrument_app
+
+RECORD_CALLS = 200000
+REQUESTS = 2000
+SCRAPES = 50
+ROUTES = ('/api/assessments', '/api/assessments/<int:assessment_id>', '/api/dashboard/stats',
+          '/api/auth/login', '/health')
+
+
+def per_call_us(fn, calls=RECORD_CALLS):
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return round((time.perf_counter() - started) * 1e6 / calls, 3)
+
+
+def bench_record():
+    registry = MetricsRegistry()
+    counter = registry.counter('bench_total', 'Bench', ('method', 'route', 'status'))
+    histogram = registry.histogram('bench_seconds', 'Bench', ('method', 'route'))
+
+    def timed_block():
+        with histogram.labels('GET', '/api/dashboard/stats').time():
+            pass
+
+    return {
+        'counter_inc_us': per_call_us(lambda: counter.labels('GET', '/health', 200).inc()),
+        'histogram_observe_us': per_call_us(
+            lambda: histogram.labels('GET', '/health').observe(0.0042)),
+        'histogram_time_us': per_call_us(timed_block),
+        'histogram_observe_kwargs_us': per_call_us(
+            lambda: histogram.observe(0.0042, method='GET', route='/health')),
+    }
+
+
+def request_p50(instrumented):
+    app = Flask(__name__)
+    if instrumented:
+        instrument_app(MetricsRegistry(), app)
+
+    @app.route('/ping')
+    def ping():
+        return 'ok'
+
+    client = app.test_client()
+    return statistics.median(time_calls(lambda: client.get('/ping'), REQUESTS, warmup=100))
+
+
+def bench_scrape(workers):
+    with tempfile.TemporaryDirectory() as metrics_dir:
+        registry = MetricsRegistry(directory=metrics_dir, flush_seconds=0)
+        counter = registry.counter('http_requests_total', 'Requests', ('method', 'route', 'status'))
+        histogram = registry.histogram('http_request_duration_seconds', 'Latency', ('method', 'route'))
+        for route in ROUTES:
+            for method in ('GET', 'POST'):
+                counter.inc(method=method, route=route, status=200)
+                histogram.observe(0.003, method=method, route=route)
+        registry.flush()
+
+        # Other workers' snapshots look like this one
+        own_path = os.path.join(metrics_dir, f'metrics-{os.getpid()}.json')
+        with open(own_path) as f:
+            snapshot = f.read()
+        for pid in range(1, workers):
+            with open(os.path.join(metrics_dir, f'metrics-{2 ** 22 + pid}.json'), 'w') as f:
+                f.write(snapshot)
+
+        samples = time_calls(registry.render, SCRAPES, warmup=2)
+        return {'render_ms': round(statistics.median(samples) * 1000.0, 3),
+                'bytes': len(registry.render())}
+
+
+def main(argv=None):
+    parser = benchmark_parser('Benchmark the cost of recording and scraping metrics')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='worker snapshots merged per scrape (default: 4)')
+    args = parser.parse_args(argv)
+
+    bare, instrumented = request_p50(False), request_p50(True)
+    metrics = {
+        'record': bench_record(),
+        'request': {
+            'bare_p50_us': round(bare * 1e6, 1),
+            'instrumented_p50_us': round(instrumented * 1e6, 1),
+            'overhead_us': round((instrumented - bare) * 1e6, 1),
+        },
+        'scrape': bench_scrape(args.workers),
+    }
+    print(f"⏱️ observe {metrics['record']['histogram_observe_us']} us, "
+          f"request overhead {metrics['request']['overhead_us']} us, "
+          f"scrape of {args.workers} workers {metrics['scrape']['render_ms']} ms")
+    return finish('metrics_overhead', metrics, args, {'workers': args.workers})
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Login throughput with bcrypt inline vs. on the password hashing pool.
+
+Concurrent threads log in through the real app (Flask test client, a
+throwaway SQLite database) while a probe thread keeps requesting
+/api/dashboard/stats, the cheap authenticated traffic a login spike should
+not starve. Each mode reports login throughput and latency, probe latency
+and how many logins were shed with 503:
+
+- inline: PasswordHasher(workers=0), bcrypt on the request threads
+- pool:   PasswordHasher(workers=N), bcrypt in a process pool
+
+Usage (from the server directory):
+    python -m benchmarks.password_hashing [--threads 16] [--logins 10]
+                                          [--rounds 12] [--workers N]
+                                          [--save [PATH]] [--compare [PATH]]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from benchmarks.common import benchmark_parser, finish, percentiles
+from benchmarks.load_test import prepare_app
+
+PASSWORD = 'benchmark-password'
+
+
+def run_mode(app_module, hasher, credentials, logins_per_thread, probe_headers):
+    """Run the login spike with hasher installed; returns this mode's metrics"""
+    app_module.password_hasher = hasher
+    app = app_module.app
+    barrier = threading.Barrier(len(credentials) + 1)
+    done = threading.Event()
+    lock = threading.Lock()
+    login_samples, probe_samples = [], []
+    outcomes = {'ok': 0, 'shed': 0, 'error': 0}
+
+    def login_worker(email):
+        client = app.test_client()
+        barrier.wait()
+        for _ in range(logins_per_thread):
+            started = time.perf_counter()
+            response = client.post('/api/auth/login', json={'email': email, 'password': PASSWORD})
+            elapsed = time.perf_counter() - started
+            with lock:
+                login_samples.append(elapsed)
+                if response.status_code == 200:
+                    outcomes['ok'] += 1
+                elif response.status_code == 503:
+                    outcomes['shed'] += 1
+                else:
+                    outcomes['error'] += 1
+
+    def probe():
+        client = app.test_client()
+        while not done.is_set():
+            started = time.perf_counter()
+            client.get('/api/dashboard/stats', headers=probe_headers)
+            probe_samples.append(time.perf_counter() - started)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=login_worker, args=(email,), daemon=True)
+               for email in credentials]
+    probe_thread = threading.Thread(target=probe, daemon=True)
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    probe_thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    probe_thread.join()
+    hasher.shutdown()
+
+    return {
+        'logins_per_sec': round(outcomes['ok'] / elapsed, 2),
+        'login': percentiles(login_samples),
+        'probe': percentiles(probe_samples or [0.0]),
+        'succeeded': outcomes['ok'],
+        'shed_503': outcomes['shed'],
+        'errors': outcomes['error'],
+    }
+
+
+def run_benchmarks(threads, logins_per_thread, rounds, workers, queue_size):
+    from password_hashing import PasswordHasher
+
+    with tempfile.TemporaryDirectory() as tmp:
+        prepare_app(f"sqlite:///{os.path.join(tmp, 'password_hashing.db')}")
+        import app as app_module
+
+        # Accounts are created once, at the benchmarked cost
+        app_module.password_hasher = PasswordHasher(rounds=rounds, workers=0, queue_size=threads)
+        client = app_module.app.test_client()
+        credentials = []
+        for _ in range(threads + 1):
+            email = f'bcrypt-{uuid.uuid4().hex}@example.com'
+            response = client.post('/api/auth/register',
+                                   json={'fullName': 'Bcrypt Bench', 'email': email, 'password': PASSWORD})
+            credentials.append((email, response.get_json()['token']))
+        probe_headers = {'Authorization': f'Bearer {credentials.pop()[1]}'}
+        emails = [email for email, _ in credentials]
+
+        metrics = {}
+        for mode, hasher in (
+            ('inline', PasswordHasher(rounds=rounds, workers=0, queue_size=threads)),
+            ('pool', PasswordHasher(rounds=rounds, workers=workers, queue_size=queue_size)),
+        ):
+            metrics[mode] = run_mode(app_module, hasher, emails, logins_per_thread, probe_headers)
+            print(f"⏱️ {mode}: {metrics[mode]['logins_per_sec']} logins/s, "
+                  f"login p95 {metrics[mode]['login']['p95_ms']:.0f} ms, "
+                  f"probe p95 {metrics[mode]['probe']['p95_ms']:.1f} ms, "
+                  f"{metrics[mode]['shed_503']} shed")
+        return metrics
+
+
+def main(argv=None):
+    parser = benchmark_parser('Benchmark login throughput with and without the bcrypt pool')
+    parser.add_argument('--threads', type=int, default=16, help='concurrent login threads (default: 16)')
+    parser.add_argument('--logins', type=int, default=10, help='logins per thread (default: 10)')
+    parser.add_argument('--rounds', type=int, default=12, help='bcrypt cost (default: 12)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='pool processes (default: CPU count)')
+    parser.add_argument('--queue', type=int, default=None,
+                        help='pool queue size (default: --threads, so nothing is shed)')
+    args = parser.parse_args(argv)
+
+    queue_size = args.queue if args.queue is not None else args.threads
+    metrics = run_benchmarks(args.threads, args.logins, args.rounds, args.workers, queue_size)
+    info = {'threads': args.threads, 'logins': args.logins, 'rounds': args.rounds,
+            'workers': args.workers, 'queue': queue_size}
+    return finish('password_hashing', metrics, args, info)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""
+Gunicorn configuration for the Cardio Care API.
+
+Gunicorn reads this file automatically when started from the server
+directory:
+
+    gunicorn -w 4 -b 0.0.0.0:5000 app:app
+
+The app (and with it the ML model) is imported once in the master before
+the workers are forked, so the model weights are shared copy-on-write
+instead of being loaded once per worker. Check the effect with:
+
+    python -m ml_model.memory --parent <master pid>
+
+Each worker keeps its own metrics; they meet in METRICS_DIR (a fresh
+temporary directory unless set), where /metrics adds them up.
+"""
+
+import os
+import sys
+import tempfile
+
+# Import app.py in the master and load the model there before forking
+preload_app = True
+os.environ.setdefault('ML_PRELOAD_MODEL', 'true')
+
+# Shared by the workers' metrics snapshots; must be set before app.py is imported
+os.environ.setdefault('METRICS_DIR', tempfile.mkdtemp(prefix='cardio-care-metrics-'))
+
+
+def on_starting(server):
+    # Counters of a previous run's workers must not be added to this run's
+    import metrics
+    metrics.clear_directory(os.environ['METRICS_DIR'])
+
+
+def post_fork(server, worker):
+    app_module = sys.modules.get('app')
+    if app_module is None:
+        return
+
+    # The master starts no threads; each worker runs its own registry watcher
+    from ml_model import prediction
+    prediction.after_fork(app_module.ML_REGISTRY_POLL_SECONDS)
+
+    # The bcrypt pools of all workers share the host's cores
+    app_module.password_hasher.share_host(server.cfg.workers)
@@ -15,7 +15,7 @@ server_dir = Path(__file__).parent
 sys.path.append(str(server_dir))
 
 from app import app, db
-from models import User, Assessment, create_tables, seed_test_data, get_db_stats
+from models import User, Assessment, create_tables, seed_test_data, get_db_stats, rebuild_risk_rollups
 
 def init_database():
     """Initialize database tables"""
@@ -58,6 +58,18 @@ def seed_development_data():
     except Exception as e:
         print(f"❌ Data seeding failed: {e}")
 
+def rebuild_rollups():
+    """Backfill the per-user dashboard rollups from existing assessments"""
+    print("\n🔄 Rebuilding user risk rollups...")
+    
+    try:
+        with app.app_context():
+            rebuilt = rebuild_risk_rollups()
+            print(f"✅ Rebuilt rollups for {rebuilt} users")
+            
+    except Exception as e:
+        print(f"❌ Rollup rebuild failed: {e}")
+
 def reset_database():
     """Reset database by dropping and recreating all tables"""
     print("\n⚠️  RESETTING DATABASE - This will delete all data!")
@@ -94,10 +106,13 @@ if __name__ == "__main__":
             seed_development_data()
         elif len(sys.argv) > 1 and sys.argv[1] == '--reset':
             reset_database()
+        elif len(sys.argv) > 1 and sys.argv[1] == '--rebuild-rollups':
+            rebuild_rollups()
         else:
             print("\nOptions:")
             print("  python init_db.py --seed    # Add test users")
             print("  python init_db.py --reset   # Reset entire database")
+            print("  python init_db.py --rebuild-rollups   # Backfill dashboard rollups")
             
         print("\n🎉 Database initialization complete!")
         print("   You can now start the Flask server with: python app.py")
@@ -0,0 +1,97 @@
+"""
+JSON encoding for API responses
+
+OrjsonProvider replaces Flask's default JSON provider (json.dumps plus a
+per-object default() hook) with orjson, which encodes straight to bytes in
+C and natively handles datetimes (ISO 8601, as isoformat() would write
+them), NumPy scalars and arrays, UUIDs and dataclasses. Only encoding
+changes; request bodies are parsed by json.loads as before.
+
+raw_json() wraps JSON text that is already serialized, e.g. a JSONB column
+read as text, so it is copied into the response instead of being parsed
+into Python objects and encoded again.
+
+Without orjson installed the app keeps a json.dumps based provider with
+the same datetime/NumPy handling, and raw_json() parses its input.
+"""
+
+import datetime
+import decimal
+import json
+
+import numpy as np
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def raw_json(text):
+    """Pass pre-serialized JSON text through the encoder unchanged (None stays None)"""
+    if text is None:
+        return None
+    if orjson is not None:
+        return orjson.Fragment(text)
+    return json.loads(text)
+
+
+def _default(obj):
+    """Types neither encoder handles natively"""
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+class IsoJSONProvider(DefaultJSONProvider):
+    """Flask's json.dumps provider, but with ISO 8601 datetimes and NumPy support"""
+
+    default = staticmethod(_default)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Encode responses with orjson; output is compact unless Flask asks for indentation.
+
+    Request bodies are still parsed by the inherited json.loads: orjson
+    rejects NaN/Infinity and integers beyond 64 bits, which clients may
+    already be sending.
+    """
+
+    options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def _options(self, indent=False):
+        option = self.options
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps_bytes(self, obj, indent=False):
+        return orjson.dumps(obj, default=_default, option=self._options(indent))
+
+    def dumps(self, obj, **kwargs):
+        return self.dumps_bytes(obj, indent=bool(kwargs.get('indent'))).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(self.dumps_bytes(obj, indent) + b'\n', mimetype=self.mimetype)
+
+
+def install(app):
+    """Use the fastest available provider for app's JSON responses"""
+    app.json = OrjsonProvider(app) if orjson is not None else IsoJSONProvider(app)
+    # Key order follows the dictionaries; sorting every response costs time
+    app.json.sort_keys = False
+    return app.json
@@ -0,0 +1,401 @@
+"""
+In-process metrics in the Prometheus text format.
+
+Counters and histograms live in plain Python objects, so recording a value
+on a labels() child costs a dict lookup, a lock, a bisect and a few
+additions (about a microsecond; see benchmarks/metrics_overhead.py). Gauges and externally kept counters are
+read from callbacks only when metrics are collected.
+
+Across gunicorn workers: with a metrics directory configured (METRICS_DIR,
+set up by gunicorn.conf.py), every worker starts a thread on its first
+request that writes a JSON snapshot of its values to
+<dir>/metrics-<pid>.json every flush_seconds, and /metrics adds up the
+snapshots of all workers plus the live values of the worker that serves
+the scrape. Counters and histograms of workers that have exited are
+kept (they are cumulative); gauges only count live workers. Other workers'
+figures are at most flush_seconds old.
+"""
+
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+
+# Latency buckets in seconds (Prometheus defaults plus sub-millisecond ones)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames, key, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, key)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Labelled metric; labels(*values) returns the child that holds the value"""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+
+    def labels(self, *values):
+        """Child for one label combination; keep it to skip the lookup on hot paths"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f'{self.name} expects labels {self.labelnames}')
+            with self._lock:
+                child = self._children.setdefault(
+                    tuple(str(value) for value in values), self._new_child())
+                self._children[values] = child
+        return child
+
+    def _child(self, labels):
+        return self.labels(*(labels[name] for name in self.labelnames))
+
+    def snapshot(self):
+        with self._lock:
+            # Children are also stored under their unconverted label values
+            children = {tuple(str(value) for value in key): child
+                        for key, child in self._children.items()}
+        return {json.dumps(key): child.value() for key, child in children.items()}
+
+
+class _CounterChild:
+    __slots__ = ('_lock', '_value')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def value(self):
+        return self._value
+
+
+class Counter(_Metric):
+    """Monotonic counter with labels"""
+
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1, **labels):
+        self._child(labels).inc(amount)
+
+
+class _HistogramChild:
+    __slots__ = ('_lock', '_buckets', '_values')
+
+    def __init__(self, buckets):
+        self._lock = threading.Lock()
+        self._buckets = buckets
+        self._values = [0] * (len(buckets) + 1) + [0.0]  # count per bucket..., +Inf count, sum
+
+    def observe(self, value):
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self._values[index] += 1
+            self._values[-1] += value
+
+    def time(self):
+        """Context manager observing the duration of the enclosed block"""
+        return _Timer(self)
+
+    def value(self):
+        with self._lock:
+            return list(self._values)
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram with labels"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value, **labels):
+        self._child(labels).observe(value)
+
+    def time(self, **labels):
+        return _Timer(self._child(labels))
+
+
+class _Timer:
+    __slots__ = ('child', 'started')
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.started)
+        return False
+
+
+class MetricsRegistry:
+    """Metrics of this process, merged with the other workers' snapshots on collect()"""
+
+    def __init__(self, directory=None, flush_seconds=5.0):
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self.metrics = {}
+        self.collectors = []
+        self.scrape_collectors = []
+        self._flusher = None
+        self._flusher_pid = None
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector, scrape_only=False):
+        """
+        collector() returns samples read at collection time:
+        [(name, kind ('gauge' or 'counter'), documentation, {label: value}, value), ...]
+
+        Values that are the same in every worker (e.g. read from the
+        database) must be scrape_only: they are read by the worker serving
+        /metrics only, instead of being added up over all workers.
+        """
+        (self.scrape_collectors if scrape_only else self.collectors).append(collector)
+
+    def snapshot(self, scrape=False):
+        """JSON-serializable values of this process (scrape: include scrape_only collectors)"""
+        families = {}
+        for metric in self.metrics.values():
+            families[metric.name] = {
+                'kind': metric.kind,
+                'documentation': metric.documentation,
+                'labelnames': list(metric.labelnames),
+                'buckets': list(getattr(metric, 'buckets', ())),
+                'values': metric.snapshot(),
+            }
+        for collector in self.collectors + (self.scrape_collectors if scrape else []):
+            try:
+                samples = collector()
+            except Exception as e:
+                print(f"⚠️ Metrics collector failed: {e}")
+                continue
+            for name, kind, documentation, labels, value in samples:
+                family = families.setdefault(name, {
+                    'kind': kind, 'documentation': documentation,
+                    'labelnames': sorted(labels), 'buckets': [], 'values': {},
+                })
+                key = json.dumps([str(labels[n]) for n in family['labelnames']])
+                family['values'][key] = family['values'].get(key, 0) + value
+        return {'pid': os.getpid(), 'time': time.time(), 'families': families}
+
+    # Cross-worker aggregation
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f'metrics-{pid}.json')
+
+    def flush(self):
+        """Write this process's snapshot for the other workers' /metrics"""
+        if not self.directory:
+            return
+        path = self._path(os.getpid())
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def _run_flusher(self):
+        while not self._stop.wait(self.flush_seconds):
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"⚠️ Metrics flush failed: {e}")
+
+    def ensure_started(self):
+        """
+        Start the flush thread in this process if it is not running yet.
+        Called per request, so each gunicorn worker starts its own after the fork.
+        """
+        if self._flusher_pid == os.getpid() or not self.directory or self.flush_seconds <= 0:
+            return
+        with self._start_lock:
+            if self._flusher_pid == os.getpid():
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            self._stop = threading.Event()
+            self._flusher = threading.Thread(target=self._run_flusher, name='metrics-flusher',
+                                             daemon=True)
+            self._flusher.start()
+            self._flusher_pid = os.getpid()
+
+    def stop(self):
+        self._stop.set()
+        self._flusher_pid = None
+
+    def _worker_snapshots(self):
+        snapshots = [self.snapshot(scrape=True)]
+        if not self.directory:
+            return snapshots
+        own_pid = os.getpid()
+        for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+            try:
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if snapshot['pid'] != own_pid:
+                snapshot['alive'] = _pid_alive(snapshot['pid'])
+                snapshots.append(snapshot)
+        return snapshots
+
+    def collect(self):
+        """All workers' metrics merged into one family dict"""
+        merged = {}
+        for snapshot in self._worker_snapshots():
+            for name, family in snapshot['families'].items():
+                if family['kind'] == 'gauge' and not snapshot.get('alive', True):
+                    continue
+                target = merged.setdefault(name, {**family, 'values': {}})
+                for key, value in family['values'].items():
+                    if family['kind'] == 'histogram':
+                        current = target['values'].get(key)
+                        target['values'][key] = (list(value) if current is None
+                                                 else [a + b for a, b in zip(current, value)])
+                    else:
+                        target['values'][key] = target['values'].get(key, 0) + value
+        return merged
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for name, family in sorted(self.collect().items()):
+            lines.append(f"# HELP {name} {family['documentation']}")
+            lines.append(f"# TYPE {name} {family['kind']}")
+            labelnames = family['labelnames']
+            for key_json, value in sorted(family['values'].items()):
+                key = json.loads(key_json)
+                if family['kind'] != 'histogram':
+                    lines.append(f'{name}{_format_labels(labelnames, key)} {_format_value(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(list(family['buckets']) + [float('inf')], value[:-1]):
+                    cumulative += count
+                    le = f'le="{_format_value(float(bound))}"'
+                    lines.append(f'{name}_bucket{_format_labels(labelnames, key, le)} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(labelnames, key)} {_format_value(value[-1])}')
+                lines.append(f'{name}_count{_format_labels(labelnames, key)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+def clear_directory(directory):
+    """Remove the snapshots of a previous server run (call before forking workers)"""
+    for path in glob.glob(os.path.join(directory, 'metrics-*.json*')):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def instrument_app(registry, app):
+    """Count requests and time them per method, route template and status"""
+    from flask import g, request
+
+    requests_total = registry.counter(
+        'http_requests_total', 'HTTP requests handled', ('method', 'route', 'status'))
+    request_seconds = registry.histogram(
+        'http_request_duration_seconds', 'HTTP request latency', ('method', 'route'))
+
+    def start_request():
+        registry.ensure_started()
+        g.metrics_started = time.perf_counter()
+
+    def finish_request(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            # Route templates keep the label set bounded; unmatched paths share one label
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            request_seconds.labels(request.method, route).observe(time.perf_counter() - started)
+            requests_total.labels(request.method, route, response.status_code).inc()
+        return response
+
+    app.before_request(start_request)
+    app.after_request(finish_request)
+    return requests_total, request_seconds
+
+
+def instrument_engine(registry, engine):
+    """Connection pool gauges and the time spent waiting for a pooled connection"""
+    checkout_seconds = registry.histogram(
+        'db_pool_checkout_wait_seconds', 'Time spent waiting for a pooled DB connection').labels()
+    raw_connection = engine.raw_connection
+
+    def timed_raw_connection(*args, **kwargs):
+        with checkout_seconds.time():
+            return raw_connection(*args, **kwargs)
+
+    # Engine.connect() checks out through raw_connection(), which reads engine.pool
+    # on every call, so this also covers pools replaced by engine.dispose()
+    engine.raw_connection = timed_raw_connection
+
+    def pool_gauges():
+        pool = engine.pool
+        samples = []
+        for name, method, documentation in (
+            ('db_pool_size', 'size', 'Configured connection pool size'),
+            ('db_pool_checked_out', 'checkedout', 'Connections currently checked out'),
+            ('db_pool_overflow', 'overflow', 'Connections open beyond the pool size'),
+        ):
+            # Only QueuePool-style pools report these
+            if hasattr(pool, method):
+                samples.append((name, 'gauge', documentation, {}, getattr(pool, method)()))
+        return samples
+
+    registry.add_collector(pool_gauges)
+    return checkout_seconds
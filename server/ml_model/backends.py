@@ -0,0 +1,198 @@
+"""
+Inference backends for the Cardio Care risk model.
+
+A backend owns the loaded artifacts and turns an (N, 21) feature matrix in
+training column order into an (N, 2) array of class probabilities.
+
+- pickle: unpickles scaler.pkl + model.pkl and calls sklearn/XGBoost
+- onnx:   runs model.onnx (scaler and model fused into one graph, see
+          ml_model/onnx_export.py) with ONNX Runtime, which releases the
+          GIL while it computes
+- numpy:  evaluates model_trees.npz (see ml_model/tree_engine.py) with
+          NumPy only, without importing sklearn or xgboost
+- fused:  like numpy, but model_fused.npz has the scaler folded into
+          raw-unit thresholds, so there is no scaling step at all
+
+The numpy and fused backends can memory-map their arrays (mmap=True), so
+every worker process reads the same page-cache pages.
+"""
+
+import hashlib
+from pathlib import Path
+
+import numpy as np
+
+from ml_model.startup import load_pickle, startup_report
+from ml_model.tree_engine import FUSED_FILENAME, TREES_FILENAME, TreeEnsemble
+
+
+def artifact_version(*paths):
+    """Return a short content hash identifying a set of artifact files"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def apply_scaler(scaler, features):
+    """
+    Apply a fitted scaler to a feature matrix.
+
+    A StandardScaler is applied with NumPy, which skips sklearn's input
+    validation on the hot path; any other scaler uses transform(). The
+    caller's array is never modified (it may be read-only or integer).
+    """
+    if type(scaler).__name__ == 'StandardScaler':
+        # One float64 copy owned by this call, then scaled in place
+        scaled = np.array(features, dtype=np.float64)
+        if scaler.with_mean:
+            np.subtract(scaled, scaler.mean_, out=scaled)
+        if scaler.with_std:
+            np.divide(scaled, scaler.scale_, out=scaled)
+        return scaled
+    return scaler.transform(features)
+
+
+class InferenceBackend:
+    """Interface shared by all inference backends"""
+
+    name = None
+
+    def __init__(self, version=None):
+        self.version = version
+
+    def __repr__(self):
+        return f'<{type(self).__name__} version={self.version}>'
+
+    def predict_proba(self, features):
+        """Return class probabilities for an (N, n_features) matrix"""
+        raise NotImplementedError
+
+    def describe(self):
+        """Return a JSON-friendly summary of the backend"""
+        return {'backend': self.name, 'version': self.version}
+
+
+class PickleBackend(InferenceBackend):
+    """sklearn scaler + sklearn/XGBoost classifier loaded from pickles"""
+
+    name = 'pickle'
+
+    def __init__(self, model, scaler, version=None):
+        super().__init__(version)
+        self.model = model
+        self.scaler = scaler
+
+    @classmethod
+    def load(cls, model_dir):
+        model_path = Path(model_dir) / 'model.pkl'
+        scaler_path = Path(model_dir) / 'scaler.pkl'
+
+        for path in (model_path, scaler_path):
+            if not path.exists():
+                raise FileNotFoundError(f"Artifact not found at {path}")
+
+        # Unpickling imports sklearn/xgboost on first use; both are timed
+        model = load_pickle(model_path)
+        scaler = load_pickle(scaler_path)
+
+        return cls(model, scaler, version=artifact_version(model_path, scaler_path))
+
+    def predict_proba(self, features):
+        return self.model.predict_proba(apply_scaler(self.scaler, features))
+
+
+class OnnxBackend(InferenceBackend):
+    """Fused scaler + model graph executed by ONNX Runtime"""
+
+    name = 'onnx'
+
+    def __init__(self, session, version=None):
+        super().__init__(version)
+        self.session = session
+        self.input_name = session.get_inputs()[0].name
+        # Outputs are [label, probabilities]; only the probabilities are needed
+        self.output_names = [session.get_outputs()[-1].name]
+
+    @classmethod
+    def load(cls, model_dir, intra_op_threads=1):
+        ort = startup_report.import_module('onnxruntime')
+
+        onnx_path = Path(model_dir) / 'model.onnx'
+        if not onnx_path.exists():
+            raise FileNotFoundError(
+                f"Artifact not found at {onnx_path} (create it with: python -m ml_model.onnx_export)"
+            )
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = int(intra_op_threads)
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        with startup_report.artifact(onnx_path):
+            session = ort.InferenceSession(
+                str(onnx_path), sess_options=options, providers=['CPUExecutionProvider']
+            )
+        return cls(session, version=artifact_version(onnx_path))
+
+    def predict_proba(self, features):
+        # The graph standardizes in float64 (see onnx_export.build_scaler_graph)
+        inputs = np.asarray(features, dtype=np.float64)
+        return self.session.run(self.output_names, {self.input_name: inputs})[0]
+
+
+class NumpyTreeBackend(InferenceBackend):
+    """Flattened XGBoost trees + scaler parameters evaluated with NumPy"""
+
+    name = 'numpy'
+    filename = TREES_FILENAME
+    export_command = 'python -m ml_model.tree_engine'
+
+    def __init__(self, ensemble, version=None):
+        super().__init__(version)
+        self.ensemble = ensemble
+
+    @classmethod
+    def load(cls, model_dir, mmap=False):
+        trees_path = Path(model_dir) / cls.filename
+        if not trees_path.exists():
+            raise FileNotFoundError(
+                f"Artifact not found at {trees_path} (create it with: {cls.export_command})"
+            )
+        with startup_report.artifact(trees_path):
+            ensemble = TreeEnsemble.load(trees_path, mmap=mmap)
+        return cls(ensemble, version=artifact_version(trees_path))
+
+    def predict_proba(self, features):
+        return self.ensemble.predict_proba(features)
+
+    def describe(self):
+        info = super().describe()
+        info['memory_mapped'] = isinstance(self.ensemble.feature.base, np.memmap)
+        return info
+
+
+class FusedTreeBackend(NumpyTreeBackend):
+    """Flattened XGBoost trees with the scaler folded into the thresholds"""
+
+    name = 'fused'
+    filename = FUSED_FILENAME
+    export_command = 'python -m ml_model.tree_engine --fuse'
+
+
+BACKENDS = {
+    PickleBackend.name: PickleBackend,
+    OnnxBackend.name: OnnxBackend,
+    NumpyTreeBackend.name: NumpyTreeBackend,
+    FusedTreeBackend.name: FusedTreeBackend,
+}
+
+
+def load_backend(name, model_dir, **options):
+    """Load the named backend's artifacts from model_dir"""
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown ML backend '{name}' (choose from: {', '.join(BACKENDS)})")
+    return backend_class.load(model_dir, **options)
@@ -0,0 +1,203 @@
+"""
+Micro-batching scheduler for concurrent predictions.
+
+Request threads submit single feature rows; one worker thread collects them
+until either max_batch_size rows are waiting or the oldest row has waited
+max_wait_ms, then scores the whole batch with a single model call and hands
+each caller its row of the result through a Future. close() stops the
+worker once the rows already queued have been scored.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+# Upper bounds of the batch-size histogram buckets ("+Inf" catches the rest)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+# Queued by close() behind the last row; the worker exits when it reaches it
+_STOP = object()
+
+
+class BatcherClosed(RuntimeError):
+    """Raised by submit() after close()"""
+
+
+class _Pending:
+    """A submitted row waiting to be scored"""
+
+    __slots__ = ('row', 'future', 'enqueued_at')
+
+    def __init__(self, row):
+        self.row = row
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-row predictions into batched calls.
+
+    predict_fn receives an (N, n_features) array and must return an array
+    with one row per input row (e.g. predict_proba output).
+    """
+
+    def __init__(self, predict_fn, max_batch_size=32, max_wait_ms=2.0):
+        if max_batch_size < 1:
+            raise ValueError('max_batch_size must be at least 1')
+        self.predict_fn = predict_fn
+        self.max_batch_size = int(max_batch_size)
+        self.max_wait = float(max_wait_ms) / 1000.0
+
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._closed = False
+        self._reset_counters()
+
+    def __repr__(self):
+        return (f'<MicroBatcher max_batch_size={self.max_batch_size} '
+                f'max_wait_ms={self.max_wait * 1000:g}>')
+
+    def _reset_counters(self):
+        self._batches = 0
+        self._rows = 0
+        self._errors = 0
+        self._size_histogram = {str(bound): 0 for bound in BATCH_SIZE_BUCKETS}
+        self._size_histogram['+Inf'] = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _ensure_worker(self):
+        """Start the worker thread (again after a fork, where threads are lost)"""
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._closed:
+                return
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            if self._pid != os.getpid():
+                # Queue contents belong to the parent process
+                self._queue = queue.SimpleQueue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name='ml-micro-batcher', daemon=True
+            )
+            self._thread.start()
+
+    def submit(self, row):
+        """Queue one 1-D feature row; returns a Future for its prediction row"""
+        self._ensure_worker()
+        pending = _Pending(np.array(row, copy=True))
+        # Checked under the lock so no row can land behind close()'s stop marker
+        with self._lock:
+            if self._closed:
+                raise BatcherClosed('micro-batcher is closed')
+            self._queue.put(pending)
+        return pending.future
+
+    def predict(self, row, timeout=None):
+        """Submit a row and block until its prediction is ready"""
+        return self.submit(row).result(timeout=timeout)
+
+    def close(self, timeout=5.0):
+        """
+        Stop accepting rows and stop the worker thread. Rows already queued
+        are scored first; any the worker cannot reach get BatcherClosed.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+            thread = self._thread if self._pid == os.getpid() else None
+
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+            if thread.is_alive():
+                print(f"⚠️ Micro-batcher did not stop within {timeout}s")
+                return
+
+        # No worker in this process: fail whatever is still waiting
+        while True:
+            try:
+                pending = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if pending is not _STOP:
+                pending.future.set_exception(BatcherClosed('micro-batcher is closed'))
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = [first]
+            deadline = first.enqueued_at + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    if remaining > 0:
+                        pending = self._queue.get(timeout=remaining)
+                    else:
+                        pending = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if pending is _STOP:
+                    stopping = True
+                    break
+                batch.append(pending)
+
+            self._flush(batch)
+
+    def _flush(self, batch):
+        started = time.perf_counter()
+        try:
+            matrix = np.stack([pending.row for pending in batch])
+            results = self.predict_fn(matrix)
+        except Exception as e:
+            for pending in batch:
+                pending.future.set_exception(e)
+            failed = True
+        else:
+            for pending, result in zip(batch, results):
+                pending.future.set_result(result)
+            failed = False
+
+        waits = [started - pending.enqueued_at for pending in batch]
+        with self._lock:
+            self._batches += 1
+            self._rows += len(batch)
+            self._errors += failed
+            bucket = next((str(b) for b in BATCH_SIZE_BUCKETS if len(batch) <= b), '+Inf')
+            self._size_histogram[bucket] += 1
+            self._wait_total += sum(waits)
+            self._wait_max = max(self._wait_max, max(waits))
+
+    def stats(self):
+        """Return counters for batch sizes and queue wait time"""
+        with self._lock:
+            return {
+                'batches': self._batches,
+                'rows': self._rows,
+                'errors': self._errors,
+                'mean_batch_size': self._rows / self._batches if self._batches else 0.0,
+                'batch_size_histogram': dict(self._size_histogram),
+                'queue_wait_ms_mean': 1000.0 * self._wait_total / self._rows if self._rows else 0.0,
+                'queue_wait_ms_max': 1000.0 * self._wait_max,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+            }
+
+    def reset_stats(self):
+        """Zero all counters"""
+        with self._lock:
+            self._reset_counters()
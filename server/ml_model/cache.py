@@ -0,0 +1,233 @@
+"""
+Content-addressed cache for prediction results.
+
+Keys are a SHA-256 digest of the model/scaler version plus the normalized
+float64 feature vector, so resubmitting the same 21 values (in any key order
+or JSON type) hits the cache, and a new model never sees stale results.
+
+The first tier is an in-process LRU with a TTL. An optional second tier is
+a local SQLite file shared by every gunicorn worker on the host.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def copy_result(result):
+    """Copy a prediction result so callers cannot mutate the cached entry"""
+    return {key: list(value) if isinstance(value, list) else value
+            for key, value in result.items()}
+
+
+class SharedPredictionStore:
+    """
+    SQLite-backed second tier shared across processes on one host.
+
+    Each thread (and each process after fork) opens its own connection.
+    """
+
+    def __init__(self, path, max_entries=100000):
+        self.path = str(path)
+        self.max_entries = int(max_entries)
+        self._local = threading.local()
+        self._writes = 0
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS prediction_cache ('
+                ' key TEXT PRIMARY KEY,'
+                ' model_version TEXT NOT NULL,'
+                ' result TEXT NOT NULL,'
+                ' expires_at REAL NOT NULL)'
+            )
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_prediction_cache_expires'
+                ' ON prediction_cache(expires_at)'
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key, now):
+        """(result, expires_at) for a live entry, else None"""
+        row = self._connect().execute(
+            'SELECT result, expires_at FROM prediction_cache WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None or row[1] <= now:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key, model_version, result, expires_at):
+        conn = self._connect()
+        conn.execute(
+            'INSERT OR REPLACE INTO prediction_cache (key, model_version, result, expires_at)'
+            ' VALUES (?, ?, ?, ?)',
+            (key, model_version, json.dumps(result), expires_at)
+        )
+        self._writes += 1
+        if self._writes % 1000 == 0:
+            self.prune(time.time())
+
+    def prune(self, now):
+        """Drop expired rows and trim the table back to max_entries"""
+        conn = self._connect()
+        conn.execute('DELETE FROM prediction_cache WHERE expires_at <= ?', (now,))
+        conn.execute(
+            'DELETE FROM prediction_cache WHERE key IN ('
+            ' SELECT key FROM prediction_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
+
+    def retain_version(self, model_version):
+        """Delete every entry produced by a different model version"""
+        self._connect().execute(
+            'DELETE FROM prediction_cache WHERE model_version != ?', (model_version,)
+        )
+
+    def clear(self):
+        self._connect().execute('DELETE FROM prediction_cache')
+
+
+class PredictionCache:
+    """Bounded LRU + TTL cache of prediction results keyed by feature content"""
+
+    def __init__(self, max_entries=4096, ttl_seconds=3600.0, shared_path=None,
+                 shared_max_entries=100000):
+        self.max_entries = int(max_entries)
+        self.ttl = float(ttl_seconds)
+        self.model_version = None
+        self.shared = (SharedPredictionStore(shared_path, shared_max_entries)
+                       if shared_path else None)
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._reset_counters()
+
+    def __repr__(self):
+        return (f'<PredictionCache {len(self._entries)}/{self.max_entries} entries, '
+                f'ttl={self.ttl:g}s, version={self.model_version}>')
+
+    def _reset_counters(self):
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def set_model_version(self, model_version):
+        """Invalidate everything cached for other model/scaler versions"""
+        with self._lock:
+            if model_version == self.model_version:
+                return
+            self.model_version = model_version
+            self._entries.clear()
+            self.invalidations += 1
+        if self.shared is not None:
+            try:
+                self.shared.retain_version(model_version)
+            except sqlite3.Error as e:
+                print(f"⚠️ Shared prediction cache unavailable: {e}")
+
+    def key_for(self, features, model_version=None):
+        """Hash one feature row together with a model version (default: current)"""
+        if model_version is None:
+            model_version = self.model_version
+        row = np.ascontiguousarray(features, dtype=np.float64) + 0.0  # folds -0.0 into 0.0
+        digest = hashlib.sha256(str(model_version).encode('utf-8'))
+        digest.update(row.tobytes())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Return a copy of the cached result for key, or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, result = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return copy_result(result)
+                del self._entries[key]
+                self.expirations += 1
+
+        if self.shared is not None:
+            try:
+                entry = self.shared.get(key, now)
+            except sqlite3.Error:
+                entry = None
+            if entry is not None:
+                # Keep the shared expiry; reading an entry must not extend its life
+                result, expires_at = entry
+                self._store_local(key, result, expires_at)
+                with self._lock:
+                    self.shared_hits += 1
+                return copy_result(result)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, result, model_version=None):
+        """
+        Cache a successful prediction result. model_version must be the one
+        the key was built with (default: current); during a hot swap it can
+        differ from self.model_version.
+        """
+        if model_version is None:
+            model_version = self.model_version
+        expires_at = time.time() + self.ttl
+        self._store_local(key, copy_result(result), expires_at)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, model_version, result, expires_at)
+            except sqlite3.Error as e:
+                print(f"⚠️ Shared prediction cache write failed: {e}")
+
+    def _store_local(self, key, result, expires_at):
+        with self._lock:
+            self._entries[key] = (expires_at, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all entries from both tiers"""
+        with self._lock:
+            self._entries.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def stats(self):
+        """Return hit/miss/eviction counters"""
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'model_version': self.model_version,
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'shared_tier': self.shared.path if self.shared is not None else None,
+            }
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Columnar cache of the training dataset.
+
+Parsing heart_attack_prediction_india_cleaned.xlsx with openpyxl takes
+seconds, so the first load converts it into a cache directory keyed by the
+SHA-256 of the source file:
+
+    dataset_cache/heart_attack_prediction_india_cleaned-<hash>/
+        data.parquet    every column, for pandas users
+        features.npy    float64 (N, 21) matrix in FEATURE_COLUMNS order
+        labels.npy      int64 heart_attack_risk vector
+        meta.json       source path, hash, row count, columns
+
+Later loads memory-map the .npy files (no parsing, no copy). Editing the
+XLSX changes its hash, so the cache is rebuilt on the next load and the
+stale directory is removed.
+
+Usage:
+    python -m ml_model.dataset [--source PATH] [--rebuild]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from ml_model.features import FEATURE_COLUMNS
+from ml_model.registry import file_sha256
+
+MODEL_DIR = Path(__file__).parent
+DATASET_PATH = MODEL_DIR / 'heart_attack_prediction_india_cleaned.xlsx'
+CACHE_DIR = Path(os.getenv('ML_DATASET_CACHE') or MODEL_DIR / 'dataset_cache')
+LABEL_COLUMN = 'heart_attack_risk'
+
+
+def cache_dir_for(source, cache_root=CACHE_DIR):
+    """Cache directory for the current contents of source"""
+    source = Path(source)
+    return Path(cache_root) / f'{source.stem}-{file_sha256(source)[:16]}'
+
+
+def build_cache(source=DATASET_PATH, cache_root=CACHE_DIR):
+    """Parse source once and write the columnar cache; returns its directory"""
+    import pandas as pd
+
+    source = Path(source)
+    target = cache_dir_for(source, cache_root)
+
+    df = pd.read_excel(source) if source.suffix.lower() in ('.xlsx', '.xlsm') else pd.read_csv(source)
+    if 'gender_Male' in df.columns:
+        df['gender_Male'] = df['gender_Male'].astype(int)
+    features = np.ascontiguousarray(df[list(FEATURE_COLUMNS)].to_numpy(dtype=np.float64))
+    labels = df[LABEL_COLUMN].to_numpy(dtype=np.int64)
+
+    # Write into a scratch directory and rename it into place, so a reader
+    # never sees a half-written cache
+    Path(cache_root).mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(dir=cache_root, prefix='.staging-'))
+    try:
+        df.to_parquet(staging / 'data.parquet', index=False)
+        np.save(staging / 'features.npy', features)
+        np.save(staging / 'labels.npy', labels)
+        with open(staging / 'meta.json', 'w') as f:
+            json.dump({
+                'source': str(source.resolve()),
+                'sha256': file_sha256(source),
+                'rows': len(df),
+                'columns': list(df.columns),
+                'feature_columns': list(FEATURE_COLUMNS),
+                'label_column': LABEL_COLUMN,
+                'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            }, f, indent=2)
+        try:
+            os.rename(staging, target)
+        except OSError:
+            # Another process built the same cache first
+            if not (target / 'meta.json').is_file():
+                raise
+            shutil.rmtree(staging, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    # Drop caches of older versions of this file
+    for stale in Path(cache_root).glob(f'{source.stem}-*'):
+        if stale != target and stale.is_dir():
+            shutil.rmtree(stale, ignore_errors=True)
+    return target
+
+
+def ensure_cache(source=DATASET_PATH, cache_root=CACHE_DIR, rebuild=False):
+    """Return the cache directory for source, building it if it is missing or stale"""
+    target = cache_dir_for(source, cache_root)
+    if rebuild or not (target / 'meta.json').is_file():
+        print(f"⏱️ Building dataset cache for {Path(source).name}")
+        target = build_cache(source, cache_root)
+    return target
+
+
+def load_arrays(source=DATASET_PATH, cache_root=CACHE_DIR, mmap=True):
+    """
+    Return (features, labels) for source.
+
+    With mmap (the default) both arrays are read-only views of the cached
+    .npy files; copy them before modifying.
+    """
+    target = ensure_cache(source, cache_root)
+    mmap_mode = 'r' if mmap else None
+    return (np.load(target / 'features.npy', mmap_mode=mmap_mode),
+            np.load(target / 'labels.npy', mmap_mode=mmap_mode))
+
+
+def load_frame(source=DATASET_PATH, cache_root=CACHE_DIR, columns=None):
+    """Return the dataset as a DataFrame read from the cached Parquet file"""
+    import pandas as pd
+
+    target = ensure_cache(source, cache_root)
+    return pd.read_parquet(target / 'data.parquet', columns=columns)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the columnar dataset cache')
+    parser.add_argument('--source', default=str(DATASET_PATH), help='XLSX or CSV dataset')
+    parser.add_argument('--cache-dir', default=str(CACHE_DIR), help='cache root directory')
+    parser.add_argument('--rebuild', action='store_true', help='rebuild even if the cache is current')
+    args = parser.parse_args(argv)
+
+    try:
+        started = time.perf_counter()
+        target = ensure_cache(args.source, args.cache_dir, rebuild=args.rebuild)
+        features, labels = load_arrays(args.source, args.cache_dir)
+    except Exception as e:
+        print(f"❌ Dataset cache failed: {e}")
+        return 1
+
+    elapsed_ms = (time.perf_counter() - started) * 1000.0
+    print(f"✅ {features.shape[0]} rows x {features.shape[1]} features ready in "
+          f"{elapsed_ms:.0f}ms ({target})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
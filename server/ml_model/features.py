@@ -0,0 +1,123 @@
+"""
+Feature vectorization for the Cardio Care risk model.
+
+Turns assessment_data dictionaries into NumPy rows in the exact column order
+the scaler and model were trained on, without building a pandas DataFrame
+per request.
+"""
+
+import math
+import threading
+
+import numpy as np
+
+# Canonical training column order for the 21 assessment parameters.
+# This is the single source of truth for the required assessment fields.
+FEATURE_COLUMNS = (
+    'age', 'obesity', 'smoking', 'alcohol_consumption', 'physical_activity',
+    'diet_score', 'cholesterol_level', 'triglyceride_level', 'ldl_level',
+    'hdl_level', 'systolic_bp', 'diastolic_bp', 'air_pollution_exposure',
+    'family_history', 'stress_level', 'healthcare_access',
+    'emergency_response_time', 'annual_income', 'health_insurance',
+    'state_name_encoded', 'gender_Male'
+)
+
+
+class FeatureError(ValueError):
+    """Raised when assessment data cannot be converted to a feature row"""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        super().__init__('; '.join(self.errors))
+
+
+class FeatureVectorizer:
+    """
+    Fills preallocated NumPy buffers with assessment features.
+
+    Buffers are kept per thread, so a vectorizer can be shared by all
+    request threads. Arrays returned by transform_one / transform_many are
+    reused by the next call on the same thread; copy them if they must
+    outlive that.
+    """
+
+    def __init__(self, feature_names=FEATURE_COLUMNS, dtype=np.float64):
+        self.feature_names = tuple(feature_names)
+        self.n_features = len(self.feature_names)
+        self.dtype = np.dtype(dtype)
+        self._local = threading.local()
+
+    def __repr__(self):
+        return f'<FeatureVectorizer {self.n_features} features, {self.dtype}>'
+
+    @staticmethod
+    def coerce(name, value):
+        """Convert a single JSON value to float, raising FeatureError if impossible"""
+        if isinstance(value, bool):
+            return 1.0 if value else 0.0
+        if isinstance(value, str):
+            text = value.strip().lower()
+            if text in ('true', 'yes'):
+                return 1.0
+            if text in ('false', 'no'):
+                return 0.0
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            raise FeatureError([f'{name}: expected a number, got {value!r}'])
+        if not math.isfinite(number):
+            raise FeatureError([f'{name}: expected a finite number, got {value!r}'])
+        return number
+
+    def find_errors(self, data):
+        """Return a list of problems with data (empty if it can be vectorized)"""
+        if not isinstance(data, dict):
+            return ['assessment data must be an object']
+
+        errors = []
+        missing = [name for name in self.feature_names if name not in data]
+        if missing:
+            errors.append(f'missing required fields: {", ".join(missing)}')
+
+        for name in self.feature_names:
+            if name in data:
+                try:
+                    self.coerce(name, data[name])
+                except FeatureError as e:
+                    errors.extend(e.errors)
+        return errors
+
+    def fill(self, data, out):
+        """Write the features of one assessment into the 1-D array out"""
+        try:
+            for i, name in enumerate(self.feature_names):
+                out[i] = self.coerce(name, data[name])
+        except (KeyError, TypeError, FeatureError):
+            raise FeatureError(self.find_errors(data))
+        return out
+
+    def _buffer(self, rows):
+        """Return this thread's buffer with room for at least rows rows"""
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None or buffer.shape[0] < rows:
+            capacity = max(rows, 2 * buffer.shape[0] if buffer is not None else 1)
+            buffer = np.empty((capacity, self.n_features), dtype=self.dtype)
+            self._local.buffer = buffer
+        return buffer
+
+    def transform_one(self, data):
+        """Vectorize one assessment into a (1, n_features) array"""
+        row = self._buffer(1)[:1]
+        self.fill(data, row[0])
+        return row
+
+    def transform_many(self, rows):
+        """Vectorize a sequence of assessments into an (N, n_features) array"""
+        rows = list(rows)
+        matrix = self._buffer(len(rows))[:len(rows)]
+        for i, data in enumerate(rows):
+            try:
+                self.fill(data, matrix[i])
+            except FeatureError as e:
+                raise FeatureError([f'row {i}: {error}' for error in e.errors])
+        return matrix
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Per-process memory accounting: unique vs shared.
+
+RSS counts every resident page, including pages shared with the gunicorn
+master and the other workers (copy-on-write model weights after a preload,
+memory-mapped artifacts, shared libraries), so it overstates what each
+extra worker costs. The kernel's smaps counters split it up:
+
+- unique (USS): private pages, freed if this process exits; the cost of
+  one more worker
+- shared: pages also mapped by other processes
+- pss: unique + this process's fair share of the shared pages; summing PSS
+  over all workers gives the real total
+
+Usage:
+    python -m ml_model.memory [PID ...]       # default: this process
+    python -m ml_model.memory --parent PID    # a gunicorn master and its workers
+"""
+
+import argparse
+import os
+import sys
+
+# smaps fields (in kB) that make up each reported figure
+SMAPS_FIELDS = {
+    'rss': ('Rss',),
+    'pss': ('Pss',),
+    'unique': ('Private_Clean', 'Private_Dirty'),
+    'shared': ('Shared_Clean', 'Shared_Dirty'),
+    'swap': ('Swap',),
+}
+
+
+def _parse_smaps(lines):
+    totals = {}
+    for line in lines:
+        parts = line.split()
+        if len(parts) == 3 and parts[2] == 'kB':
+            key = parts[0].rstrip(':')
+            totals[key] = totals.get(key, 0) + int(parts[1]) * 1024
+    return {name: sum(totals.get(field, 0) for field in fields)
+            for name, fields in SMAPS_FIELDS.items()}
+
+
+def memory_usage(pid=None):
+    """
+    Return {'pid', 'rss', 'pss', 'unique', 'shared', 'swap'} in bytes.
+
+    Reads /proc/<pid>/smaps_rollup (Linux); falls back to psutil elsewhere.
+    Values are None where the platform cannot tell them apart.
+    """
+    pid = os.getpid() if pid is None else int(pid)
+    for filename in ('smaps_rollup', 'smaps'):
+        try:
+            with open(f'/proc/{pid}/{filename}') as f:
+                return {'pid': pid, **_parse_smaps(f)}
+        except FileNotFoundError:
+            continue
+
+    try:
+        import psutil
+    except ImportError:
+        return {'pid': pid, **{name: None for name in SMAPS_FIELDS}}
+    info = psutil.Process(pid).memory_full_info()
+    return {
+        'pid': pid,
+        'rss': info.rss,
+        'pss': getattr(info, 'pss', None),
+        'unique': getattr(info, 'uss', None),
+        'shared': getattr(info, 'shared', None),
+        'swap': getattr(info, 'swap', None),
+    }
+
+
+def child_pids(parent_pid):
+    """PIDs of the direct children of parent_pid (e.g. gunicorn workers)"""
+    try:
+        import psutil
+        return [child.pid for child in psutil.Process(parent_pid).children()]
+    except ImportError:
+        pass
+    pids = []
+    task_dir = f'/proc/{parent_pid}/task'
+    for task in os.listdir(task_dir):
+        with open(f'{task_dir}/{task}/children') as f:
+            pids.extend(int(pid) for pid in f.read().split())
+    return pids
+
+
+def _format_mb(value):
+    return '-' if value is None else f'{value / (1024 * 1024):.1f}'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Report unique vs shared memory per process')
+    parser.add_argument('pids', nargs='*', type=int, help='process ids (default: this process)')
+    parser.add_argument('--parent', type=int, default=None,
+                        help='report this process and all of its children (gunicorn master)')
+    args = parser.parse_args(argv)
+
+    pids = list(args.pids)
+    if args.parent is not None:
+        pids += [args.parent] + child_pids(args.parent)
+    if not pids:
+        pids = [os.getpid()]
+
+    rows = []
+    for pid in pids:
+        try:
+            rows.append(memory_usage(pid))
+        except OSError as e:
+            print(f"❌ Cannot read memory of process {pid}: {e}")
+    print(f"{'PID':>8} {'RSS MB':>9} {'PSS MB':>9} {'UNIQUE MB':>10} {'SHARED MB':>10}")
+    for row in rows:
+        print(f"{row['pid']:>8} {_format_mb(row['rss']):>9} {_format_mb(row['pss']):>9} "
+              f"{_format_mb(row['unique']):>10} {_format_mb(row['shared']):>10}")
+    if len(rows) > 1 and all(row['pss'] is not None for row in rows):
+        print(f"{'total':>8} {'':>9} {_format_mb(sum(row['pss'] for row in rows)):>9}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Export scaler.pkl + model.pkl as a single ONNX graph for the onnx backend.
+
+Usage:
+    python -m ml_model.onnx_export [--model-dir DIR] [--output PATH]
+
+Requires skl2onnx (and onnxmltools for XGBoost models), which are only
+needed for this offline step, not by the server.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from ml_model.backends import PickleBackend
+from ml_model.features import FEATURE_COLUMNS
+
+MODEL_DIR = Path(__file__).parent
+
+# Opsets supported by the onnxruntime version pinned in requirements.txt
+TARGET_OPSET = {'': 15, 'ai.onnx.ml': 3}
+
+
+def _register_xgboost_converter():
+    """Teach skl2onnx how to convert XGBClassifier (no-op without xgboost)"""
+    try:
+        from xgboost import XGBClassifier
+    except ImportError:
+        return
+
+    from onnxmltools.convert.xgboost.operator_converters.XGBoost import convert_xgboost
+    from skl2onnx import update_registered_converter
+    from skl2onnx.common.shape_calculator import calculate_linear_classifier_output_shapes
+
+    update_registered_converter(
+        XGBClassifier, 'XGBoostXGBClassifier',
+        calculate_linear_classifier_output_shapes, convert_xgboost,
+        options={'nocl': [True, False], 'zipmap': [True, False, 'columns']}
+    )
+
+
+def build_scaler_graph(scaler, n_features, reference):
+    """
+    Standardize features in float64, then cast to float32 for the trees.
+
+    skl2onnx's Scaler operator works in float32, which moves values that sit
+    exactly on an XGBoost split (split points are training values) to the
+    other side of it. Subtracting and dividing in float64 matches NumPy.
+    """
+    import numpy as np
+    from onnx import TensorProto, helper, numpy_helper
+
+    if type(scaler).__name__ != 'StandardScaler':
+        raise ValueError(f"Only StandardScaler can be exported, got {type(scaler).__name__}")
+
+    mean = scaler.mean_ if scaler.with_mean else np.zeros(n_features)
+    scale = scaler.scale_ if scaler.with_std else np.ones(n_features)
+
+    graph = helper.make_graph(
+        [
+            helper.make_node('Sub', ['features', 'scaler_mean'], ['centered']),
+            helper.make_node('Div', ['centered', 'scaler_scale'], ['scaled64']),
+            helper.make_node('Cast', ['scaled64'], ['scaled'], to=TensorProto.FLOAT),
+        ],
+        'standard_scaler',
+        [helper.make_tensor_value_info('features', TensorProto.DOUBLE, [None, n_features])],
+        [helper.make_tensor_value_info('scaled', TensorProto.FLOAT, [None, n_features])],
+        initializer=[
+            numpy_helper.from_array(np.asarray(mean, dtype=np.float64), 'scaler_mean'),
+            numpy_helper.from_array(np.asarray(scale, dtype=np.float64), 'scaler_scale'),
+        ],
+    )
+    scaler_model = helper.make_model(graph, opset_imports=reference.opset_import)
+    scaler_model.ir_version = reference.ir_version
+    return scaler_model
+
+
+def build_onnx(model, scaler, n_features=len(FEATURE_COLUMNS)):
+    """Convert a fitted scaler + classifier into one ONNX model proto"""
+    from onnx import compose
+    from skl2onnx import convert_sklearn
+    from skl2onnx.common.data_types import FloatTensorType
+
+    _register_xgboost_converter()
+
+    model_proto = convert_sklearn(
+        model,
+        name='cardio_care_risk',
+        initial_types=[('scaled_features', FloatTensorType([None, n_features]))],
+        # Plain (N, 2) probability tensor instead of a list of dicts
+        options={id(model): {'zipmap': False}},
+        target_opset=TARGET_OPSET,
+    )
+    scaler_proto = build_scaler_graph(scaler, n_features, model_proto)
+
+    # features (float64) -> scaler -> model -> label, probabilities
+    return compose.merge_models(scaler_proto, model_proto,
+                                io_map=[('scaled', 'scaled_features')])
+
+
+def export_onnx(model_dir=MODEL_DIR, output_path=None):
+    """Read the pickled artifacts from model_dir and write model.onnx"""
+    source = PickleBackend.load(model_dir)
+    output_path = Path(output_path) if output_path else Path(model_dir) / 'model.onnx'
+
+    onnx_model = build_onnx(source.model, source.scaler)
+    output_path.write_bytes(onnx_model.SerializeToString())
+    return output_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export the risk model to ONNX')
+    parser.add_argument('--model-dir', default=str(MODEL_DIR),
+                        help='directory containing model.pkl and scaler.pkl')
+    parser.add_argument('--output', default=None,
+                        help='output path (default: <model-dir>/model.onnx)')
+    args = parser.parse_args(argv)
+
+    try:
+        path = export_onnx(args.model_dir, args.output)
+    except ImportError as e:
+        print(f"❌ ONNX export needs skl2onnx/onnxmltools: {e}")
+        return 1
+    except Exception as e:
+        print(f"❌ ONNX export failed: {e}")
+        return 1
+
+    print(f"✅ ONNX model written to {path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
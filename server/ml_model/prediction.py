@@ -1,111 +1,450 @@
-import pickle
-import pandas as pd
+import gc
+import itertools
 import os
+import threading
+import time
+from collections import Counter
 from pathlib import Path
 
+import numpy as np
+
+from ml_model.backends import BACKENDS, PickleBackend, load_backend
+from ml_model.batching import BatcherClosed, MicroBatcher
+from ml_model.cache import PredictionCache
+from ml_model.features import FEATURE_COLUMNS, FeatureError, FeatureVectorizer
+from ml_model.registry import ModelRegistry, RegistryWatcher
+from ml_model.startup import startup_report
+
 # Get the directory where this file is located
 current_dir = Path(__file__).parent
 
-# Initialize model and scaler variables
-model = None
-scaler = None
+# Active inference backend (see ml_model/backends.py) and its artifact version
+backend = None
+model_version = None
+
+# Which backend to load (see BACKENDS). A known backend whose artifacts fail
+# to load falls back to pickle; an unknown name is a configuration error.
+ML_BACKEND = os.getenv('ML_BACKEND', 'pickle').lower()
+if ML_BACKEND not in BACKENDS:
+    raise ValueError(f"Unknown ML_BACKEND '{ML_BACKEND}' (choose from: {', '.join(BACKENDS)})")
+ML_ONNX_THREADS = int(os.getenv('ML_ONNX_THREADS', '1'))
+# Map numpy/fused tree arrays read-only from disk so all workers share them
+ML_MMAP_ARTIFACTS = os.getenv('ML_MMAP_ARTIFACTS', 'true').lower() == 'true'
+
+# Versioned artifacts (see ml_model/registry.py). When the registry has no
+# CURRENT version, artifacts are read from this directory instead.
+registry = ModelRegistry(os.getenv('ML_MODEL_REGISTRY') or current_dir / 'registry')
+registry_watcher = None
+
+# Loading state: 'not_loaded' -> 'loading' -> 'ready' or 'failed'.
+# Artifacts are loaded by a background thread, never inside a request.
+model_state = 'not_loaded'
+model_error = None
+LOAD_RETRY_SECONDS = float(os.getenv('ML_LOAD_RETRY_SECONDS', '30'))
+WARMUP_BATCH_SIZES = (1, 32)
+_load_lock = threading.Lock()
+_loader_thread = None
+_loader_pid = None
+_last_load_started = 0.0
+
+# Built once; converts assessment dictionaries to rows in training column order
+vectorizer = FeatureVectorizer(FEATURE_COLUMNS)
+
+# Optional micro-batcher for concurrent single predictions (see enable_micro_batching)
+batcher = None
+MICRO_BATCH_TIMEOUT_SECONDS = 5.0
+
+# Optional cache of prediction results (see enable_prediction_cache)
+prediction_cache = None
+_in_memory_versions = itertools.count(1)
+
+# Fallback results handed out, by reason ('model_unavailable', 'invalid_input', 'error')
+fallback_counts = Counter()
+
+def install_backend(new_backend):
+    """Make a loaded backend the active one and invalidate cached results"""
+    global backend, model_version, model_state, model_error
+    if new_backend.version is None:
+        new_backend.version = f'in-memory-{next(_in_memory_versions)}'
+    backend = new_backend
+    model_version = new_backend.version
+    model_state = 'ready'
+    model_error = None
+    if prediction_cache is not None:
+        prediction_cache.set_model_version(model_version)
 
-def load_models():
-    """Load the pre-trained model and scaler with error handling"""
-    global model, scaler
+def install_models(new_model, new_scaler, version=None):
+    """Make an in-memory model/scaler pair the active pickle backend"""
+    install_backend(PickleBackend(new_model, new_scaler, version=version))
+
+def enable_prediction_cache(max_entries=4096, ttl_seconds=3600.0, shared_path=None):
+    """
+    Cache prediction results keyed by feature content and model version.
+
+    shared_path points to a SQLite file used as a second tier shared by all
+    worker processes on the host.
+    """
+    global prediction_cache
+    prediction_cache = PredictionCache(max_entries=max_entries, ttl_seconds=ttl_seconds,
+                                       shared_path=shared_path)
+    prediction_cache.set_model_version(model_version)
+    return prediction_cache
+
+def disable_prediction_cache():
+    """Stop caching prediction results"""
+    global prediction_cache
+    prediction_cache = None
+
+def _load_backend(name, model_dir):
+    if name == 'onnx':
+        options = {'intra_op_threads': ML_ONNX_THREADS}
+    elif name in ('numpy', 'fused'):
+        options = {'mmap': ML_MMAP_ARTIFACTS}
+    else:
+        options = {}
+    return load_backend(name, model_dir, **options)
+
+def warm_up(loaded_backend):
+    """Run dummy batches through a backend so first requests do not pay for lazy setup"""
+    with startup_report.phase('warmup'):
+        for batch_size in WARMUP_BATCH_SIZES:
+            loaded_backend.predict_proba(np.zeros((batch_size, vectorizer.n_features)))
+
+def load_models(backend_name=None, version=None):
+    """
+    Load, warm up and install model artifacts with error handling.
+
+    Loads the given registry version, else the registry's CURRENT version,
+    else the unversioned artifacts next to this file. The previous backend
+    keeps serving until the new one is ready, then is swapped out atomically.
+    """
+    global model_state, model_error
+    if backend is None:
+        model_state = 'loading'
     
     try:
-        model_path = current_dir / 'model.pkl'
-        scaler_path = current_dir / 'scaler.pkl'
-        
-        if not model_path.exists():
-            print(f"Warning: Model file not found at {model_path}")
-            return False
+        with startup_report.phase('model_load'):
+            version = version or registry.current_version()
+            if version is not None:
+                manifest = registry.verify(version)
+                model_dir = registry.version_dir(version)
+                name = (backend_name or manifest.get('backend') or ML_BACKEND).lower()
+            else:
+                model_dir = current_dir
+                name = (backend_name or ML_BACKEND).lower()
             
-        if not scaler_path.exists():
-            print(f"Warning: Scaler file not found at {scaler_path}")
-            return False
+            try:
+                loaded = _load_backend(name, model_dir)
+            except Exception as e:
+                if name == PickleBackend.name or name not in BACKENDS:
+                    raise
+                print(f"⚠️ {name} backend unavailable ({e}), falling back to pickle")
+                loaded = _load_backend(PickleBackend.name, model_dir)
+            
+            if version is not None:
+                loaded.version = version
         
-        # Load the pre-trained model
-        with open(model_path, 'rb') as f:
-            model = pickle.load(f)
+        # Warn early if the scaler was fitted on a different column layout
+        fitted_names = getattr(getattr(loaded, 'scaler', None), 'feature_names_in_', None)
+        if fitted_names is not None and tuple(fitted_names) != vectorizer.feature_names:
+            print("⚠️ Scaler feature names do not match the assessment feature order")
         
-        # Load the scaler
-        with open(scaler_path, 'rb') as f:
-            scaler = pickle.load(f)
-            
-        print("✅ ML model and scaler loaded successfully")
+        warm_up(loaded)
+        install_backend(loaded)
+        print(f"✅ ML model {loaded.version} loaded successfully ({loaded.name} backend)")
         return True
         
+    except FileNotFoundError as e:
+        print(f"Warning: {e}")
+        error = e
     except Exception as e:
         print(f"❌ Error loading ML models: {e}")
-        model = None
-        scaler = None
-        return False
+        error = e
+    
+    # Keep serving a previously loaded model if there is one
+    if backend is None:
+        model_state = 'failed'
+        model_error = str(error)
+    return False
+
+def _background_load(backend_name):
+    if load_models(backend_name):
+        print(f"⏱️ ML startup: {startup_report.summary()}")
+
+def _loading_in_this_process():
+    return (_loader_thread is not None and _loader_thread.is_alive()
+            and _loader_pid == os.getpid())
+
+def start_background_load(backend_name=None):
+    """
+    Load the model artifacts on a background thread.
 
-# Try to load models when module is imported
-load_models()
+    Returns immediately; model_status() reports progress. Calling it while a
+    load is already running in this process is a no-op.
+    """
+    global _loader_thread, _loader_pid, _last_load_started, model_state
+    with _load_lock:
+        if _loading_in_this_process():
+            return _loader_thread
+        if backend is None:
+            model_state = 'loading'
+        _last_load_started = time.monotonic()
+        _loader_pid = os.getpid()
+        _loader_thread = threading.Thread(
+            target=_background_load, args=(backend_name,), name='ml-model-loader', daemon=True
+        )
+        _loader_thread.start()
+        return _loader_thread
+
+def preload_models(backend_name=None):
+    """
+    Load the model synchronously in a process that is about to fork.
+
+    Meant for the gunicorn master with preload_app: workers inherit the
+    loaded model, and its pages stay shared copy-on-write as long as nobody
+    writes to them. gc.freeze() moves everything allocated so far out of the
+    collector's reach, so garbage collection in the workers does not touch
+    (and thereby copy) the inherited objects.
+    """
+    loaded = load_models(backend_name)
+    if loaded:
+        print(f"⏱️ ML startup: {startup_report.summary()}")
+    gc.freeze()
+    return loaded
+
+def after_fork(registry_poll_seconds=0):
+    """
+    Start per-process background threads in a freshly forked worker.
+
+    The preloading master starts none (threads do not survive fork()), so
+    each worker starts its own registry watcher here. The version it
+    inherited counts as seen, so one activated since the master loaded is
+    still picked up.
+    """
+    if registry_poll_seconds > 0:
+        inherited = backend.version if backend is not None else None
+        start_registry_watcher(registry_poll_seconds, seen_version=inherited)
+
+def start_registry_watcher(interval_seconds=10.0, seen_version=None):
+    """
+    Poll the registry's CURRENT pointer and hot-swap new versions.
+
+    New versions are loaded and warmed up on the watcher thread; requests
+    keep using the old backend until the swap. seen_version defaults to
+    the registry's current version.
+    """
+    global registry_watcher
+    if registry_watcher is None:
+        registry_watcher = RegistryWatcher(
+            registry, lambda version: load_models(version=version), interval_seconds
+        )
+    if seen_version is None:
+        seen_version = registry.current_version()
+    return registry_watcher.start(seen_version=seen_version)
+
+def model_status():
+    """Report model readiness, the active backend and startup timings"""
+    return {
+        'state': model_state,
+        'model': backend.describe() if backend is not None else None,
+        'error': model_error,
+        'startup': startup_report.as_dict(),
+    }
+
+def fallback_prediction(message, risk_factor, reason='error'):
+    """Build the moderate-risk result returned when the model cannot score"""
+    fallback_counts[reason] += 1
+    return {
+        'risk_score': 0.3,  # Default moderate risk
+        'risk_level': 'Moderate',
+        'confidence_score': 0.6,
+        'recommendations': [
+            message,
+            'Regular health checkups are recommended'
+        ],
+        'risk_factors': [risk_factor],
+        'model_version': None
+    }
+
+def risk_level_for(risk_score):
+    """Map a heart attack probability to the reported risk level"""
+    return 'High' if risk_score > 0.5 else 'Low'  # Example threshold
+
+def format_prediction(proba_row, version=None):
+    """Turn one row of predict_proba output into the API result structure"""
+    risk_score = float(proba_row[1])  # Probability of heart attack
+    risk_level = risk_level_for(risk_score)
+
+    return {
+        'risk_score': risk_score,
+        'risk_level': risk_level,
+        'confidence_score': float(max(proba_row)),
+        'recommendations': ['Consult a doctor for a full evaluation.'],
+        'risk_factors': ['Based on model analysis.'],
+        'model_version': version
+    }
+
+def predict_proba_batch(features):
+    """Return (probabilities, model_version) for every row using the active backend"""
+    active = backend
+    return [(row, active.version) for row in active.predict_proba(features)]
+
+def enable_micro_batching(max_batch_size=32, max_wait_ms=2.0):
+    """
+    Route make_prediction through a MicroBatcher.
+
+    Concurrent callers are coalesced into one predict_proba call per flush.
+    Returns the batcher so callers can read its stats().
+    """
+    global batcher
+    disable_micro_batching()
+    batcher = MicroBatcher(predict_proba_batch, max_batch_size=max_batch_size,
+                           max_wait_ms=max_wait_ms)
+    return batcher
+
+def disable_micro_batching():
+    """Go back to scoring each make_prediction call directly"""
+    global batcher
+    previous, batcher = batcher, None
+    if previous is not None:
+        # Score the rows still queued and stop the worker thread
+        previous.close()
+
+def ensure_models_loaded():
+    """
+    Return the active backend if a model is ready to score, else None.
+
+    Never loads inside the request: if no model is available a background
+    load is started (at most once per LOAD_RETRY_SECONDS after a failure)
+    and the caller falls back.
+    """
+    active = backend
+    if active is not None:
+        return active
+    
+    retry_due = time.monotonic() - _last_load_started >= LOAD_RETRY_SECONDS
+    if not _loading_in_this_process() and (model_state != 'failed' or retry_due):
+        print("⚠️ ML models not loaded, loading in the background...")
+        start_background_load()
+    return None
 
 def make_prediction(input_data):
     """
     Takes the 21 assessment parameters, preprocesses them,
     and returns a prediction from the ML model.
     """
-    global model, scaler
-    
     try:
-        # Check if models are loaded
-        if model is None or scaler is None:
-            print("⚠️ ML models not loaded, attempting to reload...")
-            if not load_models():
-                print("❌ Failed to load ML models, returning fallback prediction")
-                # Return a fallback prediction structure
-                return {
-                    'risk_score': 0.3,  # Default moderate risk
-                    'risk_level': 'Moderate',
-                    'confidence_score': 0.6,
-                    'recommendations': [
-                        'ML model unavailable - consult healthcare provider for assessment',
-                        'Regular health checkups are recommended'
-                    ],
-                    'risk_factors': ['Model temporarily unavailable']
-                }
-        
-        # Convert the input data dictionary to a Pandas DataFrame
-        # The column order MUST match the order the model was trained on
-        df = pd.DataFrame([input_data])
+        # Check if models are loaded; the same backend is used for the whole
+        # call even if a new version is swapped in meanwhile
+        active = ensure_models_loaded()
+        if active is None:
+            print("❌ Failed to load ML models, returning fallback prediction")
+            return fallback_prediction(
+                'ML model unavailable - consult healthcare provider for assessment',
+                'Model temporarily unavailable',
+                reason='model_unavailable'
+            )
         
-        # Scale the data using the loaded scaler
-        scaled_data = scaler.transform(df)
+        # Convert the input data dictionary to a feature row
+        # The vectorizer keeps the column order the model was trained on
+        features = vectorizer.transform_one(input_data)
         
-        # Make a prediction
-        prediction = model.predict(scaled_data)
-        prediction_proba = model.predict_proba(scaled_data)
+        # Identical inputs scored by the same model version are served from cache
+        cache = prediction_cache
+        cache_key = None
+        if cache is not None:
+            cache_key = cache.key_for(features[0], active.version)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
         
-        # Format the result
-        risk_score = float(prediction_proba[0][1])  # Probability of heart attack
-        risk_level = 'High' if risk_score > 0.5 else 'Low'  # Example threshold
-
-        result = {
-            'risk_score': risk_score,
-            'risk_level': risk_level,
-            'confidence_score': float(max(prediction_proba[0])),
-            'recommendations': ['Consult a doctor for a full evaluation.'],
-            'risk_factors': ['Based on model analysis.']
-        }
+        # Let the micro-batcher coalesce this row with concurrent requests
+        active_batcher = batcher
+        proba_row = None
+        if active_batcher is not None:
+            try:
+                proba_row, version = active_batcher.predict(features[0],
+                                                            timeout=MICRO_BATCH_TIMEOUT_SECONDS)
+            except BatcherClosed:
+                # Batching was switched off while this request was in flight
+                pass
+        if proba_row is None:
+            # Scale and score the row with the active backend
+            proba_row, version = active.predict_proba(features)[0], active.version
         
+        result = format_prediction(proba_row, version)
+        if cache_key is not None and version == active.version:
+            cache.set(cache_key, result, active.version)
         return result
 
+    except FeatureError as e:
+        print(f"❌ Invalid assessment data: {e}")
+        return fallback_prediction(
+            'Assessment data could not be processed - please review your inputs',
+            'Invalid assessment data',
+            reason='invalid_input'
+        )
     except Exception as e:
         print(f"❌ Error during prediction: {e}")
         # Return fallback prediction on any error
-        return {
-            'risk_score': 0.3,
-            'risk_level': 'Moderate',
-            'confidence_score': 0.6,
-            'recommendations': [
+        return fallback_prediction(
+            'Prediction service temporarily unavailable',
+            'System error occurred'
+        )
+
+def make_predictions(input_rows):
+    """
+    Score many assessments at once.
+
+    All rows are vectorized into one N x 21 matrix which goes through a
+    single backend predict_proba call. Returns one result dict per
+    input row, in order. Rows should be checked with vectorizer.find_errors
+    first; one bad row makes the whole batch fall back.
+    """
+    if not input_rows:
+        return []
+    
+    try:
+        active = ensure_models_loaded()
+        if active is None:
+            print("❌ Failed to load ML models, returning fallback predictions")
+            return [
+                fallback_prediction(
+                    'ML model unavailable - consult healthcare provider for assessment',
+                    'Model temporarily unavailable',
+                    reason='model_unavailable'
+                )
+                for _ in input_rows
+            ]
+        
+        features = vectorizer.transform_many(input_rows)
+        results = [None] * len(features)
+        
+        # Serve repeated inputs from the cache and only score the misses
+        cache = prediction_cache
+        cache_keys = None
+        if cache is not None:
+            cache_keys = [cache.key_for(row, active.version) for row in features]
+            results = [cache.get(key) for key in cache_keys]
+        
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            to_score = features if len(missing) == len(features) else features[missing]
+            prediction_proba = active.predict_proba(to_score)
+            
+            for i, proba_row in zip(missing, prediction_proba):
+                results[i] = format_prediction(proba_row, active.version)
+                if cache_keys is not None:
+                    cache.set(cache_keys[i], results[i], active.version)
+        
+        return results
+
+    except Exception as e:
+        print(f"❌ Error during batch prediction: {e}")
+        return [
+            fallback_prediction(
                 'Prediction service temporarily unavailable',
-                'Please try again or consult healthcare provider'
-            ],
-            'risk_factors': ['System error occurred']
-        }
\ No newline at end of file
+                'System error occurred'
+            )
+            for _ in input_rows
+        ]
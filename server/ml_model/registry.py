@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Versioned model registry with hot reload.
+
+Layout (default root: ml_model/registry/):
+
+    registry/
+        CURRENT              name of the active version
+        2025-10-01-ab12cd/
+            manifest.json    version, backend, created_at, sha256 per file
+            model.pkl
+            scaler.pkl
+            ...
+
+Publishing copies artifacts into a new version directory and writes its
+manifest; activating rewrites CURRENT atomically. A RegistryWatcher running
+in every worker notices the change, loads and verifies the new version on
+its own thread, then swaps it in with a single reference assignment, so
+requests never wait on a reload.
+
+Usage:
+    python -m ml_model.registry publish [--from DIR] [--version NAME] [--backend NAME] [--no-activate]
+    python -m ml_model.registry activate NAME
+    python -m ml_model.registry list
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+MODEL_DIR = Path(__file__).parent
+DEFAULT_REGISTRY_DIR = MODEL_DIR / 'registry'
+MANIFEST_FILENAME = 'manifest.json'
+CURRENT_FILENAME = 'CURRENT'
+
+# Artifact files the backends know how to load
+ARTIFACT_FILENAMES = ('model.pkl', 'scaler.pkl', 'model.onnx', 'model_trees.npz', 'model_fused.npz')
+
+
+class RegistryError(Exception):
+    """Raised for missing versions, bad manifests and checksum mismatches"""
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_atomic(path, text):
+    """Write text to path so readers see either the old or the new content"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def write_manifest(directory, version, backend, files, training=None):
+    """Write manifest.json for the artifacts in directory; returns the manifest"""
+    manifest = {
+        'version': version,
+        'backend': backend,
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'files': files,
+    }
+    if training is not None:
+        manifest['training'] = training
+    with open(Path(directory) / MANIFEST_FILENAME, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+class ModelRegistry:
+    """A directory of immutable, checksummed model versions"""
+
+    def __init__(self, root=DEFAULT_REGISTRY_DIR):
+        self.root = Path(root)
+
+    def __repr__(self):
+        return f'<ModelRegistry {self.root}>'
+
+    def version_dir(self, version):
+        return self.root / version
+
+    def list_versions(self):
+        if not self.root.is_dir():
+            return []
+        return sorted(p.name for p in self.root.iterdir()
+                      if (p / MANIFEST_FILENAME).is_file())
+
+    def current_version(self):
+        """Return the active version name, or None if nothing is active"""
+        try:
+            version = (self.root / CURRENT_FILENAME).read_text().strip()
+        except FileNotFoundError:
+            return None
+        return version or None
+
+    def manifest(self, version):
+        path = self.version_dir(version) / MANIFEST_FILENAME
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise RegistryError(f"Model version '{version}' not found in {self.root}")
+        except ValueError as e:
+            raise RegistryError(f"Invalid manifest for '{version}': {e}")
+
+    def verify(self, version):
+        """Check every artifact against its manifest checksum; returns the manifest"""
+        manifest = self.manifest(version)
+        for name, expected in manifest['files'].items():
+            path = self.version_dir(version) / name
+            if not path.is_file():
+                raise RegistryError(f"'{version}' is missing {name}")
+            if file_sha256(path) != expected:
+                raise RegistryError(f"Checksum mismatch for {name} in '{version}'")
+        return manifest
+
+    def publish(self, source_dir=MODEL_DIR, version=None, backend=None, activate=True,
+                training=None):
+        """Copy the artifacts found in source_dir into a new version"""
+        source_dir = Path(source_dir)
+        files = [source_dir / name for name in ARTIFACT_FILENAMES if (source_dir / name).is_file()]
+        if not files:
+            raise RegistryError(f"No model artifacts found in {source_dir}")
+
+        checksums = {path.name: file_sha256(path) for path in files}
+        if version is None:
+            combined = hashlib.sha256(''.join(sorted(checksums.values())).encode()).hexdigest()
+            version = f"{datetime.date.today().isoformat()}-{combined[:8]}"
+
+        target = self.version_dir(version)
+        if target.exists():
+            raise RegistryError(f"Model version '{version}' already exists")
+
+        # Build the version in a scratch directory and rename it into place
+        self.root.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(dir=self.root, prefix='.staging-'))
+        try:
+            for path in files:
+                shutil.copy2(path, staging / path.name)
+            manifest = write_manifest(staging, version, backend, checksums, training)
+            os.rename(staging, target)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        if activate:
+            self.activate(version)
+        return manifest
+
+    def activate(self, version):
+        """Point CURRENT at version (after verifying it)"""
+        self.verify(version)
+        _write_atomic(self.root / CURRENT_FILENAME, version + '\n')
+
+
+class RegistryWatcher:
+    """
+    Polls CURRENT and hands new versions to on_change on a background thread.
+
+    on_change(version) loads and installs the version and returns True on
+    success; failed versions are not retried until CURRENT changes again.
+    """
+
+    def __init__(self, registry, on_change, interval_seconds=10.0):
+        self.registry = registry
+        self.on_change = on_change
+        self.interval = float(interval_seconds)
+        self.seen_version = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def __repr__(self):
+        return f'<RegistryWatcher {self.registry.root} every {self.interval:g}s>'
+
+    def start(self, seen_version=None):
+        """Start polling (again after a fork, where threads are lost)"""
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return self
+        self.seen_version = seen_version
+        self._stop.clear()
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name='ml-registry-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def check(self):
+        """Poll once; returns True if a new version was installed"""
+        version = self.registry.current_version()
+        if version is None or version == self.seen_version:
+            return False
+        self.seen_version = version
+        return bool(self.on_change(version))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"⚠️ Model registry check failed: {e}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Manage versioned model artifacts')
+    parser.add_argument('--registry', default=str(DEFAULT_REGISTRY_DIR),
+                        help='registry root directory')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    publish = commands.add_parser('publish', help='publish artifacts as a new version')
+    publish.add_argument('--from', dest='source', default=str(MODEL_DIR),
+                         help='directory containing the artifacts')
+    publish.add_argument('--version', default=None, help='version name (default: date + hash)')
+    publish.add_argument('--backend', default=None, help='backend to serve this version with')
+    publish.add_argument('--no-activate', action='store_true', help='publish without activating')
+
+    activate = commands.add_parser('activate', help='make an existing version current')
+    activate.add_argument('version')
+
+    commands.add_parser('list', help='list versions')
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(args.registry)
+    try:
+        if args.command == 'publish':
+            manifest = registry.publish(args.source, args.version, args.backend,
+                                        activate=not args.no_activate)
+            state = 'published' if args.no_activate else 'published and activated'
+            print(f"✅ Model version {manifest['version']} {state}")
+        elif args.command == 'activate':
+            registry.activate(args.version)
+            print(f"✅ Model version {args.version} activated")
+        else:
+            current = registry.current_version()
+            for version in registry.list_versions():
+                marker = '*' if version == current else ' '
+                print(f"{marker} {version}")
+    except RegistryError as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Offline bulk scoring of historical cohorts.
+
+Reads the input in fixed-size chunks, scores the chunks on a pool of worker
+processes and writes the results as each chunk completes, so memory stays
+bounded by (workers x chunk size) however large the input is.
+
+Input:  .xlsx (e.g. heart_attack_prediction_india_cleaned.xlsx), .csv or
+        .parquet with one column per feature, or an export of the
+        assessments table with an assessment_data JSON column.
+Output: .csv (one file) or .parquet (a directory of part files).
+        Each row: id, risk_score, risk_level, model_version, error.
+
+Progress is checkpointed to <output>.progress.json after every chunk; run
+the same command again to resume after the last completed chunk.
+
+Usage:
+    python -m ml_model.score INPUT OUTPUT [--chunk-size N] [--workers N]
+                             [--backend NAME] [--version NAME]
+                             [--id-column NAME] [--restart]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from ml_model import prediction
+from ml_model.features import FeatureError
+
+DEFAULT_CHUNK_SIZE = 10000
+PROGRESS_SUFFIX = '.progress.json'
+OUTPUT_COLUMNS = ('id', 'risk_score', 'risk_level', 'model_version', 'error')
+
+
+# ----------------------------------------------------------------------
+# Input: generators of DataFrame chunks
+# ----------------------------------------------------------------------
+
+def _read_xlsx_chunks(path, chunk_size):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(name) for name in next(rows)]
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield pd.DataFrame(chunk, columns=header)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=header)
+    finally:
+        workbook.close()
+
+
+def _read_parquet_chunks(path, chunk_size):
+    import pyarrow.parquet as pq
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+        yield batch.to_pandas()
+
+
+def read_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield the input file as DataFrames of at most chunk_size rows"""
+    suffix = Path(path).suffix.lower()
+    if suffix in ('.xlsx', '.xlsm'):
+        return _read_xlsx_chunks(path, chunk_size)
+    if suffix == '.csv':
+        return iter(pd.read_csv(path, chunksize=chunk_size))
+    if suffix == '.parquet':
+        return _read_parquet_chunks(path, chunk_size)
+    raise ValueError(f"Unsupported input format '{suffix}' (use .xlsx, .csv or .parquet)")
+
+
+def chunk_records(frame):
+    """Assessment dictionaries for one chunk (expands assessment_data exports)"""
+    if 'assessment_data' in frame.columns:
+        return [json.loads(data) if isinstance(data, str) else data
+                for data in frame['assessment_data']]
+    return frame.to_dict(orient='records')
+
+
+def default_id_column(columns):
+    for name in ('id', 'assessment_id', 'patient_id'):
+        if name in columns:
+            return name
+    return None
+
+
+# ----------------------------------------------------------------------
+# Scoring (runs in the worker processes)
+# ----------------------------------------------------------------------
+
+def _init_worker(backend_name, version):
+    # Forked workers inherit the parent's model; spawned ones load their own
+    if prediction.backend is None:
+        prediction.load_models(backend_name, version)
+
+
+def score_chunk(index, ids, records):
+    """Score one chunk; invalid rows get an error instead of a score"""
+    active = prediction.backend
+    if active is None:
+        raise RuntimeError('No model loaded in the scoring worker')
+
+    vectorizer = prediction.vectorizer
+    features = np.empty((len(records), vectorizer.n_features), dtype=np.float64)
+    valid = np.ones(len(records), dtype=bool)
+    errors = [None] * len(records)
+    for i, data in enumerate(records):
+        try:
+            vectorizer.fill(data, features[i])
+        except FeatureError as e:
+            valid[i] = False
+            errors[i] = '; '.join(e.errors)
+        except Exception as e:
+            valid[i] = False
+            errors[i] = str(e)
+
+    risk_score = np.full(len(records), np.nan)
+    if valid.any():
+        risk_score[valid] = active.predict_proba(features[valid])[:, 1]
+
+    result = pd.DataFrame({
+        'id': ids,
+        'risk_score': risk_score,
+        'risk_level': pd.array([prediction.risk_level_for(score) if ok else None
+                                for score, ok in zip(risk_score, valid)], dtype='string'),
+        'model_version': active.version,
+        # Explicit string dtype keeps the Parquet schema the same in every part
+        'error': pd.array(errors, dtype='string'),
+    }, columns=list(OUTPUT_COLUMNS))
+    return index, result
+
+
+# ----------------------------------------------------------------------
+# Output and checkpointing
+# ----------------------------------------------------------------------
+
+class CsvOutput:
+    """One CSV file; resuming truncates it back to the last checkpoint"""
+
+    def __init__(self, path, progress):
+        self.path = Path(path)
+        self.offset = progress.get('csv_bytes', 0)
+        if self.offset:
+            with open(self.path, 'r+b') as f:
+                f.truncate(self.offset)
+        else:
+            self.path.write_bytes(b'')
+
+    def write(self, index, frame):
+        with open(self.path, 'ab') as f:
+            frame.to_csv(f, header=self.offset == 0, index=False)
+            f.flush()
+            os.fsync(f.fileno())
+            self.offset = f.tell()
+        return {'csv_bytes': self.offset}
+
+
+class ParquetOutput:
+    """A directory of part-NNNNN.parquet files, one per chunk"""
+
+    def __init__(self, path, progress):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        if not progress['chunks_done']:
+            for part in self.path.glob('part-*.parquet'):
+                part.unlink()
+
+    def write(self, index, frame):
+        part = self.path / f'part-{index:05d}.parquet'
+        tmp_part = part.with_name('.' + part.name)
+        frame.to_parquet(tmp_part, index=False)
+        os.replace(tmp_part, part)
+        return {}
+
+
+def open_output(path, progress):
+    suffix = Path(path).suffix.lower()
+    if suffix == '.csv':
+        return CsvOutput(path, progress)
+    if suffix == '.parquet':
+        return ParquetOutput(path, progress)
+    raise ValueError(f"Unsupported output format '{suffix}' (use .csv or .parquet)")
+
+
+def _input_fingerprint(path):
+    stat = os.stat(path)
+    return {'input': str(Path(path).resolve()), 'input_bytes': stat.st_size,
+            'input_mtime': stat.st_mtime}
+
+
+def load_progress(progress_path, expected):
+    """Return the saved checkpoint if it belongs to the same job, else None"""
+    try:
+        with open(progress_path) as f:
+            progress = json.load(f)
+    except FileNotFoundError:
+        return None
+    for key, value in expected.items():
+        if progress.get(key) != value:
+            raise ValueError(
+                f"{progress_path} belongs to a different job ({key} changed); "
+                f"use --restart to start over"
+            )
+    return progress
+
+
+def save_progress(progress_path, progress):
+    tmp_path = f'{progress_path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(progress, f, indent=2)
+    os.replace(tmp_path, progress_path)
+
+
+# ----------------------------------------------------------------------
+# Driver
+# ----------------------------------------------------------------------
+
+def score_file(input_path, output_path, chunk_size=DEFAULT_CHUNK_SIZE, workers=None,
+               backend_name=None, version=None, id_column=None, restart=False):
+    """
+    Score input_path into output_path; returns a summary dictionary.
+
+    At most 2 x workers chunks are in flight at once. Chunks are written in
+    input order, so the checkpoint is simply the number of chunks done.
+    """
+    if prediction.backend is None and not prediction.load_models(backend_name, version):
+        raise RuntimeError(f"Could not load the model: {prediction.model_error}")
+    active = prediction.backend
+    workers = workers or os.cpu_count() or 1
+
+    progress_path = f'{output_path}{PROGRESS_SUFFIX}'
+    job = {**_input_fingerprint(input_path), 'chunk_size': chunk_size,
+           'model_version': active.version}
+    if restart and os.path.exists(progress_path):
+        os.unlink(progress_path)
+    progress = load_progress(progress_path, job) or {**job, 'chunks_done': 0, 'rows_done': 0}
+    skip = progress['chunks_done']
+    if skip:
+        print(f"⏩ Resuming after chunk {skip} ({progress['rows_done']} rows already scored)")
+
+    output = open_output(output_path, progress)
+
+    def jobs():
+        for index, frame in enumerate(read_chunks(input_path, chunk_size)):
+            if index < skip:
+                continue
+            column = id_column or default_id_column(frame.columns)
+            start = index * chunk_size
+            ids = (frame[column].tolist() if column
+                   else list(range(start, start + len(frame))))
+            yield index, ids, chunk_records(frame)
+
+    started = time.perf_counter()
+    rows = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(active.name, version)) as pool:
+        pending = deque()
+        job_iter = jobs()
+        while True:
+            while len(pending) < 2 * workers:
+                try:
+                    pending.append(pool.submit(score_chunk, *next(job_iter)))
+                except StopIteration:
+                    break
+            if not pending:
+                break
+
+            index, frame = pending.popleft().result()
+            progress.update(output.write(index, frame))
+            rows += len(frame)
+            progress['chunks_done'] = index + 1
+            progress['rows_done'] += len(frame)
+            save_progress(progress_path, progress)
+
+            elapsed = time.perf_counter() - started
+            print(f"   chunk {index}: {progress['rows_done']} rows, "
+                  f"{rows / elapsed:,.0f} rows/sec")
+
+    elapsed = time.perf_counter() - started
+    return {
+        'rows': rows,
+        'rows_total': progress['rows_done'],
+        'chunks': progress['chunks_done'],
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(rows / elapsed, 1) if elapsed > 0 else None,
+        'model_version': active.version,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score a cohort file with the risk model')
+    parser.add_argument('input', help='.xlsx, .csv or .parquet file')
+    parser.add_argument('output', help='.csv file or .parquet directory')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f'rows per chunk (default: {DEFAULT_CHUNK_SIZE})')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='scoring processes (default: CPU count)')
+    parser.add_argument('--backend', default=None, help='inference backend (default: ML_BACKEND)')
+    parser.add_argument('--version', default=None, help='registry model version (default: CURRENT)')
+    parser.add_argument('--id-column', default=None,
+                        help='input column copied to the output id (default: id/patient_id)')
+    parser.add_argument('--restart', action='store_true', help='ignore saved progress')
+    args = parser.parse_args(argv)
+
+    try:
+        summary = score_file(args.input, args.output, args.chunk_size, args.workers,
+                             args.backend, args.version, args.id_column, args.restart)
+    except Exception as e:
+        print(f"❌ Scoring failed: {e}")
+        return 1
+
+    print(f"✅ Scored {summary['rows']} rows in {summary['seconds']}s "
+          f"({summary['rows_per_second']} rows/sec) with model {summary['model_version']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Cold-start timing for the ML module.
+
+Records how long each startup phase, each heavy module import and each
+artifact load took, so cold-start regressions show up in /ready and in the
+server log.
+"""
+
+import importlib
+import os
+import pickle
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupReport:
+    """Thread-safe collection of startup timings (all values in milliseconds)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.phases = {}
+        self.imports = {}
+        self.artifacts = {}
+
+    def record_phase(self, name, seconds):
+        with self._lock:
+            self.phases[name] = round(seconds * 1000.0, 3)
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_phase(name, time.perf_counter() - started)
+
+    def import_module(self, name):
+        """Import a module, recording the time if this is its first import"""
+        if name in sys.modules:
+            return sys.modules[name]
+        started = time.perf_counter()
+        module = importlib.import_module(name)
+        with self._lock:
+            self.imports[name] = round((time.perf_counter() - started) * 1000.0, 3)
+        return module
+
+    @contextmanager
+    def artifact(self, path):
+        """Time the load of one artifact file"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                size = None
+            with self._lock:
+                self.artifacts[os.path.basename(str(path))] = {
+                    'load_ms': round(elapsed * 1000.0, 3),
+                    'bytes': size,
+                }
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'phases_ms': dict(self.phases),
+                'imports_ms': dict(self.imports),
+                'artifacts': {name: dict(info) for name, info in self.artifacts.items()},
+            }
+
+    def summary(self):
+        """One-line human-readable summary for the server log"""
+        report = self.as_dict()
+        parts = [f"{name} {ms:.0f}ms" for name, ms in report['phases_ms'].items()]
+        parts += [f"import {name} {ms:.0f}ms" for name, ms in report['imports_ms'].items()]
+        parts += [f"{name} {info['load_ms']:.0f}ms" for name, info in report['artifacts'].items()]
+        return ', '.join(parts)
+
+
+# Process-wide report shared by the loader and the app
+startup_report = StartupReport()
+
+
+class TimedUnpickler(pickle.Unpickler):
+    """Unpickler that records the import time of every module a pickle needs"""
+
+    def __init__(self, file, report=startup_report):
+        super().__init__(file)
+        self.report = report
+
+    def find_class(self, module, name):
+        top_level = module.split('.')[0]
+        if top_level not in sys.modules:
+            self.report.import_module(top_level)
+        return super().find_class(module, name)
+
+
+def load_pickle(path, report=startup_report):
+    """pickle.load with artifact and import timings recorded in report"""
+    with report.artifact(path), open(path, 'rb') as f:
+        return TimedUnpickler(f, report).load()
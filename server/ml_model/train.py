@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Reproducible training pipeline for the risk model.
+
+Builds scaler.pkl and model.pkl from the dataset (see ml_model/dataset.py):
+
+1. Split the data into train / validation / test (stratified, seeded).
+2. Fit a StandardScaler on the training split.
+3. Search XGBoost hyperparameters with optuna. Trials run one at a time
+   unless --jobs is given: parallel trials finish in a different order on
+   every run, so only a sequential search is reproducible. Every candidate
+   is scored on validation AUC and, on the backend it will be served with,
+   on measured per-row and per-batch latency and artifact size. Candidates
+   over the latency/size budget are rejected.
+4. Re-measure the best candidates without the search running alongside and
+   keep the best one that is still within budget.
+5. Write the artifacts (plus the NumPy tree exports) and a manifest.json in
+   the model registry format, optionally publishing them as a new version.
+
+Usage:
+    python -m ml_model.train [--trials N] [--jobs N] [--seed N]
+                             [--backend pickle|numpy|fused]
+                             [--max-row-latency-ms MS] [--max-batch-latency-ms MS]
+                             [--max-model-kb KB] [--output-dir DIR] [--cache-dir DIR]
+                             [--publish] [--activate]
+"""
+
+import argparse
+import datetime
+import io
+import json
+import pickle
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from ml_model.backends import FusedTreeBackend, NumpyTreeBackend, PickleBackend
+from ml_model.dataset import CACHE_DIR, DATASET_PATH, load_arrays
+from ml_model.registry import ModelRegistry, file_sha256, write_manifest
+from ml_model.tree_engine import FUSED_FILENAME, TREES_FILENAME, TreeEnsemble
+
+MODEL_DIR = Path(__file__).parent
+RUNS_DIR = MODEL_DIR / 'training_runs'
+
+# Latency is measured on single rows and on batches of this size
+LATENCY_BATCH_SIZE = 256
+LATENCY_REPEATS = 50
+
+# Candidates re-measured in isolation after the search
+FINALISTS = 5
+
+
+class BudgetExceeded(Exception):
+    """Raised when a candidate misses the latency or size budget"""
+
+
+def split_dataset(features, labels, seed=42):
+    """Stratified 60/20/20 train/validation/test split"""
+    from sklearn.model_selection import train_test_split
+
+    x_train, x_rest, y_train, y_rest = train_test_split(
+        features, labels, test_size=0.4, stratify=labels, random_state=seed
+    )
+    x_valid, x_test, y_valid, y_test = train_test_split(
+        x_rest, y_rest, test_size=0.5, stratify=y_rest, random_state=seed
+    )
+    return (x_train, y_train), (x_valid, y_valid), (x_test, y_test)
+
+
+def serving_backend(name, model, scaler):
+    """Build the in-memory backend a candidate would be served with"""
+    if name == PickleBackend.name:
+        return PickleBackend(model, scaler)
+    ensemble = TreeEnsemble.from_xgboost(model, scaler)
+    if name == FusedTreeBackend.name:
+        return FusedTreeBackend(ensemble.fuse_scaler())
+    return NumpyTreeBackend(ensemble)
+
+
+def artifact_size(backend):
+    """Bytes the backend's artifacts take on disk"""
+    if isinstance(backend, PickleBackend):
+        return len(pickle.dumps(backend.model)) + len(pickle.dumps(backend.scaler))
+    buffer = io.BytesIO()
+    ensemble = backend.ensemble
+    np.savez(buffer, feature=ensemble.feature, threshold=ensemble.threshold,
+             children=ensemble.children, default_left=ensemble.default_left,
+             value=ensemble.value, roots=ensemble.roots)
+    return buffer.tell()
+
+
+def measure_latency(backend, features, batch_size, repeats=LATENCY_REPEATS):
+    """Median milliseconds per predict_proba call on batches of batch_size rows"""
+    batch = np.ascontiguousarray(features[:batch_size], dtype=np.float64)
+    backend.predict_proba(batch)  # warm-up
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        backend.predict_proba(batch)
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings) * 1000.0)
+
+
+def evaluate_candidate(backend, features, labels, budget):
+    """AUC, latency and size of one candidate; raises BudgetExceeded if over budget"""
+    from sklearn.metrics import roc_auc_score
+
+    metrics = {
+        'auc': float(roc_auc_score(labels, backend.predict_proba(features)[:, 1])),
+        'row_latency_ms': measure_latency(backend, features, 1),
+        'batch_latency_ms': measure_latency(backend, features, LATENCY_BATCH_SIZE),
+        'model_bytes': artifact_size(backend),
+    }
+    if budget.get('max_row_latency_ms') and metrics['row_latency_ms'] > budget['max_row_latency_ms']:
+        raise BudgetExceeded(f"row latency {metrics['row_latency_ms']:.3f}ms over budget", metrics)
+    if budget.get('max_batch_latency_ms') and metrics['batch_latency_ms'] > budget['max_batch_latency_ms']:
+        raise BudgetExceeded(f"batch latency {metrics['batch_latency_ms']:.3f}ms over budget", metrics)
+    if budget.get('max_model_kb') and metrics['model_bytes'] > budget['max_model_kb'] * 1024:
+        raise BudgetExceeded(f"model size {metrics['model_bytes']} bytes over budget", metrics)
+    return metrics
+
+
+def fit_model(params, x_train, y_train, seed=42):
+    """Fit one XGBoost candidate (single-threaded, so --jobs parallel trials share the cores)"""
+    from xgboost import XGBClassifier
+
+    model = XGBClassifier(objective='binary:logistic', eval_metric='auc', n_jobs=1,
+                          random_state=seed, **params)
+    return model.fit(x_train, y_train)
+
+
+def suggest_params(trial):
+    return {
+        'n_estimators': trial.suggest_int('n_estimators', 25, 400, log=True),
+        'max_depth': trial.suggest_int('max_depth', 2, 8),
+        'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.3, log=True),
+        'subsample': trial.suggest_float('subsample', 0.5, 1.0),
+        'colsample_bytree': trial.suggest_float('colsample_bytree', 0.5, 1.0),
+        'min_child_weight': trial.suggest_float('min_child_weight', 1.0, 20.0, log=True),
+        'reg_lambda': trial.suggest_float('reg_lambda', 0.1, 10.0, log=True),
+    }
+
+
+def search(scaler, train, valid, budget, backend_name='pickle', trials=50, jobs=None, seed=42):
+    """Run the optuna study; returns it (rejected trials are pruned)"""
+    import optuna
+
+    x_train = scaler.transform(train[0])
+    x_valid, y_valid = valid
+
+    def objective(trial):
+        params = suggest_params(trial)
+        model = fit_model(params, x_train, train[1], seed)
+        try:
+            metrics = evaluate_candidate(serving_backend(backend_name, model, scaler),
+                                         x_valid, y_valid, budget)
+        except BudgetExceeded as e:
+            for key, value in e.args[1].items():
+                trial.set_user_attr(key, value)
+            raise optuna.TrialPruned(e.args[0])
+        for key, value in metrics.items():
+            trial.set_user_attr(key, value)
+        return metrics['auc']
+
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    study = optuna.create_study(direction='maximize',
+                                sampler=optuna.samplers.TPESampler(seed=seed))
+    study.optimize(objective, n_trials=trials, n_jobs=jobs or 1)
+    return study
+
+
+def select_model(study, scaler, train, valid, budget, backend_name='pickle', seed=42):
+    """Refit the top trials and keep the best one that is within budget when measured alone"""
+    import optuna
+
+    completed = [t for t in study.trials if t.state == optuna.trial.TrialState.COMPLETE]
+    if not completed:
+        raise BudgetExceeded('No candidate met the latency/size budget', {})
+
+    x_train = scaler.transform(train[0])
+    for trial in sorted(completed, key=lambda t: t.value, reverse=True)[:FINALISTS]:
+        model = fit_model(trial.params, x_train, train[1], seed)
+        backend = serving_backend(backend_name, model, scaler)
+        try:
+            metrics = evaluate_candidate(backend, valid[0], valid[1], budget)
+        except BudgetExceeded as e:
+            print(f"⚠️ Trial {trial.number} over budget when measured alone: {e.args[0]}")
+            continue
+        return trial, model, metrics
+    raise BudgetExceeded('No finalist met the latency/size budget when measured alone', {})
+
+
+def write_artifacts(output_dir, model, scaler, backend_name, training, version=None):
+    """
+    Write model/scaler pickles, tree exports and manifest.json into output_dir.
+
+    The manifest names version (default: the directory name), which should
+    be the version the artifacts are published under.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with open(output_dir / 'model.pkl', 'wb') as f:
+        pickle.dump(model, f)
+    with open(output_dir / 'scaler.pkl', 'wb') as f:
+        pickle.dump(scaler, f)
+
+    ensemble = TreeEnsemble.from_xgboost(model, scaler)
+    ensemble.save(output_dir / TREES_FILENAME)
+    ensemble.fuse_scaler().save(output_dir / FUSED_FILENAME)
+
+    files = {name: file_sha256(output_dir / name)
+             for name in ('model.pkl', 'scaler.pkl', TREES_FILENAME, FUSED_FILENAME)}
+    return write_manifest(output_dir, version or output_dir.name, backend_name, files, training)
+
+
+def train(source=DATASET_PATH, output_dir=None, trials=50, jobs=None, seed=42,
+          backend_name='pickle', budget=None, publish=False, activate=False, registry=None,
+          cache_root=CACHE_DIR):
+    """Run the whole pipeline; returns the manifest"""
+    from sklearn.metrics import roc_auc_score
+    from sklearn.preprocessing import StandardScaler
+
+    budget = budget or {}
+    started = time.perf_counter()
+
+    features, labels = load_arrays(source, cache_root)
+    train_split, valid_split, test_split = split_dataset(np.array(features), np.array(labels), seed)
+    scaler = StandardScaler().fit(train_split[0])
+
+    study = search(scaler, train_split, valid_split, budget, backend_name, trials, jobs, seed)
+    trial, model, metrics = select_model(study, scaler, train_split, valid_split, budget,
+                                         backend_name, seed)
+
+    backend = serving_backend(backend_name, model, scaler)
+    test_auc = float(roc_auc_score(test_split[1], backend.predict_proba(test_split[0])[:, 1]))
+
+    version = f"{datetime.datetime.now():%Y-%m-%d-%H%M%S}-t{trial.number}"
+    output_dir = Path(output_dir) if output_dir else RUNS_DIR / version
+    training = {
+        'dataset': {'source': str(Path(source).resolve()),
+                    'sha256': file_sha256(source),
+                    'rows': int(len(labels))},
+        'seed': seed,
+        'jobs': jobs or 1,
+        'trials': len(study.trials),
+        'accepted_trials': sum(1 for t in study.trials if t.value is not None),
+        'best_trial': trial.number,
+        'params': trial.params,
+        'budget': budget,
+        'validation': metrics,
+        'test_auc': test_auc,
+        'training_seconds': round(time.perf_counter() - started, 3),
+    }
+    manifest = write_artifacts(output_dir, model, scaler, backend_name, training, version)
+
+    if publish or activate:
+        registry = registry or ModelRegistry()
+        manifest = registry.publish(output_dir, version, backend_name, activate=activate,
+                                    training=training)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train the risk model with a latency budget')
+    parser.add_argument('--source', default=str(DATASET_PATH), help='dataset file')
+    parser.add_argument('--trials', type=int, default=50, help='optuna trials (default: 50)')
+    parser.add_argument('--jobs', type=int, default=None, help='parallel trials; more than 1 is faster but not reproducible (default: 1)')
+    parser.add_argument('--seed', type=int, default=42, help='random seed (default: 42)')
+    parser.add_argument('--backend', default='pickle', choices=['pickle', 'numpy', 'fused'],
+                        help='backend the model will be served with (latency is measured on it)')
+    parser.add_argument('--max-row-latency-ms', type=float, default=2.0,
+                        help='reject models slower than this per single-row call (default: 2.0)')
+    parser.add_argument('--max-batch-latency-ms', type=float, default=20.0,
+                        help=f'reject models slower than this per {LATENCY_BATCH_SIZE}-row batch '
+                             '(default: 20.0)')
+    parser.add_argument('--max-model-kb', type=float, default=None,
+                        help='reject models whose artifacts are larger than this')
+    parser.add_argument('--output-dir', default=None,
+                        help='artifact directory (default: ml_model/training_runs/<version>)')
+    parser.add_argument('--cache-dir', default=str(CACHE_DIR),
+                        help='dataset cache root directory (see ml_model.dataset)')
+    parser.add_argument('--publish', action='store_true', help='publish to the model registry')
+    parser.add_argument('--activate', action='store_true', help='publish and activate')
+    args = parser.parse_args(argv)
+
+    budget = {
+        'max_row_latency_ms': args.max_row_latency_ms,
+        'max_batch_latency_ms': args.max_batch_latency_ms,
+        'max_model_kb': args.max_model_kb,
+    }
+    try:
+        manifest = train(args.source, args.output_dir, args.trials, args.jobs, args.seed,
+                         args.backend, budget, args.publish, args.activate,
+                         cache_root=args.cache_dir)
+    except ImportError as e:
+        print(f"❌ Training needs optuna, scikit-learn and xgboost: {e}")
+        return 1
+    except BudgetExceeded as e:
+        print(f"❌ {e.args[0]}")
+        return 1
+
+    result = manifest['training']
+    print(f"✅ Model {manifest['version']}: validation AUC {result['validation']['auc']:.4f}, "
+          f"test AUC {result['test_auc']:.4f}, "
+          f"{result['validation']['row_latency_ms']:.3f}ms/row, "
+          f"{result['validation']['batch_latency_ms']:.3f}ms/{LATENCY_BATCH_SIZE} rows, "
+          f"{result['validation']['model_bytes'] / 1024:.0f} KB")
+    print(json.dumps(result['params'], indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
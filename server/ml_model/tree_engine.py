@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+Pure-NumPy evaluator for the XGBoost risk model.
+
+The trained ensemble is flattened once into contiguous arrays (feature
+index, threshold, left/right child, missing-value direction, leaf value)
+and saved as an .npz file together with the StandardScaler parameters.
+Serving then needs only NumPy: whole batches are evaluated by walking all
+trees one level at a time with vectorized gathers.
+
+With --fuse the scaler is folded into the split thresholds instead, which
+are then stored in raw feature units (model_fused.npz): inference skips the
+scaling pass entirely and there is no separate scaler to get out of sync.
+
+The .npz is written uncompressed, so load(path, mmap=True) maps the arrays
+read-only straight from the file: every worker on the host shares the same
+page-cache pages instead of holding a private copy.
+
+Usage (offline, needs xgboost to read model.pkl):
+    python -m ml_model.tree_engine [--fuse] [--model-dir DIR] [--output PATH]
+"""
+
+import argparse
+import json
+import math
+import os
+import pickle
+import struct
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+import numpy as np
+
+MODEL_DIR = Path(__file__).parent
+TREES_FILENAME = 'model_trees.npz'
+FUSED_FILENAME = 'model_fused.npz'
+
+# Bump when the array layout written by save() changes
+FORMAT_VERSION = 1
+
+# Rows evaluated together; keeps the per-level node matrices in cache
+BLOCK_ROWS = 256
+
+
+class TreeEnsemble:
+    """
+    A binary-logistic tree ensemble stored as flat node arrays.
+
+    Nodes of every tree live in the same arrays; roots[t] is the index of
+    tree t's root. Leaves point to themselves, so every row can take
+    max_depth steps regardless of where its path ends.
+
+    A fused ensemble has float64 thresholds in raw feature units and no
+    scaler parameters (see fuse_scaler()).
+    """
+
+    def __init__(self, feature, threshold, left, right, default_left, value,
+                 roots, max_depth, base_margin, scaler_mean=None, scaler_scale=None,
+                 fused=False, children=None):
+        self.fused = bool(fused)
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold = np.ascontiguousarray(
+            threshold, dtype=np.float64 if self.fused else np.float32
+        )
+        self.left = np.ascontiguousarray(left, dtype=np.int32)
+        self.right = np.ascontiguousarray(right, dtype=np.int32)
+        self.default_left = np.ascontiguousarray(default_left, dtype=bool)
+        self.value = np.ascontiguousarray(value, dtype=np.float32)
+        self.roots = np.ascontiguousarray(roots, dtype=np.int32)
+        self.max_depth = int(max_depth)
+        self.base_margin = float(base_margin)
+        if children is None:
+            children = np.column_stack([self.left, self.right]).ravel()
+        self.children = np.ascontiguousarray(children, dtype=np.int32)
+        self.scaler_mean = None if scaler_mean is None else np.asarray(scaler_mean, dtype=np.float64)
+        self.scaler_scale = None if scaler_scale is None else np.asarray(scaler_scale, dtype=np.float64)
+
+    def __repr__(self):
+        return (f'<TreeEnsemble {len(self.roots)} trees, {len(self.feature)} nodes, '
+                f'depth {self.max_depth}{", fused" if self.fused else ""}>')
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_xgboost(cls, model, scaler=None):
+        """Flatten a fitted XGBClassifier (or Booster) with a binary:logistic objective"""
+        booster = model.get_booster() if hasattr(model, 'get_booster') else model
+        learner = json.loads(booster.save_raw('json'))['learner']
+
+        objective = learner['objective']['name']
+        if objective != 'binary:logistic':
+            raise ValueError(f"Unsupported objective '{objective}' (expected binary:logistic)")
+        gbm = learner['gradient_booster']
+        if gbm['name'] != 'gbtree':
+            raise ValueError(f"Unsupported booster '{gbm['name']}' (expected gbtree)")
+
+        # base_score is a probability, serialized as '0.5' or '[5E-1]'
+        base_score = float(str(learner['learner_model_param']['base_score']).strip('[]'))
+        base_margin = math.log(base_score / (1.0 - base_score))
+
+        trees = gbm['model']['trees']
+        iteration_range = getattr(model, 'best_iteration', None)
+        if iteration_range is not None and hasattr(model, 'get_booster'):
+            trees = trees[:iteration_range + 1]
+
+        feature, threshold, left, right, default_left, value, roots = [], [], [], [], [], [], []
+        max_depth = 0
+        offset = 0
+        for tree in trees:
+            if any(tree['split_type']):
+                raise ValueError('Categorical splits are not supported')
+
+            lefts = tree['left_children']
+            n_nodes = len(lefts)
+            is_leaf = [child == -1 for child in lefts]
+            node_ids = range(offset, offset + n_nodes)
+
+            roots.append(offset)
+            feature.extend(0 if leaf else f for leaf, f in zip(is_leaf, tree['split_indices']))
+            threshold.extend(0.0 if leaf else c for leaf, c in zip(is_leaf, tree['split_conditions']))
+            left.extend(i if leaf else offset + c for i, leaf, c in zip(node_ids, is_leaf, lefts))
+            right.extend(i if leaf else offset + c
+                         for i, leaf, c in zip(node_ids, is_leaf, tree['right_children']))
+            default_left.extend(bool(d) for d in tree['default_left'])
+            value.extend(c if leaf else 0.0 for leaf, c in zip(is_leaf, tree['split_conditions']))
+            max_depth = max(max_depth, _tree_depth(lefts, tree['right_children']))
+            offset += n_nodes
+
+        mean = scale = None
+        if scaler is not None:
+            if type(scaler).__name__ != 'StandardScaler':
+                raise ValueError(f"Only StandardScaler is supported, got {type(scaler).__name__}")
+            n_features = len(scaler.scale_)
+            mean = scaler.mean_ if scaler.with_mean else np.zeros(n_features)
+            scale = scaler.scale_ if scaler.with_std else np.ones(n_features)
+
+        return cls(feature, threshold, left, right, default_left, value,
+                   roots, max_depth, base_margin, mean, scale)
+
+    def fuse_scaler(self):
+        """Return a copy with the scaler folded into raw-unit thresholds"""
+        if self.fused:
+            return self
+        if self.scaler_mean is None:
+            raise ValueError('No scaler parameters to fold into the thresholds')
+
+        internal = self.left != np.arange(len(self.left))
+        features = self.feature[internal]
+        threshold = np.zeros(len(self.threshold), dtype=np.float64)
+        threshold[internal] = fold_thresholds(
+            self.threshold[internal], self.scaler_mean[features], self.scaler_scale[features]
+        )
+        return TreeEnsemble(self.feature, threshold, self.left, self.right,
+                            self.default_left, self.value, self.roots, self.max_depth,
+                            self.base_margin, fused=True)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def save(self, path):
+        """
+        Write the flattened ensemble to an uncompressed .npz file.
+
+        The file is replaced atomically, so processes that have the old
+        file memory-mapped keep reading the old contents.
+        """
+        arrays = {
+            'format_version': np.int32(FORMAT_VERSION),
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'left': self.left,
+            'right': self.right,
+            'default_left': self.default_left,
+            'value': self.value,
+            'roots': self.roots,
+            'max_depth': np.int32(self.max_depth),
+            'base_margin': np.float64(self.base_margin),
+            'fused': np.bool_(self.fused),
+            'children': self.children,
+        }
+        if self.scaler_mean is not None:
+            arrays['scaler_mean'] = self.scaler_mean
+            arrays['scaler_scale'] = self.scaler_scale
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                        prefix='.tmp-', suffix='.npz')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path, mmap=False):
+        """Load an ensemble; with mmap the node arrays are mapped read-only from the file"""
+        if mmap:
+            return cls._from_arrays(map_npz(path), path)
+        with np.load(path, allow_pickle=False) as data:
+            return cls._from_arrays(data, path)
+
+    @classmethod
+    def _from_arrays(cls, data, path):
+        version = int(data['format_version'])
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported tree artifact format {version} in {path}")
+        return cls(
+            data['feature'], data['threshold'], data['left'], data['right'],
+            data['default_left'], data['value'], data['roots'],
+            int(data['max_depth']), float(data['base_margin']),
+            data['scaler_mean'] if 'scaler_mean' in data else None,
+            data['scaler_scale'] if 'scaler_scale' in data else None,
+            fused=bool(data['fused']) if 'fused' in data else False,
+            children=data['children'] if 'children' in data else None,
+        )
+
+    # ------------------------------------------------------------------
+    # Evaluation
+    # ------------------------------------------------------------------
+
+    def prepare(self, features):
+        """Standardize (if scaler parameters are stored) and cast to float32"""
+        if self.fused:
+            # Raw-unit float64 thresholds: no scaling pass and no copy
+            return np.asarray(features, dtype=np.float64)
+        features = np.asarray(features, dtype=np.float64)
+        if self.scaler_mean is not None:
+            features = (features - self.scaler_mean) / self.scaler_scale
+        # XGBoost compares float32 features against float32 split values
+        return features.astype(np.float32)
+
+    def decision_function(self, features):
+        """Return the raw margin (log-odds) for every row"""
+        x = self.prepare(features)
+        if x.shape[0] <= BLOCK_ROWS:
+            return self._decision_block(x)
+
+        # Large batches are walked in blocks so the (rows x trees) node
+        # matrices stay cache-resident
+        margin = np.empty(x.shape[0], dtype=np.float32)
+        for start in range(0, x.shape[0], BLOCK_ROWS):
+            margin[start:start + BLOCK_ROWS] = self._decision_block(x[start:start + BLOCK_ROWS])
+        return margin
+
+    def _decision_block(self, x):
+        n_rows, n_features = x.shape
+        flat_x = x.ravel()
+        row_offsets = (np.arange(n_rows, dtype=np.intp) * n_features)[:, None]
+        has_missing = np.isnan(flat_x).any()
+
+        node = np.tile(self.roots, (n_rows, 1))
+        for _ in range(self.max_depth):
+            values = flat_x.take(row_offsets + self.feature.take(node))
+            go_left = values < self.threshold.take(node)
+            if has_missing:
+                go_left |= np.isnan(values) & self.default_left.take(node)
+            # children holds (left, right) pairs, so one gather picks the branch
+            node = self.children.take(2 * node + ~go_left)
+
+        return self.value.take(node).sum(axis=1, dtype=np.float32) + np.float32(self.base_margin)
+
+    def predict_proba(self, features):
+        """Return (N, 2) class probabilities like XGBClassifier.predict_proba"""
+        margin = self.decision_function(features).astype(np.float64)
+        positive = 1.0 / (1.0 + np.exp(-margin))
+        return np.column_stack([1.0 - positive, positive])
+
+
+def map_npz(path):
+    """
+    Memory-map every array in an uncompressed .npz file read-only.
+
+    np.load() cannot mmap archive members, but np.savez stores them as
+    plain .npy files inside the zip, so each one can be mapped at its
+    offset in the archive.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{info.filename} in {path} is compressed and cannot be memory-mapped")
+
+            # Skip the zip local file header (its name/extra lengths are at bytes 26-30)
+            f.seek(info.header_offset)
+            local_header = f.read(30)
+            name_length, extra_length = struct.unpack('<HH', local_header[26:30])
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            if dtype.hasobject:
+                raise ValueError(f"{info.filename} in {path} holds Python objects")
+
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if shape == ():
+                # Scalars are read directly; there is nothing worth sharing
+                arrays[name] = np.frombuffer(f.read(dtype.itemsize), dtype=dtype)[0]
+            else:
+                arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=f.tell(),
+                                         shape=shape, order='F' if fortran_order else 'C')
+    return arrays
+
+
+def _to_ordered(values):
+    """Map float64 values to int64 keys with the same ordering"""
+    bits = values.view(np.int64)
+    return np.where(bits >= 0, bits, -(bits & np.int64(0x7FFFFFFFFFFFFFFF)))
+
+
+def _from_ordered(keys):
+    sign = np.int64(np.iinfo(np.int64).min)
+    return np.where(keys >= 0, keys, (-keys) | sign).view(np.float64)
+
+
+def fold_thresholds(threshold, mean, scale):
+    """
+    Convert float32 split values on standardized features to raw units.
+
+    Returns the float64 values T for which, for every float64 input x,
+    x < T  <=>  float32((x - mean) / scale) < threshold,
+    i.e. exactly the comparison the unfused model makes. The left side is
+    monotonic in x, so T is found by bisection over adjacent float64 values.
+    """
+    threshold = np.asarray(threshold, dtype=np.float32)
+    mean = np.asarray(mean, dtype=np.float64)
+    scale = np.asarray(scale, dtype=np.float64)
+
+    def at_or_above(x):
+        return ((x - mean) / scale).astype(np.float32) >= threshold
+
+    # Bracket the boundary: lo is below it, hi is at or above it
+    estimate = threshold.astype(np.float64) * scale + mean
+    width = np.maximum(np.abs(threshold.astype(np.float64)), 1.0) * 2.0 ** -20 * scale
+    while True:
+        lo, hi = estimate - width, estimate + width
+        bracketed = ~at_or_above(lo) & at_or_above(hi)
+        if bracketed.all():
+            break
+        width = np.where(bracketed, width, width * 2.0)
+
+    lo, hi = _to_ordered(lo), _to_ordered(hi)
+    while (hi - lo > 1).any():
+        mid = lo + (hi - lo) // 2
+        above = at_or_above(_from_ordered(mid))
+        hi = np.where(above, mid, hi)
+        lo = np.where(above, lo, mid)
+    return _from_ordered(hi)
+
+
+def _tree_depth(lefts, rights):
+    """Number of edges on the longest root-to-leaf path"""
+    depth = 0
+    frontier = [0]
+    while True:
+        children = [c for n in frontier for c in (lefts[n], rights[n]) if c != -1]
+        if not children:
+            return depth
+        depth += 1
+        frontier = children
+
+
+def export_trees(model_dir=MODEL_DIR, output_path=None, fuse=False):
+    """
+    Flatten model.pkl + scaler.pkl from model_dir into model_trees.npz,
+    or into model_fused.npz with the scaler folded in when fuse is set.
+    """
+    model_dir = Path(model_dir)
+    with open(model_dir / 'model.pkl', 'rb') as f:
+        model = pickle.load(f)
+    with open(model_dir / 'scaler.pkl', 'rb') as f:
+        scaler = pickle.load(f)
+
+    ensemble = TreeEnsemble.from_xgboost(model, scaler)
+    if fuse:
+        ensemble = ensemble.fuse_scaler()
+
+    default_name = FUSED_FILENAME if fuse else TREES_FILENAME
+    output_path = Path(output_path) if output_path else model_dir / default_name
+    ensemble.save(output_path)
+    return output_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Flatten the XGBoost model for NumPy inference')
+    parser.add_argument('--model-dir', default=str(MODEL_DIR),
+                        help='directory containing model.pkl and scaler.pkl')
+    parser.add_argument('--fuse', action='store_true',
+                        help=f'fold the scaler into raw-unit thresholds ({FUSED_FILENAME})')
+    parser.add_argument('--output', default=None,
+                        help=f'output path (default: <model-dir>/{TREES_FILENAME} '
+                             f'or {FUSED_FILENAME} with --fuse)')
+    args = parser.parse_args(argv)
+
+    try:
+        path = export_trees(args.model_dir, args.output, fuse=args.fuse)
+    except Exception as e:
+        print(f"❌ Tree export failed: {e}")
+        return 1
+
+    print(f"✅ Flattened tree ensemble written to {path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
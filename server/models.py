@@ -6,14 +6,23 @@ The models provide an Object-Relational Mapping (ORM) interface to interact
 with the users and assessments tables.
 """
 
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.dialects.postgresql import JSONB
+import base64
+import binascii
 import json
 
+from json_provider import raw_json
+from ml_model.features import FEATURE_COLUMNS
+
 # Initialize database instance (will be imported by app.py)
 db = SQLAlchemy()
 
+# JSONB on PostgreSQL; plain JSON elsewhere (SQLite for local load tests)
+JSONType = db.JSON().with_variant(JSONB(), 'postgresql')
+
 class User(db.Model):
     """
     User model representing user accounts in the Cardio Care system.
@@ -37,6 +46,7 @@ class User(db.Model):
     
     # Relationships
     assessments = db.relationship('Assessment', backref='user', lazy=True, cascade='all, delete-orphan')
+    risk_rollup = db.relationship('UserRiskRollup', uselist=False, lazy=True, cascade='all, delete-orphan')
     
     def __repr__(self):
         return f'<User {self.email}>'
@@ -83,13 +93,18 @@ class Assessment(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     
     # JSONB columns for flexible health data storage
-    assessment_data = db.Column(JSONB, nullable=False)
-    prediction_result = db.Column(JSONB, nullable=True)
+    assessment_data = db.Column(JSONType, nullable=False)
+    prediction_result = db.Column(JSONType, nullable=True)
     
     # Timestamps
     created_at = db.Column(db.DateTime(timezone=True), nullable=False, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime(timezone=True), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Same composite index as database/schema.pgsql; serves history pages newest first
+    __table_args__ = (
+        db.Index('idx_assessments_user_date', user_id, created_at.desc()),
+    )
+    
     def __repr__(self):
         return f'<Assessment {self.assessment_id} for User {self.user_id}>'
     
@@ -120,13 +135,157 @@ class Assessment(db.Model):
             query = query.limit(limit)
         return query.all()
     
+    # Fields returned by GET /api/assessments without ?fields= (the to_dict() keys)
+    DEFAULT_FIELDS = ('assessment_id', 'user_id', 'assessment_data', 'prediction_result',
+                      'created_at', 'updated_at')
+    
+    # JSON columns are read as text and passed through to the response unparsed
+    RAW_JSON_FIELDS = ('assessment_data', 'prediction_result')
+    
+    @staticmethod
+    def projection_columns():
+        """Fields selectable with GET /api/assessments?fields=... and their SQL expressions"""
+        return {
+            'assessment_id': Assessment.assessment_id,
+            'user_id': Assessment.user_id,
+            'assessment_data': db.cast(Assessment.assessment_data, db.Text),
+            'prediction_result': db.cast(Assessment.prediction_result, db.Text),
+            'risk_score': Assessment.prediction_result['risk_score'].as_float(),
+            'risk_level': Assessment.prediction_result['risk_level'].as_string(),
+            'created_at': Assessment.created_at,
+            'updated_at': Assessment.updated_at,
+        }
+    
+    @staticmethod
+    def encode_cursor(created_at, assessment_id):
+        """Opaque pagination cursor for the position after (created_at, assessment_id)"""
+        payload = json.dumps([created_at.isoformat(), assessment_id], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+    
+    @staticmethod
+    def decode_cursor(cursor):
+        """Inverse of encode_cursor; raises ValueError for a malformed cursor"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            created_at, assessment_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            return datetime.fromisoformat(created_at), int(assessment_id)
+        except (binascii.Error, UnicodeError, TypeError, ValueError) as e:
+            raise ValueError('Invalid pagination cursor') from e
+    
+    @staticmethod
+    def page_for_user(user_id, limit=None, cursor=None, fields=None):
+        """
+        One page of a user's assessments, newest first.
+        
+        Keyset pagination on (created_at, assessment_id): the cursor holds
+        the last row of the previous page, so every page is a range scan
+        of idx_assessments_user_date however deep the client has paged.
+        With fields, only those columns are selected (risk_score and
+        risk_level are extracted in SQL), so the JSONB columns are not
+        transferred unless asked for. Rows are never loaded as ORM
+        objects: JSON columns come back as text for raw_json()
+        passthrough and datetimes are left to the JSON provider.
+        
+        Returns:
+            tuple: (list of dicts, next_cursor or None on the last page)
+        """
+        fields = Assessment.DEFAULT_FIELDS if fields is None else fields
+        columns = Assessment.projection_columns()
+        unknown = [field for field in fields if field not in columns]
+        if not fields:
+            raise ValueError('fields must name at least one field')
+        if unknown:
+            raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+        # The cursor columns are always selected, even if not projected
+        query = db.select(Assessment.created_at.label('_created_at'),
+                          Assessment.assessment_id.label('_assessment_id'),
+                          *[columns[field].label(field) for field in fields])
+        
+        query = query.where(Assessment.user_id == user_id).order_by(
+            Assessment.created_at.desc(), Assessment.assessment_id.desc())
+        if cursor:
+            created_at, assessment_id = Assessment.decode_cursor(cursor)
+            query = query.where(
+                Assessment.created_at <= created_at,
+                db.or_(Assessment.created_at < created_at, Assessment.assessment_id < assessment_id))
+        if limit:
+            # One extra row tells whether there is a next page
+            query = query.limit(limit + 1)
+        
+        rows = db.session.execute(query).all()
+        has_more = bool(limit) and len(rows) > limit
+        rows = rows[:limit] if limit else rows
+        
+        raw_positions = [i for i, field in enumerate(fields) if field in Assessment.RAW_JSON_FIELDS]
+        items = []
+        for row in rows:
+            values = list(row[2:])
+            for i in raw_positions:
+                values[i] = raw_json(values[i])
+            items.append(dict(zip(fields, values)))
+        
+        next_cursor = Assessment.encode_cursor(rows[-1]._created_at, rows[-1]._assessment_id) if has_more else None
+        return items, next_cursor
+    
+    @staticmethod
+    def dashboard_summary(user_id, limit=10):
+        """
+        Aggregate a user's assessments in the database for the dashboard.
+        
+        One query extracts prediction_result->>'risk_score' as a float and
+        uses window functions for the count, the average and each row's
+        position (newest first); only the rows needed for the latest
+        `limit` dates and scores come back, as scalars.
+        
+        Returns:
+            dict: total, average_risk_score, risk_trend, assessment_dates,
+                  latest_id (None if the user has no assessments)
+        """
+        risk_score = Assessment.prediction_result['risk_score'].as_float()
+        newest_first = (Assessment.created_at.desc(), Assessment.assessment_id.desc())
+        ranked = db.select(
+            Assessment.assessment_id,
+            Assessment.created_at,
+            risk_score.label('risk_score'),
+            db.func.count().over().label('total'),
+            db.func.avg(risk_score).over().label('average'),
+            db.func.row_number().over(order_by=newest_first).label('position'),
+            # Position among the rows that have a score
+            db.func.row_number().over(partition_by=risk_score.is_(None),
+                                      order_by=newest_first).label('score_position'),
+        ).where(Assessment.user_id == user_id).subquery()
+        
+        rows = db.session.execute(
+            db.select(ranked)
+            .where(db.or_(ranked.c.position <= limit,
+                          db.and_(ranked.c.risk_score.isnot(None), ranked.c.score_position <= limit)))
+            .order_by(ranked.c.position)
+        ).all()
+        
+        if not rows:
+            return {'total': 0, 'average_risk_score': 0, 'risk_trend': [],
+                    'assessment_dates': [], 'latest_id': None}
+        
+        return {
+            'total': rows[0].total,
+            'average_risk_score': float(rows[0].average) if rows[0].average is not None else 0,
+            'risk_trend': [row.risk_score for row in rows
+                           if row.risk_score is not None and row.score_position <= limit],
+            'assessment_dates': [row.created_at.isoformat() for row in rows if row.position <= limit],
+            'latest_id': rows[0].assessment_id
+        }
+    
     @staticmethod
-    def find_by_id_and_user(assessment_id, user_id):
+    def find_by_id_and_user(assessment_id, user_id, with_user=False):
         """Find specific assessment by ID and user ID (for security)"""
-        return Assessment.query.filter_by(
+        query = Assessment.query.filter_by(
             assessment_id=assessment_id, 
             user_id=user_id
-        ).first()
+        )
+        if with_user:
+            # Joined eagerly, so to_dict(include_user_info=True) needs no second query
+            query = query.options(db.joinedload(Assessment.user))
+        return query.first()
     
     def validate_assessment_data(self):
         """
@@ -135,14 +294,7 @@ class Assessment(db.Model):
         Returns:
             tuple: (is_valid: bool, missing_fields: list)
         """
-        required_fields = [
-            'age', 'obesity', 'smoking', 'alcohol_consumption', 'physical_activity',
-            'diet_score', 'cholesterol_level', 'triglyceride_level', 'ldl_level',
-            'hdl_level', 'systolic_bp', 'diastolic_bp', 'air_pollution_exposure',
-            'family_history', 'stress_level', 'healthcare_access',
-            'emergency_response_time', 'annual_income', 'health_insurance',
-            'state_name_encoded', 'gender_Male'
-        ]
+        required_fields = list(FEATURE_COLUMNS)
         
         if not self.assessment_data:
             return False, required_fields
@@ -165,6 +317,337 @@ class Assessment(db.Model):
         return None
 
 
+class UserRiskRollup(db.Model):
+    """
+    Incrementally maintained dashboard figures for one user.
+    
+    The row is updated in the same transaction as every new assessment, so
+    the dashboard reads one row however long the user's history is. The
+    last RING_SIZE scores and dates are kept newest first. Rows can be
+    rebuilt from the assessments table with rebuild_risk_rollups().
+    """
+    __tablename__ = 'user_risk_rollups'
+    
+    RING_SIZE = 10
+    
+    # Primary key (one row per user)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    
+    # Running aggregates
+    assessment_count = db.Column(db.Integer, nullable=False, default=0)
+    score_count = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Float, nullable=False, default=0.0)
+    min_score = db.Column(db.Float, nullable=True)
+    max_score = db.Column(db.Float, nullable=True)
+    latest_assessment_id = db.Column(db.Integer, db.ForeignKey('assessments.assessment_id'), nullable=True)
+    
+    # Last RING_SIZE risk scores and assessment dates, newest first
+    recent_scores = db.Column(JSONType, nullable=False, default=list)
+    recent_dates = db.Column(JSONType, nullable=False, default=list)
+    
+    # Timestamps
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<UserRiskRollup for User {self.user_id}: {self.assessment_count} assessments>'
+    
+    @staticmethod
+    def empty(user_id=None):
+        """A rollup for a user without assessments"""
+        return UserRiskRollup(user_id=user_id, assessment_count=0, score_count=0, score_sum=0.0,
+                              recent_scores=[], recent_dates=[])
+    
+    @staticmethod
+    def record(*assessments):
+        """
+        Fold new assessments of one user into their rollup (the caller commits).
+        
+        The rollup row is locked (SELECT ... FOR UPDATE on PostgreSQL) so
+        concurrent inserts for the same user serialize instead of losing
+        an update. A user without a rollup row yet gets one rebuilt from
+        the assessments table, which already includes these assessments
+        (rebuild() creates the row without racing a concurrent insert).
+        """
+        db.session.flush()
+        user_id = assessments[0].user_id
+        rollup = db.session.execute(
+            db.select(UserRiskRollup)
+            .where(UserRiskRollup.user_id == user_id)
+            .with_for_update()
+        ).scalar_one_or_none()
+        
+        if rollup is None:
+            return UserRiskRollup.rebuild(user_id)
+        
+        # Use the stored timestamps, as the dashboard serializes them (one query for all)
+        created = dict(db.session.execute(
+            db.select(Assessment.assessment_id, Assessment.created_at)
+            .where(Assessment.assessment_id.in_([a.assessment_id for a in assessments]))
+        ).all())
+        
+        recent_scores = list(rollup.recent_scores)
+        recent_dates = list(rollup.recent_dates)
+        for assessment in sorted(assessments, key=lambda a: (created[a.assessment_id], a.assessment_id)):
+            score = assessment.get_risk_score()
+            rollup.assessment_count += 1
+            rollup.latest_assessment_id = assessment.assessment_id
+            recent_dates.insert(0, created[assessment.assessment_id].isoformat())
+            if score is not None:
+                rollup.score_count += 1
+                rollup.score_sum += score
+                rollup.min_score = score if rollup.min_score is None else min(rollup.min_score, score)
+                rollup.max_score = score if rollup.max_score is None else max(rollup.max_score, score)
+                recent_scores.insert(0, score)
+        
+        rollup.recent_scores = recent_scores[:UserRiskRollup.RING_SIZE]
+        rollup.recent_dates = recent_dates[:UserRiskRollup.RING_SIZE]
+        return rollup
+    
+    @staticmethod
+    def rebuild(user_id):
+        """
+        Recompute a user's rollup from the assessments table (the caller commits).
+        
+        A missing row is created with INSERT ... ON CONFLICT DO NOTHING and
+        the row is locked before the assessments are read, so a concurrent
+        record() or rebuild() for the same user waits instead of failing
+        on the primary key or overwriting this one with older figures.
+        """
+        db.session.flush()
+        UserRiskRollup._insert_missing(user_id)
+        rollup = db.session.execute(
+            db.select(UserRiskRollup)
+            .where(UserRiskRollup.user_id == user_id)
+            .with_for_update()
+        ).scalar_one()
+        
+        summary = Assessment.dashboard_summary(user_id, limit=UserRiskRollup.RING_SIZE)
+        risk_score = Assessment.prediction_result['risk_score'].as_float()
+        scores = db.session.execute(
+            db.select(db.func.count(risk_score), db.func.sum(risk_score),
+                      db.func.min(risk_score), db.func.max(risk_score))
+            .where(Assessment.user_id == user_id)
+        ).one()
+        
+        rollup.assessment_count = summary['total']
+        rollup.score_count = scores[0]
+        rollup.score_sum = float(scores[1] or 0.0)
+        rollup.min_score = scores[2]
+        rollup.max_score = scores[3]
+        rollup.latest_assessment_id = summary['latest_id']
+        rollup.recent_scores = summary['risk_trend']
+        rollup.recent_dates = summary['assessment_dates']
+        return rollup
+    
+    @staticmethod
+    def _insert_missing(user_id):
+        """Insert an empty rollup row for user_id unless one exists (or is being inserted)"""
+        # PostgreSQL in production, SQLite in the tests
+        dialect = db.session.get_bind().dialect.name
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        db.session.execute(
+            insert(UserRiskRollup)
+            .values(user_id=user_id, assessment_count=0, score_count=0, score_sum=0.0,
+                    recent_scores=[], recent_dates=[], updated_at=datetime.utcnow())
+            .on_conflict_do_nothing(index_elements=['user_id'])
+        )
+    
+    @staticmethod
+    def change_token(user_id, include_user=False):
+        """
+        Cheap version string for everything the API returns about a user's
+        assessments: one primary-key lookup, changes with every new
+        assessment. With include_user it also changes when the user row is
+        updated (for responses that embed the user). None if the user has
+        no rollup row yet.
+        """
+        columns = [UserRiskRollup.assessment_count, UserRiskRollup.latest_assessment_id,
+                   UserRiskRollup.updated_at]
+        if include_user:
+            columns.append(User.updated_at.label('user_updated_at'))
+        query = db.select(*columns).where(UserRiskRollup.user_id == user_id)
+        if include_user:
+            query = query.join(User, User.id == UserRiskRollup.user_id)
+        row = db.session.execute(query).first()
+        if row is None:
+            return None
+        updated_at = row.updated_at.isoformat() if row.updated_at else ''
+        token = f'{row.assessment_count}.{row.latest_assessment_id}.{updated_at}'
+        if include_user:
+            token += f'.{row.user_updated_at.isoformat() if row.user_updated_at else ""}'
+        return token
+    
+    def average_risk_score(self):
+        """Mean of the user's risk scores (0 without scored assessments)"""
+        return self.score_sum / self.score_count if self.score_count else 0
+
+
+def _naive_utc(value):
+    """Timestamps are stored as naive UTC; PostgreSQL hands them back timezone-aware"""
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+class AssessmentJob(db.Model):
+    """
+    Asynchronous assessment (POST /api/assessments?async=true); the table is the job queue.
+    
+    Workers claim due 'queued' rows (claim_next), score and store the
+    assessment and mark the job 'succeeded' in the same transaction. A
+    failed attempt goes back to 'queued' with a later run_after until
+    max_attempts, then the job is 'failed'.
+    """
+    __tablename__ = 'assessment_jobs'
+    
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    FINISHED = (SUCCEEDED, FAILED)
+    
+    # Primary key
+    id = db.Column(db.Integer, primary_key=True)
+    
+    # Owner and payload
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    assessment_data = db.Column(JSONType, nullable=False)
+    
+    # Queue state
+    status = db.Column(db.String(20), nullable=False, default=QUEUED)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+    assessment_id = db.Column(db.Integer, db.ForeignKey('assessments.assessment_id'), nullable=True)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+    run_after = db.Column(db.DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    finished_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    
+    # Same index as database/schema.pgsql; claim_next scans due queued jobs
+    __table_args__ = (
+        db.Index('idx_assessment_jobs_queue', status, run_after),
+    )
+    
+    def __repr__(self):
+        return f'<AssessmentJob {self.id} for User {self.user_id}: {self.status}>'
+    
+    def to_dict(self):
+        """Convert job to dictionary for JSON serialization"""
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'assessment_id': self.assessment_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+    
+    def age_seconds(self):
+        """Seconds since the job was accepted"""
+        return (datetime.utcnow() - _naive_utc(self.created_at)).total_seconds()
+    
+    @staticmethod
+    def find_by_id_and_user(job_id, user_id):
+        """Find a job by ID and user ID, re-read from the database (for polling)"""
+        return AssessmentJob.query.filter_by(id=job_id, user_id=user_id) \
+            .execution_options(populate_existing=True).first()
+    
+    @staticmethod
+    def claim_next(candidates=5):
+        """
+        Claim the oldest due queued job (status -> running) and commit.
+        Returns the job id, or None if nothing is due.
+        
+        PostgreSQL skips rows other workers have locked (FOR UPDATE SKIP
+        LOCKED); elsewhere the conditional UPDATE alone decides which
+        worker gets a job.
+        """
+        now = datetime.utcnow()
+        job_ids = db.session.execute(
+            db.select(AssessmentJob.id)
+            .where(AssessmentJob.status == AssessmentJob.QUEUED, AssessmentJob.run_after <= now)
+            .order_by(AssessmentJob.run_after, AssessmentJob.id)
+            .limit(candidates)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+        
+        for job_id in job_ids:
+            claimed = db.session.execute(
+                db.update(AssessmentJob)
+                .where(AssessmentJob.id == job_id, AssessmentJob.status == AssessmentJob.QUEUED)
+                .values(status=AssessmentJob.RUNNING, attempts=AssessmentJob.attempts + 1,
+                        started_at=now, last_error=None)
+            ).rowcount
+            if claimed:
+                db.session.commit()
+                return job_id
+        db.session.commit()
+        return None
+    
+    @staticmethod
+    def release(job_id, error, max_attempts, retry_seconds):
+        """
+        Record a failed attempt and commit: queue the job again after a
+        backoff (retry_seconds, doubling per attempt) or, once max_attempts
+        have been made, mark it failed. Returns the new status.
+        """
+        job = db.session.get(AssessmentJob, job_id)
+        now = datetime.utcnow()
+        job.last_error = str(error)[:1000]
+        if job.attempts >= max_attempts:
+            job.status = AssessmentJob.FAILED
+            job.finished_at = now
+        else:
+            job.status = AssessmentJob.QUEUED
+            job.run_after = now + timedelta(seconds=retry_seconds * 2 ** (job.attempts - 1))
+        db.session.commit()
+        return job.status
+    
+    @staticmethod
+    def requeue_stale(timeout_seconds, max_attempts):
+        """
+        Jobs left 'running' longer than timeout_seconds (their worker died)
+        are queued again, or failed if out of attempts. Commits; returns
+        the number of jobs released.
+        """
+        now = datetime.utcnow()
+        stale = db.and_(AssessmentJob.status == AssessmentJob.RUNNING,
+                        AssessmentJob.started_at < now - timedelta(seconds=timeout_seconds))
+        error = 'Worker did not finish the job in time'
+        failed = db.session.execute(
+            db.update(AssessmentJob)
+            .where(stale, AssessmentJob.attempts >= max_attempts)
+            .values(status=AssessmentJob.FAILED, finished_at=now, last_error=error)
+        ).rowcount
+        requeued = db.session.execute(
+            db.update(AssessmentJob)
+            .where(stale)
+            .values(status=AssessmentJob.QUEUED, run_after=now, last_error=error)
+        ).rowcount
+        db.session.commit()
+        return failed + requeued
+    
+    @staticmethod
+    def queue_stats():
+        """Job counts by status and the age of the oldest queued job in seconds"""
+        counts = dict(db.session.execute(
+            db.select(AssessmentJob.status, db.func.count(AssessmentJob.id))
+            .group_by(AssessmentJob.status)
+        ).all())
+        oldest = db.session.execute(
+            db.select(db.func.min(AssessmentJob.created_at))
+            .where(AssessmentJob.status == AssessmentJob.QUEUED)
+        ).scalar()
+        stats = {status: counts.get(status, 0) for status in
+                 (AssessmentJob.QUEUED, AssessmentJob.RUNNING, AssessmentJob.SUCCEEDED, AssessmentJob.FAILED)}
+        stats['oldest_queued_seconds'] = (
+            (datetime.utcnow() - _naive_utc(oldest)).total_seconds() if oldest else 0.0
+        )
+        return stats
+
+
 # ================================================
 # DATABASE UTILITY FUNCTIONS
 # ================================================
@@ -183,6 +666,25 @@ def drop_tables(app):
     with app.app_context():
         db.drop_all()
 
+def rebuild_risk_rollups(user_ids=None, batch_size=500):
+    """
+    Backfill or repair user_risk_rollups from the assessments table.
+    
+    Rebuilds every user's rollup (or only user_ids), committing every
+    batch_size users. Returns the number of rollups written.
+    """
+    if user_ids is None:
+        user_ids = db.session.execute(db.select(User.id).order_by(User.id)).scalars().all()
+    
+    rebuilt = 0
+    for user_id in user_ids:
+        UserRiskRollup.rebuild(user_id)
+        rebuilt += 1
+        if rebuilt % batch_size == 0:
+            db.session.commit()
+    db.session.commit()
+    return rebuilt
+
 # ================================================
 # DATABASE SEED FUNCTIONS (FOR DEVELOPMENT)
 # ================================================
@@ -214,7 +716,8 @@ def seed_test_data():
             user = User(
                 full_name=user_data['full_name'],
                 email=user_data['email'],
-                password_hash=bcrypt.generate_password_hash(user_data['password']).decode('utf-8')
+                password_hash=bcrypt.generate_password_hash(user_data['password']).decode('utf-8'),
+                risk_rollup=UserRiskRollup.empty()
             )
             db.session.add(user)
     
@@ -223,9 +726,14 @@ def seed_test_data():
 
 def get_db_stats():
     """Get database statistics"""
+    # Both counts in one round trip
+    users_count, assessments_count = db.session.execute(db.select(
+        db.select(db.func.count()).select_from(User).scalar_subquery(),
+        db.select(db.func.count()).select_from(Assessment).scalar_subquery()
+    )).one()
     stats = {
-        'users_count': User.query.count(),
-        'assessments_count': Assessment.query.count(),
-        'recent_assessments': Assessment.query.order_by(Assessment.created_at.desc()).limit(5).count()
+        'users_count': users_count,
+        'assessments_count': assessments_count,
+        'recent_assessments': min(assessments_count, 5)  # the 5 newest, as before
     }
     return stats
\ No newline at end of file
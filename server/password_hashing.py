@@ -0,0 +1,186 @@
+"""
+Password hashing off the request threads.
+
+bcrypt is deliberately slow (~100-300 ms of CPU per call at the default
+cost), so a burst of logins can occupy every worker thread. PasswordHasher
+runs hashpw/checkpw in a dedicated process pool with bounded admission:
+at most `workers` calls run and `queue_size` more wait; anything beyond
+that fails fast with PasswordHashingBusy, which the API turns into
+503 + Retry-After instead of letting requests pile up.
+
+The pool and its admission bound belong to one server process: with
+several gunicorn workers the host runs (and admits) that many times as
+much. By default the host's cores are split between the server processes
+(share_host(), called from gunicorn.conf.py's post_fork), so together
+the pools use about one process per core. workers=0 hashes inline on the
+calling thread (admission control still applies).
+
+The pool is created lazily in the process that first uses it. Its
+processes are started with forkserver (spawn where unavailable), never
+fork: a server worker runs threads, and a forked child could inherit a
+lock one of them holds.
+
+The bcrypt cost (log rounds) is configurable; needs_rehash() tells whether
+a stored hash was made with a different cost, so login can upgrade it.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+
+DEFAULT_ROUNDS = 12  # Flask-Bcrypt's default, used for existing hashes
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when the hashing queue is full; retry after retry_after seconds"""
+
+    def __init__(self, retry_after):
+        super().__init__('Password hashing queue is full')
+        self.retry_after = retry_after
+
+
+def hash_password(password, rounds=DEFAULT_ROUNDS):
+    """bcrypt hash of password as a str (runs in a pool process)"""
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def check_password(password_hash, password):
+    """True if password matches password_hash (runs in a pool process)"""
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    except ValueError:
+        # Malformed stored hash
+        return False
+
+
+def hash_rounds(password_hash):
+    """Cost factor of a $2a$/$2b$/$2y$ hash, or None if it cannot be parsed"""
+    parts = (password_hash or '').split('$')
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+class PasswordHasher:
+    """bcrypt on a bounded process pool with fail-fast admission control"""
+
+    def __init__(self, rounds=DEFAULT_ROUNDS, workers=None, queue_size=None, retry_after=1,
+                 observer=None, processes=1):
+        self.rounds = int(rounds)
+        self.retry_after = retry_after
+        # observer(operation, seconds) is called after every hash ('hash') or check ('check')
+        self.observer = observer
+
+        self._requested = (workers, queue_size)
+        self._size(processes)
+        self._pool = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+        self._reset_counters()
+
+    def __repr__(self):
+        return (f'<PasswordHasher rounds={self.rounds}, workers={self.workers}, '
+                f'queue={self.queue_size}>')
+
+    def _size(self, processes):
+        workers, queue_size = self._requested
+        # Per process: the host's cores are shared by `processes` server processes
+        self.workers = (max(1, (os.cpu_count() or 1) // max(1, int(processes)))
+                        if workers is None else int(workers))
+        self.queue_size = 2 * max(self.workers, 1) if queue_size is None else int(queue_size)
+        self._slots = threading.BoundedSemaphore(max(self.workers, 1) + self.queue_size)
+
+    def share_host(self, processes):
+        """
+        Re-size the defaults for `processes` server processes on this host
+        (explicit workers/queue_size stay). Call before the first hash.
+        """
+        self._size(processes)
+
+    def _reset_counters(self):
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.busy_seconds = 0.0
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                # Not fork: this process has threads whose locks a child could inherit held
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context(
+                    'forkserver' if 'forkserver' in methods else 'spawn')
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHashingBusy(self.retry_after)
+
+        started = time.perf_counter()
+        with self._lock:
+            self.submitted += 1
+            self.in_flight += 1
+        try:
+            if self.workers == 0:
+                return fn(*args)
+            try:
+                return self._executor().submit(fn, *args).result()
+            except BrokenProcessPool:
+                # A pool process died; start a fresh pool for the next call
+                with self._lock:
+                    self._pool = None
+                    self.failed += 1
+                raise
+        finally:
+            self._slots.release()
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+                self.busy_seconds += elapsed
+            if self.observer is not None:
+                self.observer('hash' if fn is hash_password else 'check', elapsed)
+
+    def hash(self, password):
+        """New bcrypt hash of password at the configured cost"""
+        return self._run(hash_password, password, self.rounds)
+
+    def check(self, password_hash, password):
+        """Verify password against a stored hash"""
+        return self._run(check_password, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True if password_hash was made with a different cost than configured"""
+        rounds = hash_rounds(password_hash)
+        return rounds is not None and rounds != self.rounds
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rounds': self.rounds,
+                'workers': self.workers,
+                'queue_size': self.queue_size,
+                'in_flight': self.in_flight,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'failed': self.failed,
+                'avg_ms': self.busy_seconds * 1000.0 / self.completed if self.completed else 0.0,
+            }
@@ -0,0 +1,270 @@
+"""
+Per-request SQL profiling.
+
+SQLAlchemy cursor events count and time every statement a request issues.
+The response gets a Server-Timing header with the time spent in the
+database, in the ML model and in JSON serialization, e.g.
+
+    Server-Timing: db;dur=4.21;desc="3 queries", model;dur=1.73, serialize;dur=0.12
+
+and a warning is printed when a request exceeds the query budget or runs
+the same SELECT shape (literals and bind parameters ignored) several
+times, the usual sign of an N+1 lazy-load loop.
+
+Profiling is off by default and can be switched at runtime. With a flag
+file configured (SQL_PROFILER_FLAG), every worker follows the file, so
+one command switches the whole server:
+
+    python -m sql_profiler on|off|status [--flag PATH]
+"""
+
+import argparse
+import contextvars
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import g, request
+
+DEFAULT_FLAG_PATH = os.getenv('SQL_PROFILER_FLAG', '')
+
+_current = contextvars.ContextVar('sql_profile', default=None)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PARAM_LISTS = re.compile(r'\((?:\s*(?:\?|%\(\w+\)s|:\w+)\s*,?)+\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def statement_shape(statement):
+    """Statement text with literals, bind parameter lists and whitespace normalized"""
+    shape = _LITERALS.sub('?', statement)
+    shape = _PARAM_LISTS.sub('(?)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+class RequestProfile:
+    """Statements and phase timings collected for one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.db_seconds = 0.0
+        self.shapes = Counter()
+        self.phases = {}
+
+    def add_statement(self, statement, seconds):
+        self.query_count += 1
+        self.db_seconds += seconds
+        # N+1 patterns are reads; per-row INSERTs are the dialect's batching choice
+        if statement.lstrip()[:6].upper() == 'SELECT':
+            self.shapes[statement_shape(statement)] += 1
+
+    def add_phase(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def repeated_shapes(self, threshold):
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def server_timing(self):
+        parts = [f'db;dur={self.db_seconds * 1000.0:.2f};desc="{self.query_count} queries"']
+        for name in ('model', 'serialize'):
+            if name in self.phases:
+                parts.append(f'{name};dur={self.phases[name] * 1000.0:.2f}')
+        parts.append(f'total;dur={(time.perf_counter() - self.started) * 1000.0:.2f}')
+        return ', '.join(parts)
+
+
+@contextmanager
+def timed(phase):
+    """Attribute the enclosed block to a Server-Timing phase (no-op when not profiling)"""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_phase(phase, time.perf_counter() - started)
+
+
+class SQLProfiler:
+    """Request hooks + SQLAlchemy cursor events; enabled state may follow a flag file"""
+
+    def __init__(self, enabled=False, query_budget=10, repeat_threshold=3, flag_path=None,
+                 flag_poll_seconds=1.0):
+        self._enabled = bool(enabled)
+        self.query_budget = int(query_budget)
+        self.repeat_threshold = int(repeat_threshold)
+        self.flag_path = flag_path or None
+        self.flag_poll_seconds = flag_poll_seconds
+        self._flag_checked = 0.0
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self.warnings = 0
+
+    def __repr__(self):
+        return (f'<SQLProfiler enabled={self.enabled}, budget={self.query_budget}, '
+                f'repeat_threshold={self.repeat_threshold}>')
+
+    @property
+    def enabled(self):
+        if self.flag_path is not None:
+            now = time.monotonic()
+            if now - self._flag_checked >= self.flag_poll_seconds:
+                self._flag_checked = now
+                self._enabled = read_flag(self.flag_path, self._enabled)
+        return self._enabled
+
+    def set_enabled(self, enabled):
+        """Switch profiling on or off (in every worker if a flag file is configured)"""
+        self._enabled = bool(enabled)
+        if self.flag_path is not None:
+            write_flag(self.flag_path, self._enabled)
+            self._flag_checked = time.monotonic()
+
+    def init_app(self, app, engine):
+        from sqlalchemy import event
+
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(engine, 'handle_error', self._handle_error)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.teardown_request(self._teardown_request)
+
+        # Serialization time is measured around the JSON provider's response()
+        json_response = app.json.response
+
+        def timed_response(*args, **kwargs):
+            with timed('serialize'):
+                return json_response(*args, **kwargs)
+
+        app.json.response = timed_response
+
+    # The start time lives on the statement's execution context, which is
+    # discarded with it, so a statement that raises leaves nothing behind
+    # on the pooled connection.
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None and _current.get() is not None:
+            context._sql_profiler_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self._add_statement(context, statement)
+
+    def _handle_error(self, exception_context):
+        # Failed statements count too; after_cursor_execute does not run for them
+        self._add_statement(exception_context.execution_context, exception_context.statement)
+
+    def _add_statement(self, context, statement):
+        started = getattr(context, '_sql_profiler_started', None)
+        if started is None:
+            return
+        del context._sql_profiler_started
+        profile = _current.get()
+        if profile is not None and statement:
+            profile.add_statement(statement, time.perf_counter() - started)
+
+    def _start_request(self):
+        if self.enabled:
+            g.sql_profile_token = _current.set(RequestProfile())
+
+    def _finish_request(self, response):
+        profile = _current.get()
+        if profile is None:
+            return response
+        response.headers['Server-Timing'] = profile.server_timing()
+        self._record(request.method, request.url_rule.rule if request.url_rule else request.path,
+                     profile)
+        return response
+
+    def _teardown_request(self, exc):
+        token = g.pop('sql_profile_token', None)
+        if token is not None:
+            _current.reset(token)
+
+    def _record(self, method, rule, profile):
+        endpoint = f'{method} {rule}'
+        repeated = profile.repeated_shapes(self.repeat_threshold)
+        over_budget = profile.query_count > self.query_budget
+        with self._lock:
+            stats = self._endpoints.setdefault(
+                endpoint, {'requests': 0, 'queries': 0, 'db_seconds': 0.0, 'max_queries': 0,
+                           'over_budget': 0, 'repeated_statements': 0})
+            stats['requests'] += 1
+            stats['queries'] += profile.query_count
+            stats['db_seconds'] += profile.db_seconds
+            stats['max_queries'] = max(stats['max_queries'], profile.query_count)
+            stats['over_budget'] += int(over_budget)
+            stats['repeated_statements'] += int(bool(repeated))
+            self.warnings += int(over_budget) + int(bool(repeated))
+
+        if over_budget:
+            print(f"⚠️ SQL budget exceeded: {endpoint} ran {profile.query_count} queries "
+                  f"(budget {self.query_budget}, {profile.db_seconds * 1000.0:.1f} ms)")
+        for shape, count in repeated:
+            print(f"⚠️ Possible N+1 in {endpoint}: statement ran {count}x: {shape[:200]}")
+
+    def stats(self):
+        with self._lock:
+            endpoints = {}
+            for endpoint, stats in self._endpoints.items():
+                endpoints[endpoint] = {
+                    'requests': stats['requests'],
+                    'avg_queries': stats['queries'] / stats['requests'],
+                    'max_queries': stats['max_queries'],
+                    'avg_db_ms': stats['db_seconds'] * 1000.0 / stats['requests'],
+                    'over_budget': stats['over_budget'],
+                    'repeated_statements': stats['repeated_statements'],
+                }
+            return {
+                'enabled': self._enabled,  # as of the last flag check
+                'query_budget': self.query_budget,
+                'repeat_threshold': self.repeat_threshold,
+                'warnings': self.warnings,
+                'endpoints': endpoints,
+            }
+
+
+def read_flag(path, default=False):
+    """State stored in a flag file ('1' = on); default if the file does not exist"""
+    try:
+        with open(path) as f:
+            return f.read().strip() == '1'
+    except FileNotFoundError:
+        return default
+
+
+def write_flag(path, enabled):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write('1\n' if enabled else '0\n')
+    os.replace(tmp_path, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Switch the per-request SQL profiler on or off')
+    parser.add_argument('state', choices=('on', 'off', 'status'))
+    parser.add_argument('--flag', default=DEFAULT_FLAG_PATH,
+                        help='flag file shared by the workers (default: $SQL_PROFILER_FLAG)')
+    args = parser.parse_args(argv)
+    if not args.flag:
+        print("❌ No flag file: pass --flag or set SQL_PROFILER_FLAG")
+        return 1
+
+    if args.state != 'status':
+        write_flag(args.flag, args.state == 'on')
+    elif not os.path.exists(args.flag):
+        print(f"⚠️ {args.flag} does not exist; workers use their SQL_PROFILER setting")
+        return 0
+    enabled = read_flag(args.flag)
+    print(f"✅ SQL profiler is {'on' if enabled else 'off'} ({args.flag})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the ML prediction module (no server or database needed)
+"""
+
+import json
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+# Add server directory to Python path
+server_dir = Path(__file__).parent
+sys.path.append(str(server_dir))
+
+from ml_model import prediction
+from ml_model.batching import BatcherClosed
+from ml_model.dataset import load_frame
+from ml_model.features import FEATURE_COLUMNS, FeatureError, FeatureVectorizer
+
+FEATURES = list(FEATURE_COLUMNS)
+
+_sample = None
+
+def load_sample(n_rows=500):
+    """Load a small slice of the training dataset (cached per process)"""
+    global _sample
+    if _sample is None:
+        _sample = load_frame().head(n_rows).copy()
+    return _sample
+
+def install_test_model():
+    """Fit a small scaler + model on the dataset and install it in the module"""
+    df = load_sample()
+    scaler = StandardScaler().fit(df[FEATURES])
+    model = LogisticRegression(max_iter=500).fit(
+        scaler.transform(df[FEATURES]), df['heart_attack_risk']
+    )
+    prediction.install_models(model, scaler)
+    return model, scaler
+
+def sample_inputs(n):
+    """Return n assessment_data dictionaries taken from the dataset"""
+    return load_sample()[FEATURES].head(n).to_dict(orient='records')
+
+def test_batch_matches_single():
+    """make_predictions must agree with make_prediction row by row"""
+    install_test_model()
+    inputs = sample_inputs(25)
+    
+    batch = prediction.make_predictions(inputs)
+    single = [prediction.make_prediction(row) for row in inputs]
+    
+    assert len(batch) == len(inputs)
+    for b, s in zip(batch, single):
+        assert b['risk_level'] == s['risk_level']
+        assert np.isclose(b['risk_score'], s['risk_score'])
+
+def test_single_matches_dataframe_pipeline():
+    """The vectorizer path must match scaler.transform on a DataFrame"""
+    model, scaler = install_test_model()
+    row = sample_inputs(1)[0]
+    
+    # Shuffle key order: the vectorizer must not depend on dict ordering
+    shuffled = dict(reversed(list(row.items())))
+    expected = model.predict_proba(scaler.transform(pd.DataFrame([row])[FEATURES]))[0][1]
+    
+    assert np.isclose(prediction.make_prediction(shuffled)['risk_score'], expected)
+
+def test_vectorizer_coercion_and_errors():
+    """Values are coerced to floats and bad input reports every problem"""
+    vectorizer = FeatureVectorizer(dtype=np.float32)
+    row = dict(sample_inputs(1)[0], gender_Male=True, age='42')
+    
+    features = vectorizer.transform_one(row)
+    assert features.shape == (1, len(FEATURES))
+    assert features.dtype == np.float32
+    assert features[0, FEATURES.index('age')] == 42.0
+    assert features[0, FEATURES.index('gender_Male')] == 1.0
+    
+    bad = dict(row, age='old')
+    del bad['smoking']
+    errors = vectorizer.find_errors(bad)
+    assert any('smoking' in e for e in errors)
+    assert any('age' in e for e in errors)
+    try:
+        vectorizer.transform_many([row, bad])
+        assert False, 'expected FeatureError'
+    except FeatureError as e:
+        assert all(error.startswith('row 1') for error in e.errors)
+
+def test_micro_batching_matches_direct():
+    """Concurrent calls through the micro-batcher return the direct results"""
+    install_test_model()
+    inputs = sample_inputs(64)
+    expected = [prediction.make_prediction(row)['risk_score'] for row in inputs]
+    
+    batcher = prediction.enable_micro_batching(max_batch_size=16, max_wait_ms=5)
+    try:
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(prediction.make_prediction, inputs))
+    finally:
+        prediction.disable_micro_batching()
+    
+    assert np.allclose([r['risk_score'] for r in results], expected)
+    stats = batcher.stats()
+    assert stats['rows'] == len(inputs)
+    assert stats['batches'] < len(inputs)
+    assert sum(stats['batch_size_histogram'].values()) == stats['batches']
+    
+    # Disabling stops the worker thread and refuses new rows
+    assert not batcher._thread.is_alive()
+    try:
+        batcher.submit(np.zeros(3))
+        assert False, 'closed batcher accepted a row'
+    except BatcherClosed:
+        pass
+
+def test_prediction_cache_hits_and_invalidation():
+    """Repeated inputs hit the cache until a new model version is installed"""
+    install_test_model()
+    row = sample_inputs(1)[0]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = prediction.enable_prediction_cache(
+            max_entries=2, shared_path=Path(tmp) / 'predictions.sqlite3'
+        )
+        try:
+            first = prediction.make_prediction(row)
+            # Same values with different JSON types must map to the same key
+            second = prediction.make_prediction({k: str(v) for k, v in row.items()})
+            assert second == first
+            assert cache.stats()['hits'] == 1
+            
+            # Filling the LRU evicts the oldest entry
+            prediction.make_predictions(sample_inputs(3)[1:])
+            assert cache.stats()['evictions'] >= 1
+            
+            # Evicted locally but still served from the shared tier, which keeps its expiry
+            prediction.make_prediction(row)
+            assert cache.stats()['shared_hits'] == 1
+            key = cache.key_for(prediction.vectorizer.transform_one(row)[0])
+            assert cache._entries[key][0] == cache.shared.get(key, 0.0)[1]
+            
+            # A new model version invalidates everything
+            install_test_model()
+            prediction.make_prediction(row)
+            assert cache.stats()['invalidations'] == 2
+            assert cache.stats()['misses'] == 4
+            
+            # A result keyed by the previous version (hot swap) is tagged with it, not the new one
+            features = prediction.vectorizer.transform_one(row)[0]
+            stale_key = cache.key_for(features, 'previous-version')
+            cache.set(stale_key, first, 'previous-version')
+            cache.shared.retain_version(cache.model_version)
+            assert cache.shared.get(stale_key, 0.0) is None
+        finally:
+            prediction.disable_prediction_cache()
+
+def test_onnx_backend_matches_pickle():
+    """The exported ONNX graph must reproduce scaler + model probabilities"""
+    try:
+        from xgboost import XGBClassifier
+        from ml_model.backends import OnnxBackend, PickleBackend
+        from ml_model.onnx_export import build_onnx
+    except ImportError as e:
+        pytest.skip(f"ONNX export dependencies missing: {e}")
+    
+    df = load_sample()
+    scaler = StandardScaler().fit(df[FEATURES])
+    model = XGBClassifier(n_estimators=20, max_depth=3).fit(
+        scaler.transform(df[FEATURES]), df['heart_attack_risk']
+    )
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        (Path(tmp) / 'model.onnx').write_bytes(build_onnx(model, scaler).SerializeToString())
+        onnx_backend = OnnxBackend.load(tmp)
+        
+        features = df[FEATURES].to_numpy(dtype=np.float64)
+        expected = PickleBackend(model, scaler).predict_proba(features)
+        assert np.allclose(onnx_backend.predict_proba(features), expected, atol=1e-5)
+
+def test_tree_engine_matches_xgboost():
+    """The NumPy tree evaluator must reproduce XGBClassifier.predict_proba"""
+    from xgboost import XGBClassifier
+    from ml_model.backends import NumpyTreeBackend, PickleBackend
+    from ml_model.tree_engine import TreeEnsemble
+    
+    df = load_sample()
+    scaler = StandardScaler().fit(df[FEATURES])
+    model = XGBClassifier(n_estimators=50, max_depth=5).fit(
+        scaler.transform(df[FEATURES]), df['heart_attack_risk']
+    )
+    
+    features = df[FEATURES].to_numpy(dtype=np.float64, copy=True)
+    features[::7, 3] = np.nan  # exercise the missing-value branch
+    expected = PickleBackend(model, scaler).predict_proba(features)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'model_trees.npz'
+        TreeEnsemble.from_xgboost(model, scaler).save(path)
+        ensemble = TreeEnsemble.load(path)
+        
+        # Memory-mapped arrays (shared between workers) give the same results
+        mapped = NumpyTreeBackend.load(tmp, mmap=True)
+        assert mapped.describe()['memory_mapped']
+        assert np.array_equal(mapped.predict_proba(features), ensemble.predict_proba(features))
+        del mapped
+    
+    assert np.allclose(ensemble.predict_proba(features), expected, atol=1e-6)
+    assert np.allclose(ensemble.predict_proba(features[:1]), expected[:1], atol=1e-6)
+
+def test_fused_thresholds_match_scaled_model():
+    """Folding the scaler into the thresholds must not move any row across a split"""
+    from xgboost import XGBClassifier
+    from ml_model.tree_engine import TreeEnsemble
+    
+    df = load_sample()
+    scaler = StandardScaler().fit(df[FEATURES])
+    model = XGBClassifier(n_estimators=100, max_depth=6).fit(
+        scaler.transform(df[FEATURES]), df['heart_attack_risk']
+    )
+    ensemble = TreeEnsemble.from_xgboost(model, scaler)
+    fused = ensemble.fuse_scaler()
+    assert fused.scaler_mean is None and fused.threshold.dtype == np.float64
+    
+    # Training values sit exactly on split points, so they are the hard cases
+    features = df[FEATURES].to_numpy(dtype=np.float64)
+    assert np.array_equal(fused.decision_function(features), ensemble.decision_function(features))
+    
+    # Values straddling every raw threshold by one float64 step
+    internal = fused.left != np.arange(len(fused.left))
+    probe = np.repeat(features[:1], 2 * internal.sum(), axis=0)
+    columns = fused.feature[internal]
+    raw = fused.threshold[internal]
+    rows = np.arange(len(raw))
+    probe[2 * rows, columns] = np.nextafter(raw, -np.inf)
+    probe[2 * rows + 1, columns] = raw
+    assert np.array_equal(fused.decision_function(probe), ensemble.decision_function(probe))
+
+def test_numpy_backend_skips_heavy_imports():
+    """Serving from model_trees.npz must not import xgboost, sklearn or pandas"""
+    from xgboost import XGBClassifier
+    from ml_model.tree_engine import TreeEnsemble
+    
+    df = load_sample()
+    scaler = StandardScaler().fit(df[FEATURES])
+    model = XGBClassifier(n_estimators=10, max_depth=3).fit(
+        scaler.transform(df[FEATURES]), df['heart_attack_risk']
+    )
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        TreeEnsemble.from_xgboost(model, scaler).save(Path(tmp) / 'model_trees.npz')
+        script = (
+            "import sys, json\n"
+            "from ml_model import prediction\n"
+            "from ml_model.backends import NumpyTreeBackend\n"
+            f"prediction.install_backend(NumpyTreeBackend.load({tmp!r}))\n"
+            "result = prediction.make_prediction(json.loads(sys.argv[1]))\n"
+            "assert result['risk_factors'] == ['Based on model analysis.'], result\n"
+            "heavy = [m for m in ('xgboost', 'sklearn', 'pandas') if m in sys.modules]\n"
+            "assert not heavy, heavy\n"
+        )
+        row = json.dumps(sample_inputs(1)[0])
+        completed = subprocess.run([sys.executable, '-c', script, row], cwd=server_dir,
+                                   capture_output=True, text=True)
+    assert completed.returncode == 0, completed.stderr
+
+def test_background_load_reports_ready():
+    """Artifacts load on a background thread and the status reports timings"""
+    import pickle
+    model, scaler = install_test_model()
+    original_dir = prediction.current_dir
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, obj in (('model.pkl', model), ('scaler.pkl', scaler)):
+            with open(Path(tmp) / name, 'wb') as f:
+                pickle.dump(obj, f)
+        
+        prediction.current_dir = Path(tmp)
+        prediction.backend = None
+        try:
+            # Without a model, make_prediction falls back instead of loading inline
+            assert prediction.make_prediction(sample_inputs(1)[0])['risk_score'] == 0.3
+            prediction.start_background_load('pickle').join(timeout=30)
+            status = prediction.model_status()
+        finally:
+            prediction.current_dir = original_dir
+    
+    assert status['state'] == 'ready', status
+    assert status['model']['backend'] == 'pickle'
+    assert 'model.pkl' in status['startup']['artifacts']
+    assert 'warmup' in status['startup']['phases_ms']
+
+def test_registry_hot_swap():
+    """Activating a new registry version swaps the model under live requests"""
+    import pickle
+    from ml_model.registry import ModelRegistry, RegistryError
+    
+    df = load_sample()
+    scaler = StandardScaler().fit(df[FEATURES])
+    row = sample_inputs(1)[0]
+    original_registry = prediction.registry
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = ModelRegistry(Path(tmp) / 'registry')
+        for version, c in (('v1', 1.0), ('v2', 0.001)):
+            model = LogisticRegression(C=c, max_iter=500).fit(
+                scaler.transform(df[FEATURES]), df['heart_attack_risk']
+            )
+            source = Path(tmp) / version
+            source.mkdir()
+            for name, obj in (('model.pkl', model), ('scaler.pkl', scaler)):
+                with open(source / name, 'wb') as f:
+                    pickle.dump(obj, f)
+            registry.publish(source, version, backend='pickle', activate=(version == 'v1'))
+        
+        prediction.registry = registry
+        try:
+            assert prediction.load_models()
+            first = prediction.make_prediction(row)
+            
+            watcher = prediction.RegistryWatcher(registry, lambda v: prediction.load_models(version=v))
+            watcher.seen_version = 'v1'
+            assert not watcher.check()
+            registry.activate('v2')
+            assert watcher.check()
+            second = prediction.make_prediction(row)
+            
+            # A corrupted version is rejected and the current model keeps serving
+            with open(registry.version_dir('v1') / 'model.pkl', 'ab') as f:
+                f.write(b'corrupt')
+            try:
+                registry.activate('v1')
+                assert False, 'activate must verify checksums'
+            except RegistryError:
+                pass
+            assert not prediction.load_models(version='v1')
+        finally:
+            prediction.registry = original_registry
+    
+    assert first['model_version'] == 'v1'
+    assert second['model_version'] == 'v2'
+    assert first['risk_score'] != second['risk_score']
+    assert prediction.model_status()['model']['version'] == 'v2'
+
+def test_bulk_scoring_resumes():
+    """The score CLI matches make_predictions and resumes after the last chunk"""
+    from ml_model import score
+    install_test_model()
+    df = load_sample().head(250).copy()
+    expected = prediction.make_predictions(df[FEATURES].to_dict(orient='records'))
+    df.loc[7, 'age'] = None  # one invalid row
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = Path(tmp) / 'cohort.csv'
+        df.to_csv(input_path, index=False)
+        
+        for output_path in (Path(tmp) / 'scores.csv', Path(tmp) / 'scores.parquet'):
+            summary = score.score_file(input_path, output_path, chunk_size=60, workers=2)
+            assert summary['rows'] == 250 and summary['chunks'] == 5
+            
+            # Pretend the job died after two chunks and run it again
+            progress_path = f'{output_path}{score.PROGRESS_SUFFIX}'
+            with open(progress_path) as f:
+                progress = json.load(f)
+            progress.update(chunks_done=2, rows_done=120)
+            if output_path.suffix == '.csv':
+                progress['csv_bytes'] = len(''.join(
+                    open(output_path).readlines()[:121]).encode())
+            with open(progress_path, 'w') as f:
+                json.dump(progress, f)
+            assert score.score_file(input_path, output_path, chunk_size=60, workers=2)['rows'] == 130
+            
+            scored = (pd.read_csv(output_path) if output_path.suffix == '.csv'
+                      else pd.read_parquet(output_path))
+            assert list(scored['id']) == list(df['patient_id'])
+            assert scored['error'].notna().sum() == 1 and 'age' in scored['error'][7]
+            valid = scored['error'].isna()
+            assert np.allclose(scored['risk_score'][valid],
+                               [r['risk_score'] for r, ok in zip(expected, valid) if ok])
+
+def test_dataset_cache_follows_source():
+    """The columnar cache is memory-mapped and rebuilt when the source changes"""
+    from ml_model import dataset
+    df = load_sample().head(50)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / 'cohort.csv'
+        df.to_csv(source, index=False)
+        features, labels = dataset.load_arrays(source, Path(tmp) / 'cache')
+        assert isinstance(features, np.memmap) and not features.flags.writeable
+        assert np.array_equal(features, df[FEATURES].to_numpy(dtype=np.float64))
+        assert np.array_equal(labels, df['heart_attack_risk'])
+        
+        df.head(20).to_csv(source, index=False)
+        features, labels = dataset.load_arrays(source, Path(tmp) / 'cache')
+        assert features.shape == (20, len(FEATURES))
+        assert len(list((Path(tmp) / 'cache').iterdir())) == 1
+
+def test_training_pipeline_respects_budget():
+    """train.py writes a manifest the registry and prediction.py can load"""
+    from ml_model import train
+    from ml_model.registry import ModelRegistry
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / 'cohort.csv'
+        load_frame().head(2000).to_csv(source, index=False)
+        registry = ModelRegistry(Path(tmp) / 'registry')
+        budget = {'max_row_latency_ms': 50.0, 'max_batch_latency_ms': 500.0}
+        
+        manifest = train.train(source, Path(tmp) / 'run', trials=4, jobs=2, backend_name='fused',
+                               budget=budget, activate=True, registry=registry,
+                               cache_root=Path(tmp) / 'cache')
+        assert manifest['backend'] == 'fused'
+        assert manifest['training']['validation']['row_latency_ms'] <= 50.0
+        assert set(manifest['files']) >= {'model.pkl', 'scaler.pkl', 'model_fused.npz'}
+        # The run directory's manifest names the version the registry serves
+        run_manifest = json.loads((Path(tmp) / 'run' / 'manifest.json').read_text())
+        assert run_manifest['version'] == manifest['version']
+        
+        original_registry = prediction.registry
+        prediction.registry = registry
+        try:
+            assert prediction.load_models()
+            assert prediction.model_status()['model']['backend'] == 'fused'
+            result = prediction.make_prediction(sample_inputs(1)[0])
+        finally:
+            prediction.registry = original_registry
+        assert result['model_version'] == manifest['version']
+        
+        # An impossible budget rejects every candidate
+        try:
+            train.train(source, Path(tmp) / 'run2', trials=2, jobs=1,
+                        budget={'max_model_kb': 0.001}, cache_root=Path(tmp) / 'cache')
+            assert False, 'expected BudgetExceeded'
+        except train.BudgetExceeded:
+            pass
+
+def test_pickle_backend_leaves_input_unchanged():
+    """Scaling works on a copy: the caller's array (read-only or integer) is untouched"""
+    from ml_model.backends import PickleBackend
+    
+    model, scaler = install_test_model()
+    backend = PickleBackend(model, scaler)
+    features = load_sample()[FEATURES].head(20).to_numpy(dtype=np.float64, copy=True)
+    original = features.copy()
+    expected = model.predict_proba((original - scaler.mean_) / scaler.scale_)
+    
+    features.flags.writeable = False  # like the memory-mapped dataset arrays
+    assert np.allclose(backend.predict_proba(features), expected)
+    assert np.array_equal(features, original)
+    
+    rounded = np.rint(original).astype(np.int64)
+    assert np.allclose(backend.predict_proba(rounded),
+                       model.predict_proba((rounded - scaler.mean_) / scaler.scale_))
+
+def test_batch_empty():
+    """An empty batch returns an empty list without touching the model"""
+    assert prediction.make_predictions([]) == []
+
+if __name__ == "__main__":
+    print("🧪 Testing ML prediction module")
+    print("=" * 40)
+    
+    for test in (test_batch_matches_single, test_single_matches_dataframe_pipeline,
+                 test_vectorizer_coercion_and_errors, test_micro_batching_matches_direct,
+                 test_prediction_cache_hits_and_invalidation, test_onnx_backend_matches_pickle,
+                 test_tree_engine_matches_xgboost, test_fused_thresholds_match_scaled_model,
+                 test_numpy_backend_skips_heavy_imports, test_background_load_reports_ready,
+                 test_registry_hot_swap, test_bulk_scoring_resumes,
+                 test_dataset_cache_follows_source, test_training_pipeline_respects_budget,
+                 test_pickle_backend_leaves_input_unchanged, test_batch_empty):
+        try:
+            test()
+        except pytest.skip.Exception as e:
+            print(f"   ⚠️ Skipped {test.__name__}: {e}")
+            continue
+        print(f"   ✅ {test.__name__}")
+    
+    print("\n🎉 All prediction tests passed!")